@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Throughput of the plugin's geometry conversion paths on synthetic layers.
+
+Measures CoordConvert.transform_point/line/polygon_geometry over every
+feature of generated memory layers of growing size, and the end-to-end
+streaming conversion (read, convert, write to a memory layer). Needs the
+QGIS Python environment, e.g. the python-qgis / OSGeo4W shell.
+
+    python benchmarks/bench_geometry.py --sizes 1000 10000 --output geometry.json
+"""
+import argparse
+import importlib
+import importlib.util
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import PLUGIN_DIR, best_time, random_points, result, write_results  # noqa: E402
+
+from qgis.core import Qgis, QgsApplication, QgsFeature, QgsGeometry, QgsPointXY, QgsVectorLayer  # noqa: E402
+
+PACKAGE = 'coord_convert_plugin'
+VERTICES = 20  # vertices per line / polygon ring
+
+
+def load_plugin():
+    """import the plugin package whatever its directory is called"""
+    if PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            PACKAGE, os.path.join(PLUGIN_DIR, '__init__.py'), submodule_search_locations=[PLUGIN_DIR])
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[PACKAGE] = module
+        spec.loader.exec_module(module)
+    return (importlib.import_module(PACKAGE + '.coord_convert'),
+            importlib.import_module(PACKAGE + '.coord_convert_engine'))
+
+
+def _ring(lon, lat, radius=0.001):
+    return [QgsPointXY(lon + radius * math.cos(2 * math.pi * i / VERTICES),
+                       lat + radius * math.sin(2 * math.pi * i / VERTICES)) for i in range(VERTICES)]
+
+
+def make_layer(kind, size):
+    """memory layer with size features inside china, returns (layer, vertex count)"""
+    lons, lats = random_points('china', size, seed=size)
+    layer = QgsVectorLayer(f'{kind}?crs=EPSG:4326', f'{kind}_{size}', 'memory')
+    features = []
+    for lon, lat in zip(lons, lats):
+        if kind == 'Point':
+            geom = QgsGeometry.fromPointXY(QgsPointXY(lon, lat))
+        elif kind == 'LineString':
+            geom = QgsGeometry.fromPolylineXY(_ring(lon, lat))
+        else:
+            geom = QgsGeometry.fromPolygonXY([_ring(lon, lat)])
+        feature = QgsFeature()
+        feature.setGeometry(geom)
+        features.append(feature)
+    layer.dataProvider().addFeatures(features)
+    vertices = sum(1 for feature in layer.getFeatures() for _ in feature.geometry().vertices())
+    return layer, vertices
+
+
+def run(sizes, repeat, input_crs='WGS84', output_crs='GCJ02'):
+    coord_convert, engine = load_plugin()
+    plugin = coord_convert.CoordConvert(None)
+    # one conversion engine per run, shared by every geometry
+    geometry_transformer = plugin.create_geometry_transformer(input_crs, output_crs)
+    methods = {
+        'Point': plugin.transform_point_geometry,
+        'LineString': plugin.transform_line_geometry,
+        'Polygon': plugin.transform_polygon_geometry,
+    }
+
+    results = []
+    for size in sizes:
+        for kind, method in methods.items():
+            layer, vertices = make_layer(kind, size)
+            geometries = [feature.geometry() for feature in layer.getFeatures()]
+
+            def geometry_only():
+                for geom in geometries:
+                    method(geom, geometry_transformer)
+
+            seconds = best_time(geometry_only, repeat)
+            results.append(result(method.__name__, vertices, seconds, features=size, geometry=kind))
+
+            def end_to_end():
+                output = engine.create_memory_layer('output', layer.wkbType(), layer.crs(), layer.fields())
+                engine.convert_features(layer, output.dataProvider(),
+                                        plugin.create_geometry_transformer(input_crs, output_crs), total=size)
+
+            seconds = best_time(end_to_end, repeat)
+            results.append(result('convert_features', vertices, seconds, features=size, geometry=kind))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='feature counts of the synthetic layers (default: 1000 10000 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, the best is kept (default: 3)')
+    parser.add_argument('--output', default='-', help='JSON output file, - for stdout (default)')
+    args = parser.parse_args(argv)
+
+    app = QgsApplication([], False)
+    app.initQgis()
+    try:
+        results = run(args.sizes, args.repeat)
+    finally:
+        app.exitQgis()
+    write_results('geometry', results, args.output, {'qgis': Qgis.QGIS_VERSION})
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
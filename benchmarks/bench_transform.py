@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Points per second of the six util.transform conversions.
+
+Every direction is measured for scalar calls and for the *_array batch
+functions, on points inside china and outside it.
+
+    python benchmarks/bench_transform.py --points 100000 --output transform.json
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import PLUGIN_DIR, REGIONS, best_time, random_points, result, write_results  # noqa: E402
+
+sys.path.insert(0, PLUGIN_DIR)
+from util import transform  # noqa: E402
+
+DIRECTIONS = ('wgs2gcj', 'gcj2wgs', 'gcj2bd', 'bd2gcj', 'wgs2bd', 'bd2wgs')
+
+
+def bench_scalar(func, lons, lats, repeat):
+    def run():
+        for lon, lat in zip(lons, lats):
+            func(lon, lat)
+    return best_time(run, repeat)
+
+
+def bench_array(func, lons, lats, repeat):
+    if transform.np is not None:
+        lons = transform.np.asarray(lons)
+        lats = transform.np.asarray(lats)
+    return best_time(lambda: func(lons, lats), repeat)
+
+
+def run(points, repeat, directions=DIRECTIONS, regions=tuple(REGIONS)):
+    results = []
+    for region in regions:
+        lons, lats = random_points(region, points)
+        for direction in directions:
+            seconds = bench_scalar(getattr(transform, direction), lons, lats, repeat)
+            results.append(result(direction, points, seconds, mode='scalar', region=region))
+            seconds = bench_array(getattr(transform, direction + '_array'), lons, lats, repeat)
+            results.append(result(direction, points, seconds, mode='array', region=region))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=100000, help='points per measurement (default: 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, the best is kept (default: 3)')
+    parser.add_argument('--direction', action='append', choices=DIRECTIONS, help='only run these directions')
+    parser.add_argument('--output', default='-', help='JSON output file, - for stdout (default)')
+    args = parser.parse_args(argv)
+
+    results = run(args.points, args.repeat, args.direction or DIRECTIONS)
+    write_results('transform', results, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
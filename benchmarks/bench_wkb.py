@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Points per second of util.wkb.convert_wkbs on points, lines and polygons.
+
+Every geometry kind is measured through the batch WKB path and, for
+comparison, through a loop calling the scalar conversion on each vertex.
+Runs without QGIS.
+
+    python benchmarks/bench_wkb.py --features 100000 --output wkb.json
+"""
+import argparse
+import math
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import PLUGIN_DIR, best_time, random_points, result, write_results  # noqa: E402
+
+sys.path.insert(0, PLUGIN_DIR)
+from util import registry  # noqa: E402
+from util.wkb import convert_wkbs  # noqa: E402
+
+KINDS = ('Point', 'LineString', 'Polygon')
+VERTICES = 20  # vertices per line / polygon ring
+
+
+def _ring(lon, lat, radius=0.001):
+    return [(lon + radius * math.cos(2 * math.pi * i / VERTICES),
+             lat + radius * math.sin(2 * math.pi * i / VERTICES)) for i in range(VERTICES)]
+
+
+def _pack(coords):
+    return struct.pack('<I%dd' % (2 * len(coords)), len(coords), *(value for coord in coords for value in coord))
+
+
+def make_wkbs(kind, count):
+    """count little endian WKB geometries inside china, returns (wkbs, coordinates)"""
+    lons, lats = random_points('china', count, seed=count)
+    wkbs = []
+    coordinates = []
+    for lon, lat in zip(lons, lats):
+        if kind == 'Point':
+            coords = [(lon, lat)]
+            wkbs.append(struct.pack('<BIdd', 1, 1, lon, lat))
+        elif kind == 'LineString':
+            coords = _ring(lon, lat)
+            wkbs.append(struct.pack('<BI', 1, 2) + _pack(coords))
+        else:
+            coords = _ring(lon, lat) + [_ring(lon, lat)[0]]
+            wkbs.append(struct.pack('<BII', 1, 3, 1) + _pack(coords))
+        coordinates.extend(coords)
+    return wkbs, coordinates
+
+
+def run(features, repeat, input_crs='WGS84', output_crs='GCJ02'):
+    kernel = registry.kernel(input_crs, output_crs)
+    func = registry.conversion(input_crs, output_crs)
+    results = []
+    for kind in KINDS:
+        wkbs, coordinates = make_wkbs(kind, features)
+
+        def scalar():
+            for lon, lat in coordinates:
+                func(lon, lat)
+
+        seconds = best_time(scalar, repeat)
+        results.append(result('scalar', len(coordinates), seconds, features=features, geometry=kind))
+        seconds = best_time(lambda: convert_wkbs(wkbs, kernel), repeat)
+        results.append(result('convert_wkbs', len(coordinates), seconds, features=features, geometry=kind))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--features', type=int, default=100000, help='geometries per kind (default: 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, the best is kept (default: 3)')
+    parser.add_argument('--output', default='-', help='JSON output file, - for stdout (default)')
+    args = parser.parse_args(argv)
+
+    results = run(args.features, args.repeat)
+    write_results('wkb', results, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Shared helpers for the benchmark scripts."""
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Sample areas: well inside the china box, and outside it (outOfChina fast path)
+REGIONS = {
+    'china': ((100.0, 125.0), (22.0, 45.0)),
+    'outside': ((-10.0, 30.0), (35.0, 60.0)),
+}
+
+
+def random_points(region, count, seed=0):
+    """reproducible random lons/lats inside one of REGIONS"""
+    (lon_min, lon_max), (lat_min, lat_max) = REGIONS[region]
+    rng = random.Random(seed)
+    lons = [rng.uniform(lon_min, lon_max) for _ in range(count)]
+    lats = [rng.uniform(lat_min, lat_max) for _ in range(count)]
+    return lons, lats
+
+
+def best_time(func, repeat):
+    """best wall clock time of func() over repeat runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def result(name, points, seconds, **extra):
+    record = {'name': name, 'points': points, 'seconds': seconds,
+              'points_per_second': points / seconds if seconds else None}
+    record.update(extra)
+    return record
+
+
+def environment():
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': numpy_version,
+    }
+
+
+def write_results(suite, results, output, extra_environment=None):
+    """write results as JSON to output, - for stdout"""
+    env = environment()
+    env.update(extra_environment or {})
+    document = {'suite': suite, 'environment': env, 'results': results}
+    if output in (None, '-'):
+        json.dump(document, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
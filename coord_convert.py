@@ -13,11 +13,26 @@ import os
 from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication, Qt, QVariant
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction, QFileDialog, QMessageBox
-from qgis.core import QgsVectorLayer, QgsVectorFileWriter, QgsCoordinateReferenceSystem, QgsField, QgsFeature, QgsGeometry, QgsPoint, QgsPointXY, QgsProject, QgsWkbTypes
+from qgis.core import QgsApplication, QgsCoordinateTransform, QgsExpression, QgsMessageLog, QgsVectorDataProvider, QgsVectorLayer, QgsCoordinateReferenceSystem, QgsField, QgsPoint, QgsProject
 
 # Import the code for the dialog
 from .coord_convert_dialog import CoordConvertDialog
-from .util.transform import Transform
+from .coord_convert_engine import (DEFAULT_BATCH_SIZE, FILTER_ALL, FILTER_EXPRESSION, FILTER_EXTENT, FILTER_SELECTED,
+                                   GeometryTransformer, build_feature_request)
+from .coord_convert_batch import OUTPUT_EXTENSIONS, BatchConvertTask, collect_input_files, unique_output_path
+from .coord_convert_provider import PROVIDER_KEY, build_uri, register_provider
+from .coord_convert_task import CoordConvertTask
+from .processing_provider import CoordConvertProvider
+from .util import registry
+from .util.cache import CoordinateCache
+from .util.grid import GRID_DIRECTIONS, GridKernel
+from .util.transform import np
+
+
+def _keep_coordinates(x, y):
+    """没有对应转换时使用，返回原始坐标"""
+    return x, y
+
 
 class CoordConvert:
     """QGIS Plugin Implementation."""
@@ -67,7 +82,32 @@ class CoordConvert:
                 'The input layer contains no features. Nothing to convert.': 'The input layer contains no features. Nothing to convert.',
                 'No valid features could be converted.': 'No valid features could be converted.',
                 'Converting coordinates...': 'Converting coordinates...',
-                'Coordinate conversion has been completed successfully.': 'Coordinate conversion has been completed successfully.'
+                'Coordinate conversion has been completed successfully.': 'Coordinate conversion has been completed successfully.',
+                'Cancel': 'Cancel',
+                'Conversion canceled': 'Conversion canceled',
+                'Coordinate conversion was canceled.': 'Coordinate conversion was canceled.',
+                'No features are selected in the input layer.': 'No features are selected in the input layer.',
+                'Please enter a filter expression': 'Please enter a filter expression',
+                'Invalid filter expression': 'Invalid filter expression',
+                'The input layer does not support changing geometries. Please write the result to a new layer.': 'The input layer does not support changing geometries. Please write the result to a new layer.',
+                'Memory layers cannot be converted in place. Please write the result to a new layer.': 'Memory layers cannot be converted in place. Please write the result to a new layer.',
+                'Cannot open the input layer for writing': 'Cannot open the input layer for writing',
+                'Please save or discard the edits of the input layer first.': 'Please save or discard the edits of the input layer first.',
+                'Convert in place': 'Convert in place',
+                'The geometries of the input layer will be overwritten. This cannot be undone. Continue?': 'The geometries of the input layer will be overwritten. This cannot be undone. Continue?',
+                'In-place conversion failed, all changes were rolled back': 'In-place conversion failed, all changes were rolled back',
+                'Exception writing features': 'Exception writing features',
+                'Cannot create the offset grid': 'Cannot create the offset grid',
+                'No layers or files selected for batch conversion': 'No layers or files selected for batch conversion',
+                'Please specify an output directory': 'Please specify an output directory',
+                'Cannot open input file': 'Cannot open input file',
+                'Batch conversion finished': 'Batch conversion finished',
+                '{0} of {1} layers converted successfully.': '{0} of {1} layers converted successfully.',
+                '{0} features': '{0} features',
+                'Incremental conversion requires GeoPackage output': 'Incremental conversion requires GeoPackage output',
+                'On-the-fly conversion requires QGIS 3.10 or later': 'On-the-fly conversion requires QGIS 3.10 or later',
+                'Cannot create the converted view': 'Cannot create the converted view',
+                '{0} added, {1} changed, {2} deleted, {3} unchanged': '{0} added, {1} changed, {2} deleted, {3} unchanged'
             },
             'zh': {
                 'Coordinate Converter': '坐标转换器',
@@ -98,7 +138,32 @@ class CoordConvert:
                 'The input layer contains no features. Nothing to convert.': '输入图层不包含要素。没有需要转换的内容。',
                 'No valid features could be converted.': '没有有效的要素可以转换。',
                 'Converting coordinates...': '正在转换坐标...',
-                'Coordinate conversion has been completed successfully.': '坐标转换已成功完成。'
+                'Coordinate conversion has been completed successfully.': '坐标转换已成功完成。',
+                'Cancel': '取消',
+                'Conversion canceled': '转换已取消',
+                'Coordinate conversion was canceled.': '坐标转换已被取消。',
+                'No features are selected in the input layer.': '输入图层中没有选中的要素。',
+                'Please enter a filter expression': '请输入筛选表达式',
+                'Invalid filter expression': '筛选表达式无效',
+                'The input layer does not support changing geometries. Please write the result to a new layer.': '输入图层不支持修改几何，请将结果输出到新图层。',
+                'Memory layers cannot be converted in place. Please write the result to a new layer.': '内存图层不能原位转换，请将结果输出到新图层。',
+                'Cannot open the input layer for writing': '无法打开输入图层进行写入',
+                'Please save or discard the edits of the input layer first.': '请先保存或放弃输入图层的编辑。',
+                'Convert in place': '原位转换',
+                'The geometries of the input layer will be overwritten. This cannot be undone. Continue?': '输入图层的几何将被覆盖，且无法撤销，是否继续？',
+                'In-place conversion failed, all changes were rolled back': '原位转换失败，所有修改已回滚',
+                'Exception writing features': '写入要素时发生异常',
+                'Cannot create the offset grid': '无法创建偏移网格',
+                'No layers or files selected for batch conversion': '没有选择需要批量转换的图层或文件',
+                'Please specify an output directory': '请指定输出目录',
+                'Cannot open input file': '无法打开输入文件',
+                'Batch conversion finished': '批量转换完成',
+                '{0} of {1} layers converted successfully.': '{1} 个图层中有 {0} 个转换成功。',
+                '{0} features': '{0} 个要素',
+                'Incremental conversion requires GeoPackage output': '增量转换只支持输出GeoPackage文件',
+                'On-the-fly conversion requires QGIS 3.10 or later': '实时转换需要QGIS 3.10或更高版本',
+                'Cannot create the converted view': '无法创建实时转换图层',
+                '{0} added, {1} changed, {2} deleted, {3} unchanged': '新增 {0} 个，修改 {1} 个，删除 {2} 个，未变化 {3} 个'
             }
         }
         
@@ -106,11 +171,25 @@ class CoordConvert:
         settings = QSettings()
         self.locale = settings.value('CoordConvert/locale', 'zh')
         
+        # 流式转换每批处理的要素数量
+        self.batch_size = int(settings.value('CoordConvert/batch_size', DEFAULT_BATCH_SIZE))
+        
+        # 并行转换的工作进程数量，1表示在任务线程中直接转换
+        self.workers = int(settings.value('CoordConvert/workers', 1))
+        
+        # 坐标缓存容量，0表示不缓存；共享边界的顶点只转换一次
+        self.cache_size = int(settings.value('CoordConvert/cache_size', 0))
+        
+        # 已从注册表中解析的转换函数，键为 (输入坐标系, 输出坐标系)
+        self.conversions = {}
+        
         # Declare instance attributes
         self.actions = []
         # Use a fixed menu name that won't be translated to avoid duplicate menu entries
         self.menu = 'Coordinate Converter'
         self.dlg = None  # 稍后初始化对话框
+        self.task = None  # 正在运行的转换任务
+        self.provider = None  # Processing提供者
 
         # Check if plugin was started the first time in current QGIS session
         # Must be set in initGui() to survive plugin reloads
@@ -195,8 +274,16 @@ class CoordConvert:
 
         return action
 
+    def initProcessing(self):
+        """注册Processing提供者，qgis_process 等无界面环境也会调用此方法"""
+        self.provider = CoordConvertProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
+        self.initProcessing()
+        # 打开包含实时转换图层的项目时需要已注册的数据提供者
+        register_provider()
 
         # 使用SVG图标而不是PNG图标
         icon_path = os.path.join(self.plugin_dir, 'icon.svg')
@@ -211,6 +298,13 @@ class CoordConvert:
 
     def unload(self):
         """Removes the plugin menu item and icon from QGIS GUI."""
+        if self.task is not None:
+            self.task.cancel()
+        if self.provider is not None:
+            QgsApplication.processingRegistry().removeProvider(self.provider)
+            self.provider = None
+        # 实时转换的数据提供者无法注销，保持注册，项目中的实时转换图层仍然可用；
+        # 重新加载插件后由 register_provider 注册的函数使用新的代码
         for action in self.actions:
             self.iface.removePluginMenu(
                 self.menu,  # Use the fixed menu name, not the translated one
@@ -254,17 +348,9 @@ class CoordConvert:
             
     def convert_coordinates(self):
         """执行坐标转换操作"""
-        # 获取输入图层
-        layer_idx = self.dlg.cboInputLayer.currentIndex()
-        if layer_idx == -1:
-            QMessageBox.critical(self.dlg, self.tr('Error'), self.tr('No input layer selected'))
-            return
-            
-        layer_id = self.dlg.cboInputLayer.currentData()
-        input_layer = QgsProject.instance().mapLayer(layer_id)
-        
-        if not input_layer:
-            QMessageBox.critical(self.dlg, self.tr('Error'), self.tr('No input layer selected'))
+        # 如果已有转换任务在运行，则转换按钮用于取消任务
+        if self.task is not None:
+            self.task.cancel()
             return
         
         # 确定输入坐标系
@@ -291,12 +377,45 @@ class CoordConvert:
                                  self.tr('Input and output coordinate systems are the same. No conversion needed.'))
             return
         
+        # 批量转换多个图层和文件
+        if self.dlg.groupBoxBatch.isChecked():
+            self.convert_batch(input_crs, output_crs)
+            return
+        
+        # 获取输入图层
+        layer_idx = self.dlg.cboInputLayer.currentIndex()
+        if layer_idx == -1:
+            QMessageBox.critical(self.dlg, self.tr('Error'), self.tr('No input layer selected'))
+            return
+            
+        layer_id = self.dlg.cboInputLayer.currentData()
+        input_layer = QgsProject.instance().mapLayer(layer_id)
+        
+        if not input_layer:
+            QMessageBox.critical(self.dlg, self.tr('Error'), self.tr('No input layer selected'))
+            return
+        
+        # 实时转换不写出副本，只添加一个转换后的视图图层
+        if self.dlg.chkOnTheFly.isChecked():
+            self.add_converted_view(input_layer, input_crs, output_crs)
+            return
+        
+        # 筛选需要转换的要素
+        ok, request = self.create_feature_request(input_layer, (input_crs, output_crs))
+        if not ok:
+            return
+        
+        # 原位转换直接修改输入图层，不需要输出路径
+        in_place = self.dlg.chkInPlace.isChecked()
+        if in_place and not self.confirm_in_place(input_layer):
+            return
+        
         # 确定输出路径
         use_temp_layer = self.dlg.chkUseTemporaryLayer.isChecked()
         output_path = ""
         output_format = ""
         
-        if not use_temp_layer:
+        if not use_temp_layer and not in_place:
             output_path = self.dlg.leOutputPath.text()
             if not output_path:
                 QMessageBox.critical(self.dlg, self.tr('Error'), self.tr('Please specify an output path'))
@@ -351,304 +470,431 @@ class CoordConvert:
                     output_path += '.shp'
                     self.dlg.leOutputPath.setText(output_path)
         
-        # 创建一个Transform实例
-        transformer = Transform()
-        
-        # 获取输入图层的几何类型和CRS
-        crs = input_layer.crs()
-        geometry_type = input_layer.wkbType()
+        # 增量转换依赖输出要素ID在多次转换之间保持不变，只支持GeoPackage
+        incremental = self.dlg.chkIncremental.isChecked() and not use_temp_layer and not in_place
+        if incremental:
+            if output_format != "GPKG":
+                QMessageBox.critical(self.dlg, self.tr('Error'),
+                                  self.tr('Incremental conversion requires GeoPackage output'))
+                return
+            # 删除的要素要与上次转换比较才能发现，增量转换总是读取全部要素
+            request = None
         
-        # 创建一个临时图层来保存转换后的要素
-        if use_temp_layer:
-            output_layer_name = f"{input_layer.name()}_{input_crs}_to_{output_crs}"
-            
-            # 根据几何类型创建正确的内存图层
-            if input_layer.geometryType() == QgsWkbTypes.PointGeometry:
-                geometry_name = "Point"
-            elif input_layer.geometryType() == QgsWkbTypes.LineGeometry:
-                geometry_name = "LineString"
-            elif input_layer.geometryType() == QgsWkbTypes.PolygonGeometry:
-                geometry_name = "Polygon"
-            else:
-                geometry_name = "Unknown"
-                
-            # 处理多部分几何
-            if QgsWkbTypes.isMultiType(geometry_type):
-                geometry_name = f"Multi{geometry_name}"
-                
-            # 创建适当类型的内存图层
-            output_layer = QgsVectorLayer(f"{geometry_name}?crs={crs.authid()}", output_layer_name, "memory")
-        else:
-            # 获取输出格式的驱动名称
-            driver_name = output_format
-            output_layer = None
-        
-        # 准备输出图层的字段
-        if use_temp_layer:
-            output_provider = output_layer.dataProvider()
-            output_provider.addAttributes(input_layer.fields())
-            output_layer.updateFields()
-        
-        # 开始坐标转换 - 提前处理数据，确保有数据可写入
-        total_features = input_layer.featureCount()
-        if total_features == 0:
+        # 开始坐标转换前确认有数据可写入
+        if input_layer.featureCount() == 0:
             QMessageBox.warning(self.dlg, self.tr('Warning'), 
                              self.tr('The input layer contains no features. Nothing to convert.'))
             return
-            
-        features = []
         
-        # 处理每个要素
-        self.iface.messageBar().pushMessage(self.tr('Converting'), self.tr('Converting coordinates...'), level=0, duration=3)
-        for i, feature in enumerate(input_layer.getFeatures()):
-            geom = feature.geometry()
-            
-            # 根据几何类型进行不同的转换
-            if geom.type() == QgsWkbTypes.PointGeometry:
-                new_geom = self.transform_point_geometry(geom, input_crs, output_crs, transformer)
-            elif geom.type() == QgsWkbTypes.LineGeometry:
-                new_geom = self.transform_line_geometry(geom, input_crs, output_crs, transformer)
-            elif geom.type() == QgsWkbTypes.PolygonGeometry:
-                new_geom = self.transform_polygon_geometry(geom, input_crs, output_crs, transformer)
-            else:
-                # 如果是未知几何类型，则保持不变
-                new_geom = geom
-            
-            # 创建新要素，保留所有原始属性
-            new_feature = QgsFeature(feature)
-            new_feature.setGeometry(new_geom)
-            features.append(new_feature)
-            
-            # 更新进度条（如果有）
-            if self.dlg.progressBar.isVisible():
-                progress = (i + 1) / total_features * 100
-                self.dlg.progressBar.setValue(int(progress))
-                
-        # 确保有要素可写入
-        if not features:
-            QMessageBox.warning(self.dlg, self.tr('Warning'), 
-                             self.tr('No valid features could be converted.'))
-            return
-                
-        # 创建输出文件（仅在不使用临时图层时）
-        if not use_temp_layer:
-            fields = input_layer.fields()
-            
+        if not use_temp_layer and not in_place and not incremental:
             # 先尝试删除同名文件，避免文件锁定问题
             if os.path.exists(output_path):
                 try:
                     os.remove(output_path)
-                    # 等待一小段时间确保文件系统更新
-                    import time
-                    time.sleep(0.5)
                 except OSError as e:
                     QMessageBox.critical(self.dlg, self.tr('Error'), 
                                       f"{self.tr('Cannot overwrite existing file')}: {output_path}\n{str(e)}")
                     return
-            
-            options = QgsVectorFileWriter.SaveVectorOptions()
-            options.driverName = driver_name
-            
-            transform_context = QgsProject.instance().transformContext()
-            
-            try:
-                # Update handling of QgsVectorFileWriter.create() return value for newer QGIS versions
-                writer_result = QgsVectorFileWriter.create(
-                    output_path,
-                    fields,
-                    geometry_type,  # 使用原始图层的WKB类型
-                    crs,
-                    transform_context,
-                    options
-                )
-                
-                # Check if writer_result is a tuple (older QGIS versions) or an object (newer versions)
-                if isinstance(writer_result, tuple):
-                    error = writer_result[0]
-                    if error != QgsVectorFileWriter.NoError:
-                        error_msg = writer_result[1] if len(writer_result) > 1 else "Unknown error"
-                        QMessageBox.critical(self.dlg, self.tr('Error'), f"{self.tr('Error creating output file')}: {error_msg}")
-                        return
-                    # 在旧版本中不需要获取writer对象，直接继续
-                else:
-                    # For newer QGIS versions (but not too new)
-                    if hasattr(writer_result, 'hasError') and writer_result.hasError():
-                        QMessageBox.critical(self.dlg, self.tr('Error'), 
-                                          f"{self.tr('Error creating output file')}: {writer_result.errorMessage()}")
-                        return
-            except Exception as e:
-                QMessageBox.critical(self.dlg, self.tr('Error'), 
-                                  f"{self.tr('Exception creating output file')}: {str(e)}")
-                return
-                
-            # 确保文件已关闭并刷新
-            del writer_result
-            
-            # 等待一小段时间，确保文件系统有时间完成文件写入
-            import time
-            time.sleep(1.0)  # 增加等待时间到1秒
-                
-            # 在创建完文件后打开图层
-            try:
-                output_layer = QgsVectorLayer(output_path, os.path.basename(output_path), "ogr")
-                
-                # 验证图层是否有效
-                if not output_layer or not output_layer.isValid():
-                    error_msg = ""
-                    if output_layer:
-                        error_msg = output_layer.dataProvider().error().message()
-                    QMessageBox.critical(self.dlg, self.tr('Error'), 
-                                      f"{self.tr('Error opening output file')}: {output_path}\n{error_msg}")
-                    return
-            except Exception as e:
-                QMessageBox.critical(self.dlg, self.tr('Error'), 
-                                  f"{self.tr('Exception opening output file')}: {output_path}\n{str(e)}")
-                return
         
-        # 将新要素添加到输出图层
-        if use_temp_layer:
-            success = output_provider.addFeatures(features)
-            if not success:
-                QMessageBox.warning(self.dlg, self.tr('Warning'), 
-                                 self.tr('Some features may not have been saved correctly.'))
-        else:
-            # 确保图层有效
-            try:
-                if output_layer and output_layer.isValid():
-                    success = output_layer.dataProvider().addFeatures(features)
-                    if not success:
-                        QMessageBox.warning(self.dlg, self.tr('Warning'), 
-                                         self.tr('Some features may not have been saved correctly.'))
-                else:
-                    QMessageBox.critical(self.dlg, self.tr('Error'), 
-                                      self.tr('Output layer is not valid. Features could not be saved.'))
-                    return
-            except Exception as e:
-                QMessageBox.critical(self.dlg, self.tr('Error'), 
-                                  f"{self.tr('Exception adding features')}: {str(e)}")
-                return
+        # 在后台任务中流式转换，转换期间QGIS界面保持响应
+        # 缓存只在本次转换中有效
+        grid_path = self.offset_grid_path(input_crs, output_crs)
+        cache = None if grid_path else self.create_cache(parallel=self.workers > 1 and not in_place and not incremental)
+        geometry_transformer = self.create_geometry_transformer(input_crs, output_crs, cache=cache, grid_path=grid_path)
+        task = CoordConvertTask(
+            self.tr('Converting coordinates...'),
+            input_layer,
+            geometry_transformer,
+            output_layer_name=f"{input_layer.name()}_{input_crs}_to_{output_crs}",
+            output_path='' if use_temp_layer or in_place else output_path,
+            output_format=output_format,
+            transform_context=QgsProject.instance().transformContext(),
+            batch_size=self.batch_size,
+            direction=(input_crs, output_crs),
+            workers=self.workers,
+            request=request,
+            attributes=None if in_place else self.dlg.selected_attributes(),
+            in_place=in_place,
+            incremental=incremental,
+            spatial_index=self.dlg.chkSpatialIndex.isChecked(),
+            grid_path=grid_path
+        )
+        
+        dlg = self.dlg
+        load_output = dlg.chkLoadOutput.isChecked() and not in_place
+        dlg.progressBar.setValue(0)
+        task.progressChanged.connect(lambda progress: dlg.progressBar.setValue(int(progress)))
+        task.taskCompleted.connect(lambda: self.on_conversion_finished(task, dlg, load_output, cache))
+        task.taskTerminated.connect(lambda: self.on_conversion_finished(task, dlg, load_output, cache))
+        
+        # 任务运行期间转换按钮用于取消任务
+        self.task = task
+        dlg.btnConvert.setText(self.tr('Cancel'))
+        self.iface.messageBar().pushMessage(self.tr('Converting'), self.tr('Converting coordinates...'), level=0, duration=3)
+        QgsApplication.taskManager().addTask(task)
+
+    def add_converted_view(self, input_layer, input_crs, output_crs):
+        """添加实时转换输入图层的视图图层，渲染时只转换当前范围内的要素"""
+        if not register_provider():
+            QMessageBox.critical(self.dlg, self.tr('Error'),
+                              self.tr('On-the-fly conversion requires QGIS 3.10 or later'))
+            return
+        name = f"{input_layer.name()}_{input_crs}_to_{output_crs}"
+        layer = QgsVectorLayer(build_uri(input_layer, input_crs, output_crs), name, PROVIDER_KEY)
+        if not layer.isValid():
+            QMessageBox.critical(self.dlg, self.tr('Error'), self.tr('Cannot create the converted view'))
+            return
+        QgsProject.instance().addMapLayer(layer)
+        self.iface.messageBar().pushMessage(self.tr('Conversion completed'), name, level=0, duration=3)
+
+    def confirm_in_place(self, input_layer):
+        """检查输入图层能否原位转换，并请用户确认覆盖几何"""
+        if not input_layer.dataProvider().capabilities() & QgsVectorDataProvider.ChangeGeometries:
+            QMessageBox.critical(self.dlg, self.tr('Error'),
+                              self.tr('The input layer does not support changing geometries. Please write the result to a new layer.'))
+            return False
+        # 后台任务按数据源重新打开图层写入，内存图层的数据只在图层自己的数据提供者中
+        if input_layer.providerType() == 'memory':
+            QMessageBox.critical(self.dlg, self.tr('Error'),
+                              self.tr('Memory layers cannot be converted in place. Please write the result to a new layer.'))
+            return False
+        # 原位转换直接写入数据提供者，不能与图层的编辑缓冲同时使用
+        if input_layer.isEditable():
+            QMessageBox.warning(self.dlg, self.tr('Warning'),
+                             self.tr('Please save or discard the edits of the input layer first.'))
+            return False
+        answer = QMessageBox.question(self.dlg, self.tr('Convert in place'),
+                                      self.tr('The geometries of the input layer will be overwritten. This cannot be undone. Continue?'),
+                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        return answer == QMessageBox.Yes
+
+    def create_feature_request(self, input_layer, direction=None):
+        """根据对话框中的要素筛选方式创建要素请求，筛选条件无效时提示用户
+
+        :param direction: (输入坐标系, 输出坐标系)，设置时地图范围视为输出坐标系中的范围
+        :type direction: tuple
+
+        :returns: 筛选条件是否有效，以及要素请求（转换全部要素时为None）
+        :rtype: (bool, QgsFeatureRequest)
+        """
+        filter_mode = self.dlg.cboFeatureFilter.currentData() or FILTER_ALL
+        if filter_mode == FILTER_ALL:
+            return True, None
+        
+        extent = None
+        expression = ''
+        if filter_mode == FILTER_SELECTED:
+            if input_layer.selectedFeatureCount() == 0:
+                QMessageBox.warning(self.dlg, self.tr('Warning'),
+                                 self.tr('No features are selected in the input layer.'))
+                return False, None
+        elif filter_mode == FILTER_EXTENT:
+            # 地图范围使用画布的坐标参考系，需要转换到图层的坐标参考系；
+            # 画布通常叠加输出坐标系的底图，范围在 build_feature_request 中反投影到输入坐标系
+            canvas = self.iface.mapCanvas()
+            transform = QgsCoordinateTransform(canvas.mapSettings().destinationCrs(), input_layer.crs(), QgsProject.instance())
+            extent = transform.transformBoundingBox(canvas.extent())
+        elif filter_mode == FILTER_EXPRESSION:
+            expression = self.dlg.leFilterExpression.text().strip()
+            if not expression:
+                QMessageBox.critical(self.dlg, self.tr('Error'), self.tr('Please enter a filter expression'))
+                return False, None
+            parsed = QgsExpression(expression)
+            if parsed.hasParserError():
+                QMessageBox.critical(self.dlg, self.tr('Error'),
+                                  f"{self.tr('Invalid filter expression')}: {parsed.parserErrorString()}")
+                return False, None
+        
+        return True, build_feature_request(input_layer, filter_mode, extent, expression, direction)
+
+    def on_conversion_finished(self, task, dlg, load_output, cache=None):
+        """转换任务结束后在主线程中处理结果"""
+        self.task = None
+        dlg.btnConvert.setText(dlg.tr('Convert'))
+        
+        if task.skipped:
+            QgsMessageLog.logMessage(
+                f"{task.skipped} features outside China were copied without conversion",
+                'CoordConvert', level=0)
+        if cache is not None:
+            stats = cache.stats()
+            QgsMessageLog.logMessage(
+                f"Coordinate cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%})",
+                'CoordConvert', level=0)
+        
+        if task.error is not None:
+            error_type, error_msg = task.error
+            QMessageBox.critical(dlg, self.tr('Error'), f"{self.tr(error_type)}: {error_msg}")
+            return
+        
+        if task.isCanceled():
+            self.iface.messageBar().pushMessage(self.tr('Conversion canceled'), self.tr('Coordinate conversion was canceled.'), level=1, duration=3)
+            return
+        
+        if task.incremental_counts is not None:
+            added, changed, deleted, unchanged = task.incremental_counts
+            QgsMessageLog.logMessage(
+                f"Incremental conversion: {added} added, {changed} changed, {deleted} deleted, {unchanged} unchanged",
+                'CoordConvert', level=0)
+        
+        # 确保有要素被转换，增量转换时没有变化的要素也是正常结果
+        if task.converted == 0 and task.incremental_counts is None:
+            QMessageBox.warning(dlg, self.tr('Warning'), 
+                             self.tr('No valid features could be converted.'))
+            return
+        
+        if not task.success:
+            QMessageBox.warning(dlg, self.tr('Warning'), 
+                             self.tr('Some features may not have been saved correctly.'))
         
         # 如果用户勾选了加载输出图层选项，则加载图层到地图
-        if self.dlg.chkLoadOutput.isChecked():
+        if load_output:
             try:
+                # 文件输出只在需要加载时才打开
+                output_layer = task.output_layer
+                if output_layer is None:
+                    output_layer = QgsVectorLayer(task.output_path, os.path.basename(task.output_path), "ogr")
                 if output_layer and output_layer.isValid():
                     QgsProject.instance().addMapLayer(output_layer)
                 else:
-                    QMessageBox.warning(self.dlg, self.tr('Warning'), 
+                    QMessageBox.warning(dlg, self.tr('Warning'), 
                                      self.tr('Output layer could not be loaded to the map.'))
             except Exception as e:
-                QMessageBox.warning(self.dlg, self.tr('Warning'), 
+                QMessageBox.warning(dlg, self.tr('Warning'), 
                                  f"{self.tr('Exception loading layer to map')}: {str(e)}")
         
         # 完成消息
-        self.iface.messageBar().pushMessage(self.tr('Conversion completed'), self.tr('Coordinate conversion has been completed successfully.'), level=0, duration=3)
+        message = self.tr('Coordinate conversion has been completed successfully.')
+        if task.incremental_counts is not None:
+            message = self.tr('{0} added, {1} changed, {2} deleted, {3} unchanged').format(*task.incremental_counts)
+        self.iface.messageBar().pushMessage(self.tr('Conversion completed'), message, level=0, duration=3)
+
+    def convert_batch(self, input_crs, output_crs):
+        """在一个后台任务中批量转换选中的图层以及目录或通配符匹配的文件"""
+        layers = [QgsProject.instance().mapLayer(layer_id) for layer_id in self.dlg.cboBatchLayers.checkedItemsData()]
+        layers = [layer for layer in layers if layer is not None]
+        pattern = self.dlg.leBatchFiles.text().strip()
+        paths = collect_input_files(pattern) if pattern else []
+        if not layers and not paths:
+            QMessageBox.warning(self.dlg, self.tr('Warning'), self.tr('No layers or files selected for batch conversion'))
+            return
+        
+        use_temp_layer = self.dlg.chkUseTemporaryLayer.isChecked()
+        output_dir = self.dlg.leOutputDir.text().strip()
+        output_format = self.dlg.cboOutputFormat.currentData() or "ESRI Shapefile"
+        if not use_temp_layer:
+            if not output_dir:
+                QMessageBox.critical(self.dlg, self.tr('Error'), self.tr('Please specify an output directory'))
+                return
+            try:
+                os.makedirs(output_dir, exist_ok=True)
+            except OSError as e:
+                QMessageBox.critical(self.dlg, self.tr('Error'),
+                                  f"{self.tr('Cannot create directory')}: {output_dir}\n{str(e)}")
+                return
+        
+        # 文件在主线程中打开，图层对象只用于创建要素源
+        for path in paths:
+            layer = QgsVectorLayer(path, os.path.splitext(os.path.basename(path))[0], "ogr")
+            if not layer.isValid():
+                QMessageBox.critical(self.dlg, self.tr('Error'), f"{self.tr('Cannot open input file')}: {path}")
+                return
+            layers.append(layer)
+        
+        # 每个图层一个转换任务，由批量任务在同一个后台线程中依次执行
+        grid_path = self.offset_grid_path(input_crs, output_crs)
+        jobs = []
+        used_paths = set()
+        for layer in layers:
+            name = f"{layer.name()}_{input_crs}_to_{output_crs}"
+            output_path = ''
+            if not use_temp_layer:
+                output_path = unique_output_path(output_dir, name, OUTPUT_EXTENSIONS.get(output_format, ''), used_paths)
+                if os.path.exists(output_path):
+                    try:
+                        os.remove(output_path)
+                    except OSError as e:
+                        QMessageBox.critical(self.dlg, self.tr('Error'),
+                                          f"{self.tr('Cannot overwrite existing file')}: {output_path}\n{str(e)}")
+                        return
+            cache = None if grid_path else self.create_cache(parallel=self.workers > 1)
+            job = CoordConvertTask(
+                name,
+                layer,
+                self.create_geometry_transformer(input_crs, output_crs, cache=cache, grid_path=grid_path),
+                output_layer_name=name,
+                output_path=output_path,
+                output_format=output_format,
+                transform_context=QgsProject.instance().transformContext(),
+                batch_size=self.batch_size,
+                direction=(input_crs, output_crs),
+                workers=self.workers,
+                spatial_index=self.dlg.chkSpatialIndex.isChecked(),
+                grid_path=grid_path
+            )
+            jobs.append((layer.name(), job))
+        
+        task = BatchConvertTask(self.tr('Converting coordinates...'), jobs, workers=self.workers)
+        dlg = self.dlg
+        load_output = dlg.chkLoadOutput.isChecked()
+        count = len(jobs)
+        dlg.progressBar.setValue(0)
+        task.progressChanged.connect(lambda progress: dlg.progressBar.setValue(int(progress)))
+        # 进度条显示当前文件
+        task.fileStarted.connect(lambda index, name: dlg.progressBar.setFormat(f"{name} ({index + 1}/{count}) %p%"))
+        task.taskCompleted.connect(lambda: self.on_batch_finished(task, dlg, load_output))
+        task.taskTerminated.connect(lambda: self.on_batch_finished(task, dlg, load_output))
+        
+        self.task = task
+        dlg.btnConvert.setText(self.tr('Cancel'))
+        self.iface.messageBar().pushMessage(self.tr('Converting'), self.tr('Converting coordinates...'), level=0, duration=3)
+        QgsApplication.taskManager().addTask(task)
 
-    def transform_point_geometry(self, geom, input_crs, output_crs, transformer):
-        """转换点"""
-        if geom.isMultipart():
-            points = geom.asMultiPoint()
-            new_points = []
-            for point in points:
-                # 转换坐标
-                x, y = point.x(), point.y()
-                new_x, new_y = self.transform_coordinates(x, y, input_crs, output_crs, transformer)
-                new_points.append(QgsPointXY(new_x, new_y))
-            
-            new_geom = QgsGeometry.fromMultiPointXY(new_points)
-        else:
-            point = geom.asPoint()
-            # 转换坐标
-            x, y = point.x(), point.y()
-            new_x, new_y = self.transform_coordinates(x, y, input_crs, output_crs, transformer)
-            new_geom = QgsGeometry.fromPointXY(QgsPointXY(new_x, new_y))
+    def on_batch_finished(self, task, dlg, load_output):
+        """批量转换结束后显示汇总报告并加载输出图层"""
+        self.task = None
+        dlg.btnConvert.setText(dlg.tr('Convert'))
+        dlg.progressBar.setFormat("%p%")
         
-        return new_geom
+        if task.error is not None:
+            error_type, error_msg = task.error
+            QMessageBox.critical(dlg, self.tr('Error'), f"{self.tr(error_type)}: {error_msg}")
+            return
         
-    def transform_line_geometry(self, geom, input_crs, output_crs, transformer):
-        """转换线"""
-        if geom.isMultipart():
-            multipolyline = geom.asMultiPolyline()
-            new_multipolyline = []
-            
-            for polyline in multipolyline:
-                new_polyline = []
-                for point in polyline:
-                    x, y = point.x(), point.y()
-                    new_x, new_y = self.transform_coordinates(x, y, input_crs, output_crs, transformer)
-                    new_polyline.append(QgsPointXY(new_x, new_y))
-                new_multipolyline.append(new_polyline)
-            
-            new_geom = QgsGeometry.fromMultiPolylineXY(new_multipolyline)
+        lines = []
+        succeeded = 0
+        for (name, job), (_, converted, error) in zip(task.jobs, task.summary()):
+            if error is None:
+                succeeded += 1
+                lines.append(f"{name}: {self.tr('{0} features').format(converted)}")
+                if load_output and converted:
+                    output_layer = job.output_layer
+                    if output_layer is None:
+                        output_layer = QgsVectorLayer(job.output_path, os.path.basename(job.output_path), "ogr")
+                    if output_layer.isValid():
+                        QgsProject.instance().addMapLayer(output_layer)
+            else:
+                lines.append(f"{name}: {self.tr(error)}")
+        report = "\n".join(lines)
+        QgsMessageLog.logMessage(report, 'CoordConvert', level=0)
+        
+        message = QMessageBox(QMessageBox.Information, self.tr('Batch conversion finished'),
+                              self.tr('{0} of {1} layers converted successfully.').format(succeeded, len(task.jobs)),
+                              QMessageBox.Ok, dlg)
+        message.setDetailedText(report)
+        message.exec_()
+
+    def create_cache(self, parallel=False):
+        """创建一次转换使用的坐标缓存
+
+        缓存由设置项 CoordConvert/cache_size 启用。并行转换在工作进程中转换坐标，
+        不使用缓存，此时在日志中说明缓存未启用。
+
+        :param parallel: 转换是否使用多进程并行
+        :type parallel: bool
+
+        :returns: 坐标缓存，未启用时为None
+        :rtype: CoordinateCache
+        """
+        if self.cache_size <= 0:
+            return None
+        if parallel:
+            QgsMessageLog.logMessage(
+                f"Coordinate cache disabled: it is not used when converting with {self.workers} worker processes",
+                'CoordConvert', level=0)
+            return None
+        return CoordinateCache(self.cache_size)
+
+    def offset_grid_path(self, input_crs, output_crs):
+        """勾选快速近似转换时返回偏移网格文件的路径，见 util.grid
+
+        网格文件保存在QGIS设置目录中，第一次使用时在任务线程中创建，之后所有转换和工作进程共用。
+        网格不支持的转换方向或没有numpy时在日志中说明，使用精确转换。
+
+        :returns: 网格文件路径，不使用网格时为None
+        :rtype: str
+        """
+        if not self.dlg.chkOffsetGrid.isChecked():
+            return None
+        if np is None:
+            QgsMessageLog.logMessage("Offset grid not used: it requires numpy", 'CoordConvert', level=0)
+            return None
+        if (input_crs, output_crs) not in GRID_DIRECTIONS:
+            QgsMessageLog.logMessage(f"Offset grid not used: it does not convert {input_crs} to {output_crs}",
+                                     'CoordConvert', level=0)
+            return None
+        directory = os.path.join(QgsApplication.qgisSettingsDirPath(), 'coord_convert')
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, 'offsets.grid')
+
+    def create_geometry_transformer(self, input_crs, output_crs, cache=None, grid_path=None):
+        """创建几何转换引擎，每次转换只需创建一次，之后传给 transform_geometry 等方法
+
+        转换方向在这里从注册表中解析为一个函数，逐顶点只执行转换计算。
+
+        :param cache: 坐标缓存，为None时不缓存
+        :type cache: CoordinateCache
+        :param grid_path: 偏移网格文件，见 offset_grid_path；设置后按批转换时使用网格近似转换，
+            不使用缓存
+        :type grid_path: str
+        """
+        func = self.resolve_conversion(input_crs, output_crs)
+        if grid_path is not None:
+            return GeometryTransformer(func, china_only=registry.china_only(input_crs, output_crs),
+                                       kernel=GridKernel(grid_path, (input_crs, output_crs)))
+        kernel = None
+        if cache is not None:
+            func = cache.wrap(func, (input_crs, output_crs))
         else:
-            polyline = geom.asPolyline()
-            new_polyline = []
-            
-            for point in polyline:
-                x, y = point.x(), point.y()
-                new_x, new_y = self.transform_coordinates(x, y, input_crs, output_crs, transformer)
-                new_polyline.append(QgsPointXY(new_x, new_y))
-            
-            new_geom = QgsGeometry.fromPolylineXY(new_polyline)
+            # 没有缓存时按批直接修改几何WKB中的坐标，缓存需要逐个顶点查询
+            try:
+                kernel = registry.kernel(input_crs, output_crs)
+            except KeyError:
+                kernel = None
+        return GeometryTransformer(func, china_only=registry.china_only(input_crs, output_crs), kernel=kernel)
+
+    def transform_geometry(self, geom, geometry_transformer):
+        """转换任意类型的几何，保留Z/M值和曲线类型
+
+        :param geom: 需要转换的几何
+        :type geom: QgsGeometry
+        :param geometry_transformer: create_geometry_transformer 创建的转换引擎，同一次转换的所有几何共用
+        :type geometry_transformer: GeometryTransformer
+
+        :rtype: QgsGeometry
+        """
+        return geometry_transformer.transform(geom)
+
+    def transform_point_geometry(self, geom, geometry_transformer):
+        """转换点"""
+        return self.transform_geometry(geom, geometry_transformer)
         
-        return new_geom
+    def transform_line_geometry(self, geom, geometry_transformer):
+        """转换线"""
+        return self.transform_geometry(geom, geometry_transformer)
         
-    def transform_polygon_geometry(self, geom, input_crs, output_crs, transformer):
+    def transform_polygon_geometry(self, geom, geometry_transformer):
         """转换面"""
-        if geom.isMultipart():
-            multipolygon = geom.asMultiPolygon()
-            new_multipolygon = []
-            
-            for polygon in multipolygon:
-                new_polygon = []
-                for ring in polygon:
-                    new_ring = []
-                    for point in ring:
-                        x, y = point.x(), point.y()
-                        new_x, new_y = self.transform_coordinates(x, y, input_crs, output_crs, transformer)
-                        new_ring.append(QgsPointXY(new_x, new_y))
-                    new_polygon.append(new_ring)
-                new_multipolygon.append(new_polygon)
-            
-            new_geom = QgsGeometry.fromMultiPolygonXY(new_multipolygon)
-        else:
-            polygon = geom.asPolygon()
-            new_polygon = []
-            
-            for ring in polygon:
-                new_ring = []
-                for point in ring:
-                    x, y = point.x(), point.y()
-                    new_x, new_y = self.transform_coordinates(x, y, input_crs, output_crs, transformer)
-                    new_ring.append(QgsPointXY(new_x, new_y))
-                new_polygon.append(new_ring)
-            
-            new_geom = QgsGeometry.fromPolygonXY(new_polygon)
-        
-        return new_geom
-
-    def transform_coordinates(self, x, y, input_crs, output_crs, transformer):
-        """根据输入和输出坐标系统转换坐标"""
-        # WGS84 -> GCJ02
-        if input_crs == "WGS84" and output_crs == "GCJ02":
-            return transformer.wgs2gcj(x, y)
-        # WGS84 -> BD09
-        elif input_crs == "WGS84" and output_crs == "BD09":
-            return transformer.wgs2bd(x, y)
-        # GCJ02 -> WGS84
-        elif input_crs == "GCJ02" and output_crs == "WGS84":
-            return transformer.gcj2wgs(x, y)
-        # GCJ02 -> BD09
-        elif input_crs == "GCJ02" and output_crs == "BD09":
-            return transformer.gcj2bd(x, y)
-        # BD09 -> WGS84
-        elif input_crs == "BD09" and output_crs == "WGS84":
-            return transformer.bd2wgs(x, y)
-        # BD09 -> GCJ02
-        elif input_crs == "BD09" and output_crs == "GCJ02":
-            return transformer.bd2gcj(x, y)
-        # 默认情况下返回原始坐标
-        else:
-            return x, y
+        return self.transform_geometry(geom, geometry_transformer)
+
+    def resolve_conversion(self, input_crs, output_crs):
+        """从注册表中解析转换函数，没有对应的转换时返回原始坐标
+
+        每个方向只在第一次使用时在注册表中查找，之后直接返回保存的函数。
+        """
+        key = (input_crs, output_crs)
+        func = self.conversions.get(key)
+        if func is None:
+            try:
+                func = registry.conversion(input_crs, output_crs)
+            except KeyError:
+                func = _keep_coordinates
+            self.conversions[key] = func
+        return func
+
+    def transform_coordinates(self, x, y, input_crs, output_crs, transformer=None):
+        """根据输入和输出坐标系统转换坐标，批量转换请使用 resolve_conversion 取得的函数"""
+        return self.resolve_conversion(input_crs, output_crs)(x, y)
 
     def run(self):
         """Run method that performs all the real work"""
@@ -672,15 +918,13 @@ class CoordConvert:
         self.populate_layer_combobox()
         self.populate_output_format_combobox()
         
+        # 上一次打开对话框时启动的任务仍在运行，转换按钮用于取消任务
+        if self.task is not None:
+            self.dlg.btnConvert.setText(self.tr('Cancel'))
+        
         # show the dialog
+        # 使用非模态对话框，转换在后台任务中运行时仍可操作QGIS
         self.dlg.show()
-        # Run the dialog event loop
-        result = self.dlg.exec_()
-        # See if OK was pressed
-        if result:
-            # Do something useful here - delete the line containing pass and
-            # substitute with your code.
-            pass
             
     def populate_layer_combobox(self):
         """填充图层下拉框"""
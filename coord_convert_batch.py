@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ BatchConvertTask
+                                 A QGIS plugin
+ Converts coordinates between WGS84, GCJ02, and BD09
+                              -------------------
+        begin                : 2025
+ ***************************************************************************/
+ Batch conversion of many layers and files in one background task.
+"""
+
+import glob
+import os
+
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import QgsTask
+
+from .util.parallel import create_pool
+
+
+# 批量转换时从目录中读取的矢量文件类型
+VECTOR_EXTENSIONS = ('.shp', '.gpkg', '.geojson', '.json', '.kml', '.gml', '.tab', '.sqlite')
+
+# OGR驱动名称 -> 输出文件扩展名
+OUTPUT_EXTENSIONS = {
+    'ESRI Shapefile': '.shp',
+    'GPKG': '.gpkg',
+    'GeoJSON': '.geojson',
+    'KML': '.kml',
+    'MapInfo File': '.tab',
+    'DXF': '.dxf',
+}
+
+
+def collect_input_files(pattern):
+    """列出目录中的矢量文件，或通配符匹配的文件
+
+    :param pattern: 目录路径，或通配符，例如 "data/**/*.shp"
+    :type pattern: str
+
+    :returns: 排序后的文件路径
+    :rtype: list
+    """
+    if os.path.isdir(pattern):
+        candidates = glob.glob(os.path.join(pattern, '*'))
+    else:
+        candidates = glob.glob(pattern, recursive=True)
+    return sorted(path for path in candidates
+                  if os.path.isfile(path) and os.path.splitext(path)[1].lower() in VECTOR_EXTENSIONS)
+
+
+def unique_output_path(output_dir, name, extension, used):
+    """生成输出目录中不重名的输出文件路径
+
+    :param used: 本次批量转换已使用的路径，新路径会加入其中
+    :type used: set
+    """
+    path = os.path.join(output_dir, name + extension)
+    number = 2
+    while path in used:
+        path = os.path.join(output_dir, f'{name}_{number}{extension}')
+        number += 1
+    used.add(path)
+    return path
+
+
+class _FileFeedback:
+    """把单个文件的进度换算为批量任务的总进度，取消状态跟随批量任务"""
+
+    def __init__(self, task, index, count):
+        self.task = task
+        self.index = index
+        self.count = count
+
+    def isCanceled(self):
+        return self.task.isCanceled()
+
+    def setProgress(self, progress):
+        self.task.setProgress((self.index + progress / 100) / self.count * 100)
+
+
+class BatchConvertTask(QgsTask):
+    """在一个后台任务中依次转换多个图层
+
+    每个图层对应一个在主线程中准备好的 CoordConvertTask，本任务在自己的
+    后台线程中依次执行它们；并行转换时所有图层共用一个进程池。
+    每个文件开始和结束时分别发出 fileStarted 和 fileFinished 信号。
+
+    :param description: 任务描述
+    :type description: str
+    :param jobs: (名称, CoordConvertTask) 列表，各任务不需要添加到任务管理器
+    :type jobs: list
+    :param workers: 工作进程数量，大于1时所有图层共用一个进程池
+    :type workers: int
+    """
+
+    # 文件序号, 名称
+    fileStarted = pyqtSignal(int, str)
+    fileFinished = pyqtSignal(int, str)
+
+    def __init__(self, description, jobs, workers=1):
+        super().__init__(description, QgsTask.CanCancel)
+        self.jobs = jobs
+        self.workers = workers
+        # 已执行完的图层数量
+        self.done = 0
+        # 出错时为 (错误类型, 详细信息)
+        self.error = None
+
+    def run(self):
+        """在后台线程中依次转换每个图层"""
+        count = len(self.jobs)
+        pool = None
+        try:
+            if self.workers > 1:
+                pool = create_pool(self.workers)
+            for index, (name, job) in enumerate(self.jobs):
+                if self.isCanceled():
+                    break
+                self.fileStarted.emit(index, name)
+                job.pool = pool
+                job.execute(_FileFeedback(self, index, count))
+                if self.isCanceled():
+                    # 被取消的图层只转换了一部分
+                    break
+                self.done = index + 1
+                self.fileFinished.emit(index, name)
+                self.setProgress((index + 1) / count * 100)
+        except Exception as e:
+            self.error = ('Exception adding features', str(e))
+            return False
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+        return not self.isCanceled()
+
+    def summary(self):
+        """每个图层的转换结果
+
+        :returns: (名称, 已转换的要素数量, 错误信息) 列表，成功时错误信息为None，
+            错误信息是未翻译的消息文本
+        :rtype: list
+        """
+        results = []
+        for index, (name, job) in enumerate(self.jobs):
+            error = None
+            if index >= self.done:
+                error = 'Conversion canceled'
+            elif job.error is not None:
+                error = ': '.join(job.error)
+            elif not job.success:
+                error = 'Some features may not have been saved correctly.'
+            results.append((name, job.converted, error))
+        return results
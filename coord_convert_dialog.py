@@ -13,10 +13,38 @@ import os
 import webbrowser
 
 from qgis.PyQt import uic
-from qgis.PyQt.QtCore import QSettings
-from qgis.PyQt.QtWidgets import QMessageBox, QDialog, QButtonGroup, QComboBox
+from qgis.PyQt.QtCore import QSettings, Qt
+from qgis.PyQt.QtWidgets import QMessageBox, QDialog, QButtonGroup, QComboBox, QFileDialog
 from qgis.core import QgsMapLayerProxyModel, QgsProject
 
+from .coord_convert_engine import FILTER_ALL, FILTER_EXPRESSION, FILTER_EXTENT, FILTER_SELECTED
+
+
+# 要素筛选方式及其显示文本
+FEATURE_FILTERS = [
+    (FILTER_ALL, 'All features'),
+    (FILTER_SELECTED, 'Selected features only'),
+    (FILTER_EXTENT, 'Features in current map extent'),
+    (FILTER_EXPRESSION, 'Features matching expression'),
+]
+
+
+def add_checkable_item(combo, text, state, data=None):
+    """向 QgsCheckableComboBox 添加带勾选状态的项
+
+    addItemWithCheckState 从 QGIS 3.16 才提供，这里使用 3.0 就有的 addItem 和 setItemCheckState。
+
+    :param combo: 下拉框
+    :type combo: QgsCheckableComboBox
+    :param text: 显示文本
+    :type text: str
+    :param state: Qt.Checked 或 Qt.Unchecked
+    :type state: Qt.CheckState
+    :param data: 项的数据
+    """
+    combo.addItem(text, data)
+    combo.setItemCheckState(combo.count() - 1, state)
+
 
 # This loads your .ui file so that PyQt can populate your plugin with the elements from Qt Designer
 FORM_CLASS, _ = uic.loadUiType(os.path.join(
@@ -59,7 +87,27 @@ class CoordConvertDialog(QDialog, FORM_CLASS):
                 'Error': 'Error',
                 'Failed to switch language': 'Failed to switch language',
                 'Select a layer': 'Select a layer',
-                'About': 'About'
+                'About': 'About',
+                'Features:': 'Features:',
+                'Expression:': 'Expression:',
+                'All features': 'All features',
+                'Selected features only': 'Selected features only',
+                'Features in current map extent': 'Features in current map extent',
+                'Features matching expression': 'Features matching expression',
+                'Fields:': 'Fields:',
+                'Geometry Only (No Attributes)': 'Geometry Only (No Attributes)',
+                'Convert In Place (Modify Input Layer)': 'Convert In Place (Modify Input Layer)',
+                'Incremental (Only Rewrite Changed Features)': 'Incremental (Only Rewrite Changed Features)',
+                'Create Spatial Index After Writing': 'Create Spatial Index After Writing',
+                'Convert On the Fly (View Only, No Copy)': 'Convert On the Fly (View Only, No Copy)',
+                'Fast Approximate Conversion (Offset Grid, About 0.5 m)': 'Fast Approximate Conversion (Offset Grid, About 0.5 m)',
+                'Batch Mode': 'Batch Mode',
+                'Layers:': 'Layers:',
+                'Files:': 'Files:',
+                'Output Directory:': 'Output Directory:',
+                'Directory or wildcard, e.g. D:/data/*.shp': 'Directory or wildcard, e.g. D:/data/*.shp',
+                'Select input directory': 'Select input directory',
+                'Select output directory': 'Select output directory'
             },
             'zh': {
                 'Coordinate Converter': '坐标转换器',
@@ -83,7 +131,27 @@ class CoordConvertDialog(QDialog, FORM_CLASS):
                 'Error': '错误',
                 'Failed to switch language': '切换语言失败',
                 'Select a layer': '选择图层',
-                'About': '关于'
+                'About': '关于',
+                'Features:': '要素:',
+                'Expression:': '表达式:',
+                'All features': '全部要素',
+                'Selected features only': '仅选中的要素',
+                'Features in current map extent': '当前地图范围内的要素',
+                'Features matching expression': '符合表达式的要素',
+                'Fields:': '字段:',
+                'Geometry Only (No Attributes)': '仅几何（不输出属性）',
+                'Convert In Place (Modify Input Layer)': '原位转换（修改输入图层）',
+                'Incremental (Only Rewrite Changed Features)': '增量转换（只重写变化的要素）',
+                'Create Spatial Index After Writing': '写入完成后创建空间索引',
+                'Convert On the Fly (View Only, No Copy)': '实时转换（仅显示，不写出副本）',
+                'Fast Approximate Conversion (Offset Grid, About 0.5 m)': '快速近似转换（偏移网格，误差约0.5米）',
+                'Batch Mode': '批量转换',
+                'Layers:': '图层:',
+                'Files:': '文件:',
+                'Output Directory:': '输出目录:',
+                'Directory or wildcard, e.g. D:/data/*.shp': '目录或通配符，例如 D:/data/*.shp',
+                'Select input directory': '选择输入目录',
+                'Select output directory': '选择输出目录'
             }
         }
         
@@ -112,6 +180,18 @@ class CoordConvertDialog(QDialog, FORM_CLASS):
         self.chkUseTemporaryLayer.setChecked(True)
         self.toggle_output_controls(True)
         
+        # 原位转换时不需要任何输出设置
+        self.chkInPlace.toggled.connect(self.toggle_in_place)
+        self.chkIncremental.toggled.connect(self.toggle_incremental)
+        self.chkOnTheFly.toggled.connect(self.toggle_on_the_fly)
+        # 加载到地图的输出需要空间索引，不加载的中间结果默认不创建
+        self.chkLoadOutput.toggled.connect(self.chkSpatialIndex.setChecked)
+        
+        # 批量转换
+        self.groupBoxBatch.toggled.connect(self.toggle_batch_mode)
+        self.btnBrowseBatchFiles.clicked.connect(self.select_batch_directory)
+        self.btnBrowseOutputDir.clicked.connect(self.select_output_directory)
+        
         # 设置其他连接
         self.setup_connections()
         
@@ -146,6 +226,18 @@ class CoordConvertDialog(QDialog, FORM_CLASS):
         """初始化UI组件"""
         # 初始化输入图层下拉框
         self.setup_input_layer_combobox()
+        
+        # 初始化要素筛选方式下拉框，表达式输入框只在按表达式筛选时可用
+        for mode, text in FEATURE_FILTERS:
+            self.cboFeatureFilter.addItem(self.tr(text), mode)
+        self.cboFeatureFilter.currentIndexChanged.connect(self.on_feature_filter_changed)
+        self.on_feature_filter_changed()
+        
+        # 输出字段列表随输入图层变化，默认输出全部字段
+        self.fields_layer_id = None
+        self.cboInputLayer.currentIndexChanged.connect(self.populate_field_combobox)
+        self.chkGeometryOnly.toggled.connect(lambda checked: self.cboFields.setEnabled(not checked))
+        self.populate_field_combobox()
 
     def setup_input_layer_combobox(self):
         """设置输入图层下拉框"""
@@ -205,6 +297,32 @@ class CoordConvertDialog(QDialog, FORM_CLASS):
         elif self.cboInputLayer.count() > 0:
             self.cboInputLayer.setCurrentIndex(0)
 
+    def populate_field_combobox(self):
+        """填充输入图层的字段列表，全部勾选；图层未变化时保留用户的选择"""
+        layer_id = self.cboInputLayer.currentData()
+        if layer_id == self.fields_layer_id:
+            return
+        self.fields_layer_id = layer_id
+        self.cboFields.clear()
+        layer = QgsProject.instance().mapLayer(layer_id) if layer_id else None
+        if layer is None:
+            return
+        for field in layer.fields():
+            add_checkable_item(self.cboFields, field.name(), Qt.Checked)
+
+    def selected_attributes(self):
+        """需要输出的字段名，None表示输出全部字段，空列表表示只输出几何"""
+        if self.chkGeometryOnly.isChecked():
+            return []
+        names = self.cboFields.checkedItems()
+        if len(names) == self.cboFields.count():
+            return None
+        return names
+
+    def on_feature_filter_changed(self):
+        """按表达式筛选时启用表达式输入框"""
+        self.leFilterExpression.setEnabled(self.cboFeatureFilter.currentData() == FILTER_EXPRESSION)
+
     def setup_connections(self):
         """设置UI组件的连接"""
         # 在这里添加设置连接的代码
@@ -216,6 +334,67 @@ class CoordConvertDialog(QDialog, FORM_CLASS):
         self.leOutputPath.setEnabled(not checked)
         self.btnBrowse.setEnabled(not checked)
         self.cboOutputFormat.setEnabled(not checked)
+        self.chkIncremental.setEnabled(not checked)
+        
+    def populate_batch_layers(self):
+        """填充批量转换的图层列表，默认都不勾选"""
+        self.cboBatchLayers.clear()
+        for layer in QgsProject.instance().mapLayers().values():
+            if layer.type() == 0:  # 0表示矢量图层类型
+                add_checkable_item(self.cboBatchLayers, layer.name(), Qt.Unchecked, layer.id())
+
+    def toggle_batch_mode(self, checked):
+        """批量转换时单个图层的输入、筛选和输出设置不可用"""
+        if checked:
+            self.populate_batch_layers()
+            self.chkInPlace.setChecked(False)
+            self.chkIncremental.setChecked(False)
+            self.chkOnTheFly.setChecked(False)
+        for widget in (self.cboInputLayer, self.cboFeatureFilter, self.cboFields,
+                       self.chkGeometryOnly, self.chkInPlace, self.chkIncremental, self.chkOnTheFly):
+            widget.setEnabled(not checked)
+        self.leFilterExpression.setEnabled(not checked and self.cboFeatureFilter.currentData() == FILTER_EXPRESSION)
+        # 输出路径由输出目录代替，输出格式仍然有效
+        self.leOutputPath.setEnabled(not checked and not self.chkUseTemporaryLayer.isChecked())
+        self.btnBrowse.setEnabled(not checked and not self.chkUseTemporaryLayer.isChecked())
+
+    def select_batch_directory(self):
+        """选择批量转换的输入目录"""
+        directory = QFileDialog.getExistingDirectory(self, self.tr('Select input directory'), self.leBatchFiles.text())
+        if directory:
+            self.leBatchFiles.setText(directory)
+
+    def select_output_directory(self):
+        """选择批量转换的输出目录"""
+        directory = QFileDialog.getExistingDirectory(self, self.tr('Select output directory'), self.leOutputDir.text())
+        if directory:
+            self.leOutputDir.setText(directory)
+
+    def toggle_in_place(self, checked):
+        """原位转换时禁用所有输出设置"""
+        self.chkUseTemporaryLayer.setEnabled(not checked)
+        self.toggle_output_controls(checked or self.chkUseTemporaryLayer.isChecked())
+        self.cboFields.setEnabled(not checked and not self.chkGeometryOnly.isChecked())
+        self.chkGeometryOnly.setEnabled(not checked)
+        self.chkLoadOutput.setEnabled(not checked)
+        self.chkSpatialIndex.setEnabled(not checked)
+
+    def toggle_on_the_fly(self, checked):
+        """实时转换只添加一个转换后的视图图层，禁用输出和筛选设置"""
+        self.chkUseTemporaryLayer.setEnabled(not checked)
+        self.toggle_output_controls(checked or self.chkUseTemporaryLayer.isChecked())
+        self.cboFields.setEnabled(not checked and not self.chkGeometryOnly.isChecked())
+        for widget in (self.chkGeometryOnly, self.chkLoadOutput, self.chkSpatialIndex,
+                       self.chkInPlace, self.cboFeatureFilter, self.chkOffsetGrid):
+            widget.setEnabled(not checked)
+        self.leFilterExpression.setEnabled(not checked and self.cboFeatureFilter.currentData() == FILTER_EXPRESSION)
+
+    def toggle_incremental(self, checked):
+        """增量转换总是转换全部要素，要素筛选不可用"""
+        if checked:
+            self.cboFeatureFilter.setCurrentIndex(self.cboFeatureFilter.findData(FILTER_ALL))
+        self.cboFeatureFilter.setEnabled(not checked)
+        self.chkInPlace.setEnabled(not checked)
         
     def on_input_crs_changed(self):
         """当输入坐标系改变时，更新输出坐标系的可选状态"""
@@ -259,6 +438,11 @@ class CoordConvertDialog(QDialog, FORM_CLASS):
         self.radioButton_wgs84_in.setText(self.tr('WGS84'))
         self.radioButton_gcj02_in.setText(self.tr('GCJ02 (Mars Coordinates)'))
         self.radioButton_bd09_in.setText(self.tr('BD09 (Baidu Coordinates)'))
+        self.label_4.setText(self.tr('Features:'))
+        self.label_5.setText(self.tr('Expression:'))
+        for index, (mode, text) in enumerate(FEATURE_FILTERS):
+            if index < self.cboFeatureFilter.count():
+                self.cboFeatureFilter.setItemText(index, self.tr(text))
         
         self.groupBox_2.setTitle(self.tr('Output'))
         self.chkUseTemporaryLayer.setText(self.tr('Use Temporary Layer'))
@@ -269,7 +453,21 @@ class CoordConvertDialog(QDialog, FORM_CLASS):
         self.radioButton_wgs84_out.setText(self.tr('WGS84'))
         self.radioButton_gcj02_out.setText(self.tr('GCJ02 (Mars Coordinates)'))
         self.radioButton_bd09_out.setText(self.tr('BD09 (Baidu Coordinates)'))
+        self.label_6.setText(self.tr('Fields:'))
+        self.chkGeometryOnly.setText(self.tr('Geometry Only (No Attributes)'))
         self.chkLoadOutput.setText(self.tr('Load Output Layer When Completed'))
+        self.chkInPlace.setText(self.tr('Convert In Place (Modify Input Layer)'))
+        self.chkIncremental.setText(self.tr('Incremental (Only Rewrite Changed Features)'))
+        self.chkSpatialIndex.setText(self.tr('Create Spatial Index After Writing'))
+        self.chkOnTheFly.setText(self.tr('Convert On the Fly (View Only, No Copy)'))
+        self.chkOffsetGrid.setText(self.tr('Fast Approximate Conversion (Offset Grid, About 0.5 m)'))
+        self.groupBoxBatch.setTitle(self.tr('Batch Mode'))
+        self.label_7.setText(self.tr('Layers:'))
+        self.label_8.setText(self.tr('Files:'))
+        self.label_9.setText(self.tr('Output Directory:'))
+        self.leBatchFiles.setPlaceholderText(self.tr('Directory or wildcard, e.g. D:/data/*.shp'))
+        self.btnBrowseBatchFiles.setText(self.tr('Browse...'))
+        self.btnBrowseOutputDir.setText(self.tr('Browse...'))
         
         # 按钮
         self.btnConvert.setText(self.tr('Convert'))
@@ -0,0 +1,911 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ CoordConvert
+                                 A QGIS plugin
+ Converts coordinates between WGS84, GCJ02, and BD09
+                              -------------------
+        begin                : 2025
+ ***************************************************************************/
+ Geometry conversion engine shared by the plugin.
+"""
+
+import json
+import sqlite3
+import struct
+import tempfile
+
+from qgis.PyQt.QtCore import QByteArray, QDate, QDateTime, Qt, QTime, QVariant
+from qgis.core import QgsCoordinateTransformContext, QgsFeature, QgsFeatureRequest, QgsFields, QgsGeometry, QgsRectangle, QgsVectorDataProvider, QgsVectorFileWriter, QgsVectorLayer, QgsWkbTypes
+
+from .util.fingerprint import fingerprint
+from .util.gpkg import DEFAULT_TRANSACTION_SIZE, GeoPackageWriter
+from .util.parallel import convert_chunks
+from .util import registry
+from .util.transform import boxOutOfChina, convertBox, sourceBox
+from .util.wkb import WkbBatch, convert_wkbs
+
+try:
+    # QGIS >= 3.18
+    from qgis.core import QgsAbstractGeometryTransformer
+except ImportError:
+    QgsAbstractGeometryTransformer = None
+
+
+# 流式转换时每批读取和写入的要素数量
+DEFAULT_BATCH_SIZE = 1000
+
+# 要素筛选方式
+FILTER_ALL = 'all'
+FILTER_SELECTED = 'selected'
+FILTER_EXTENT = 'extent'
+FILTER_EXPRESSION = 'expression'
+
+
+if QgsAbstractGeometryTransformer is not None:
+    class _VertexTransformer(QgsAbstractGeometryTransformer):
+        """逐顶点调用转换函数，Z/M值原样返回"""
+
+        def __init__(self, func):
+            super().__init__()
+            self.func = func
+
+        def transformPoint(self, x, y, z, m):
+            x, y = self.func(x, y)
+            return True, x, y, z, m
+
+
+class GeometryTransformer:
+    """几何转换引擎
+
+    直接在几何的顶点上修改坐标，不再把几何拆成 QgsPointXY 列表再重建，
+    因此保留 Z/M 值以及曲线几何类型（CircularString、CompoundCurve 等）。
+
+    :param func: 坐标转换函数，接收 (x, y) 返回 (x, y)
+    :type func: callable
+    :param china_only: 转换函数是否原样返回中国范围外的坐标，为True时
+        外包矩形完全在中国范围外的几何直接复制，不访问顶点
+    :type china_only: bool
+    :param kernel: 与 func 方向相同的数组核函数，见 util.registry.kernel；
+        设置后 transform_batch() 直接修改几何WKB中的坐标，不为顶点创建Python对象
+    :type kernel: callable
+    """
+
+    def __init__(self, func, china_only=False, kernel=None):
+        self.func = func
+        self.china_only = china_only
+        self.kernel = kernel
+        # 走快速通道、未经转换直接复制的几何数量
+        self.skipped = 0
+        if QgsAbstractGeometryTransformer is not None:
+            self._vertex_transformer = _VertexTransformer(func)
+        else:
+            self._vertex_transformer = None
+
+    def transform(self, geom):
+        """返回转换后的几何，输入几何不会被修改"""
+        new_geom = QgsGeometry(geom)
+        if new_geom.isEmpty() or self.skip(new_geom):
+            return new_geom
+
+        if self._vertex_transformer is not None:
+            new_geom.transform(self._vertex_transformer)
+        else:
+            # 旧版本QGIS没有 QgsAbstractGeometryTransformer，逐个移动顶点
+            func = self.func
+            for i, vertex in enumerate(geom.vertices()):
+                x, y = func(vertex.x(), vertex.y())
+                vertex.setX(x)
+                vertex.setY(y)
+                new_geom.moveVertex(vertex, i)
+
+        return new_geom
+
+    def transform_batch(self, geoms):
+        """转换一批几何，返回转换后的几何列表，输入几何不会被修改
+
+        设置了 kernel 时，所有需要转换的几何的WKB坐标收集到一起，
+        调用一次数组核函数原地修改后用 QgsGeometry.fromWkb 重建；
+        否则逐个调用 transform()。
+        """
+        if self.kernel is None:
+            return [self.transform(geom) for geom in geoms]
+        results = []
+        pending = []
+        for geom in geoms:
+            if geom.isEmpty() or self.skip(geom):
+                results.append(QgsGeometry(geom))
+            else:
+                pending.append(len(results))
+                results.append(geom)
+        if pending:
+            buffers = convert_wkbs([bytes(results[i].asWkb()) for i in pending], self.kernel)
+            for i, buf in zip(pending, buffers):
+                results[i] = geometry_from_wkb(buf)
+        return results
+
+    def skip(self, geom):
+        """几何是否完全在中国范围外、可以跳过转换，跳过时计数"""
+        if not self.china_only or geom.isEmpty():
+            return False
+        box = geom.boundingBox()
+        if boxOutOfChina(box.xMinimum(), box.yMinimum(), box.xMaximum(), box.yMaximum()):
+            self.skipped += 1
+            return True
+        return False
+
+
+def geometry_from_wkb(wkb):
+    """由WKB创建几何"""
+    geom = QgsGeometry()
+    geom.fromWkb(bytes(wkb))
+    return geom
+
+
+def source_extent(extent, direction):
+    """把输出坐标系中的范围反投影到输入坐标系
+
+    结果按转换偏移量的局部范围扩大，包含所有转换后落在 extent 内的点，
+    可以直接交给数据提供者的空间索引筛选。
+
+    :param extent: 输出坐标系中的范围
+    :type extent: QgsRectangle
+    :param direction: (输入坐标系, 输出坐标系)
+    :type direction: tuple
+
+    :rtype: QgsRectangle
+    """
+    return QgsRectangle(*sourceBox(extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum(),
+                                   registry.conversion(*direction)))
+
+
+def converted_extent(extent, direction):
+    """输入坐标系中的范围转换后的外包范围，包含范围内所有点转换后的位置
+
+    :rtype: QgsRectangle
+    """
+    return QgsRectangle(*convertBox(extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum(),
+                                    registry.conversion(*direction)))
+
+
+def build_feature_request(layer, filter_mode=FILTER_ALL, extent=None, expression='', direction=None):
+    """创建只读取需要转换的要素的请求
+
+    筛选条件放在 QgsFeatureRequest 中，由数据提供者在读取时过滤，
+    不符合条件的要素不会传到Python。
+
+    :param layer: 输入图层
+    :type layer: QgsVectorLayer
+    :param filter_mode: FILTER_ALL、FILTER_SELECTED、FILTER_EXTENT 或 FILTER_EXPRESSION
+    :type filter_mode: str
+    :param extent: FILTER_EXTENT 使用的范围，必须是图层坐标参考系下的坐标
+    :type extent: QgsRectangle
+    :param expression: FILTER_EXPRESSION 使用的表达式
+    :type expression: str
+    :param direction: (输入坐标系, 输出坐标系)，设置时 extent 是输出坐标系中的范围，
+        先用 source_extent 反投影到输入坐标系
+    :type direction: tuple
+
+    :returns: 要素请求
+    :rtype: QgsFeatureRequest
+    """
+    request = QgsFeatureRequest()
+    if filter_mode == FILTER_SELECTED:
+        request.setFilterFids(layer.selectedFeatureIds())
+    elif filter_mode == FILTER_EXTENT:
+        if direction is not None:
+            extent = source_extent(extent, direction)
+        # 先用空间索引按外包矩形筛选，再精确判断几何是否相交
+        request.setFilterRect(extent)
+        request.setFlags(QgsFeatureRequest.ExactIntersect)
+    elif filter_mode == FILTER_EXPRESSION:
+        request.setFilterExpression(expression)
+    elif filter_mode != FILTER_ALL:
+        raise ValueError(f'unknown filter mode: {filter_mode}')
+    return request
+
+
+def select_fields(fields, names):
+    """只保留指定的字段
+
+    :param fields: 输入图层的字段
+    :type fields: QgsFields
+    :param names: 需要保留的字段名，空列表表示只输出几何
+    :type names: list
+
+    :returns: 输出字段，以及这些字段在输入字段中的索引
+    :rtype: (QgsFields, list)
+    """
+    selected = QgsFields()
+    indices = []
+    for name in names:
+        index = fields.lookupField(name)
+        if index == -1:
+            raise ValueError(f'field not found: {name}')
+        selected.append(fields.at(index))
+        indices.append(index)
+    return selected, indices
+
+
+def subset_request(request, attribute_indices):
+    """返回只读取指定字段的要素请求，不修改原请求"""
+    request = QgsFeatureRequest(request) if request is not None else QgsFeatureRequest()
+    request.setSubsetOfAttributes(attribute_indices)
+    return request
+
+
+def count_features(source, request):
+    """统计请求返回的要素数量，只读取要素ID"""
+    if request.filterType() == QgsFeatureRequest.FilterFids:
+        return len(request.filterFids())
+    id_request = QgsFeatureRequest(request)
+    id_request.setFlags(id_request.flags() | QgsFeatureRequest.NoGeometry)
+    id_request.setNoAttributes()
+    return sum(1 for _ in source.getFeatures(id_request))
+
+
+def _take_attributes(feature, attribute_indices):
+    # 只保留输出字段的属性，顺序与 select_fields 返回的字段一致
+    feature.setAttributes([feature.attribute(i) for i in attribute_indices])
+
+
+def iter_converted_batches(source, geometry_transformer, request=None, batch_size=DEFAULT_BATCH_SIZE,
+                           attribute_indices=None):
+    """从 source.getFeatures() 分批读取要素并转换几何，每次产出一批要素
+
+    :param source: 图层或任何提供 getFeatures(request) 的要素源
+    :param geometry_transformer: 几何转换引擎
+    :type geometry_transformer: GeometryTransformer
+    :param request: 要素请求，默认读取全部要素
+    :type request: QgsFeatureRequest
+    :param batch_size: 每批要素数量
+    :type batch_size: int
+    :param attribute_indices: 输出字段在输入字段中的索引，默认保留全部属性
+    :type attribute_indices: list
+    """
+    if attribute_indices is not None:
+        request = subset_request(request, attribute_indices)
+    elif request is None:
+        request = QgsFeatureRequest()
+    batch = []
+    for feature in source.getFeatures(request):
+        if attribute_indices is not None:
+            _take_attributes(feature, attribute_indices)
+        batch.append(feature)
+        if len(batch) >= batch_size:
+            yield _convert_batch(batch, geometry_transformer)
+            batch = []
+    if batch:
+        yield _convert_batch(batch, geometry_transformer)
+
+
+def _convert_batch(batch, geometry_transformer):
+    # 迭代器每次返回新的要素对象，直接替换几何即可，属性保持不变
+    geoms = geometry_transformer.transform_batch([feature.geometry() for feature in batch])
+    for feature, geom in zip(batch, geoms):
+        feature.setGeometry(geom)
+    return batch
+
+
+class _Progress:
+    """按已处理的要素数量向 feedback 报告进度
+
+    进度每增加1%才报告一次，避免频繁发送信号；没有 feedback 或 total 为0时不报告。
+    """
+
+    def __init__(self, feedback, total):
+        self.feedback = feedback if total else None
+        self.total = total
+        self.processed = 0
+        self.reported = 0
+
+    def add(self, count):
+        """又处理了 count 个要素"""
+        self.processed += count
+        if self.feedback is None:
+            return
+        progress = min(self.processed / self.total * 100, 100)
+        if int(progress) > self.reported:
+            self.reported = int(progress)
+            self.feedback.setProgress(progress)
+
+
+def convert_features(source, sink, geometry_transformer, request=None,
+                     batch_size=DEFAULT_BATCH_SIZE, total=0, feedback=None, attribute_indices=None):
+    """流式转换要素并直接写入 sink
+
+    每批要素转换后立即写入，内存中最多只保留一批要素，
+    峰值内存与图层大小无关。
+
+    :param source: 图层或任何提供 getFeatures(request) 的要素源
+    :param sink: 提供 addFeatures(features) 的对象，例如数据提供者或 QgsVectorFileWriter
+    :param geometry_transformer: 几何转换引擎
+    :type geometry_transformer: GeometryTransformer
+    :param request: 要素请求，默认读取全部要素
+    :type request: QgsFeatureRequest
+    :param batch_size: 每批要素数量
+    :type batch_size: int
+    :param total: 要素总数，用于计算进度，为0时不报告进度
+    :type total: int
+    :param feedback: 用于报告进度和取消的反馈对象，也可以是 QgsTask
+    :type feedback: QgsFeedback
+    :param attribute_indices: 输出字段在输入字段中的索引，见 select_fields，默认保留全部属性
+    :type attribute_indices: list
+
+    :returns: 已转换的要素数量，以及所有批次是否都写入成功
+    :rtype: (int, bool)
+    """
+    converted = 0
+    success = True
+    progress = _Progress(feedback, total)
+    for batch in iter_converted_batches(source, geometry_transformer, request, batch_size, attribute_indices):
+        if feedback is not None and feedback.isCanceled():
+            break
+        if not sink.addFeatures(batch):
+            success = False
+        converted += len(batch)
+        progress.add(len(batch))
+    return converted, success
+
+
+def iter_feature_id_chunks(source, request=None, chunk_size=DEFAULT_BATCH_SIZE):
+    """按要素ID排序后分块，每次产出一块要素ID
+
+    只读取要素ID，不读取几何和属性。
+    """
+    id_request = QgsFeatureRequest(request) if request is not None else QgsFeatureRequest()
+    # 保留 ExactIntersect 等标志，按范围筛选时数据提供者仍会读取几何
+    id_request.setFlags(id_request.flags() | QgsFeatureRequest.NoGeometry)
+    id_request.setNoAttributes()
+    feature_ids = sorted(feature.id() for feature in source.getFeatures(id_request))
+    for start in range(0, len(feature_ids), chunk_size):
+        yield feature_ids[start:start + chunk_size]
+
+
+def _iter_coordinate_chunks(source, request, chunk_size, prefilter=None):
+    """读取每块要素并从几何WKB中提取需要转换的顶点坐标，
+    产出 (经度数组, 纬度数组, (要素列表, 跳过标记列表, WkbBatch))
+
+    prefilter 对几何返回True时跳过该要素，不提取它的顶点；空几何同样跳过。
+    """
+    for feature_ids in iter_feature_id_chunks(source, request, chunk_size):
+        chunk_request = QgsFeatureRequest(request) if request is not None else QgsFeatureRequest()
+        chunk_request.setFilterFids(feature_ids)
+        # 数据提供者不保证按ID顺序返回，排序后保证输出顺序与工作进程数无关
+        features = sorted(source.getFeatures(chunk_request), key=lambda f: f.id())
+        skipped = []
+        wkbs = []
+        for feature in features:
+            geom = feature.geometry()
+            skip = geom.isEmpty() or (prefilter is not None and prefilter(geom))
+            skipped.append(skip)
+            if not skip:
+                wkbs.append(bytes(geom.asWkb()))
+        batch = WkbBatch(wkbs)
+        lons, lats = batch.coordinates()
+        # 整块都被跳过时坐标数组为空，不会发送给工作进程
+        yield lons, lats, (features, skipped, batch)
+
+
+def convert_features_parallel(source, sink, direction, workers, request=None,
+                              batch_size=DEFAULT_BATCH_SIZE, total=0, feedback=None, pool=None,
+                              prefilter=None, attribute_indices=None, grid_path=None):
+    """使用多个进程并行转换要素并写入 sink
+
+    要素按ID排序后分块，当前线程读取每块要素并从几何WKB中提取顶点坐标，
+    坐标交给进程池中的 util.transform 计算，再写回WKB并写入输出。
+    无论使用多少个工作进程，输出的要素顺序和坐标都相同。
+
+    :param source: 图层或任何提供 getFeatures(request) 的要素源
+    :param sink: 提供 addFeatures(features) 的对象
+    :param direction: (输入坐标系, 输出坐标系)，例如 ("WGS84", "GCJ02")
+    :type direction: tuple
+    :param workers: 工作进程数量
+    :type workers: int
+    :param request: 要素请求，默认读取全部要素
+    :type request: QgsFeatureRequest
+    :param batch_size: 每块要素数量
+    :type batch_size: int
+    :param total: 要素总数，用于计算进度，为0时不报告进度
+    :type total: int
+    :param feedback: 用于报告进度和取消的反馈对象，也可以是 QgsTask
+    :type feedback: QgsFeedback
+    :param pool: 复用的进程池，为 None 时临时创建
+    :type pool: concurrent.futures.ProcessPoolExecutor
+    :param prefilter: 对几何返回True时原样复制该要素，例如 GeometryTransformer.skip
+    :type prefilter: callable
+    :param attribute_indices: 输出字段在输入字段中的索引，见 select_fields，默认保留全部属性
+    :type attribute_indices: list
+    :param grid_path: 工作进程使用的偏移网格文件，见 util.grid.GridKernel，默认精确转换
+    :type grid_path: str
+
+    :returns: 已转换的要素数量，以及所有批次是否都写入成功
+    :rtype: (int, bool)
+    """
+    converted = 0
+    success = True
+    progress = _Progress(feedback, total)
+    if attribute_indices is not None:
+        request = subset_request(request, attribute_indices)
+    chunks = convert_chunks(direction, _iter_coordinate_chunks(source, request, batch_size, prefilter), workers,
+                            pool, grid_path)
+    try:
+        for lons, lats, (features, skipped, batch) in chunks:
+            if feedback is not None and feedback.isCanceled():
+                break
+            # 按提取时的顶点顺序写回转换后的坐标
+            batch.update(lons, lats)
+            buffers = iter(batch.buffers)
+            for feature, skip in zip(features, skipped):
+                if not skip:
+                    feature.setGeometry(geometry_from_wkb(next(buffers)))
+                if attribute_indices is not None:
+                    _take_attributes(feature, attribute_indices)
+            if not sink.addFeatures(features):
+                success = False
+            converted += len(features)
+            progress.add(len(features))
+    finally:
+        chunks.close()
+    return converted, success
+
+
+class _GeometryJournal:
+    """把原始几何以WKB形式追加到临时文件，回滚时再分批读回
+
+    记录保存在磁盘上，内存占用与转换的要素数量无关。
+    """
+
+    _RECORD = struct.Struct('<qI')
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.count = 0
+
+    def record(self, fid, geom):
+        wkb = bytes(geom.asWkb())
+        self.file.write(self._RECORD.pack(fid, len(wkb)))
+        self.file.write(wkb)
+        self.count += 1
+
+    def iter_batches(self, batch_size):
+        """按记录顺序产出 {要素ID: 原始几何}"""
+        self.file.seek(0)
+        batch = {}
+        for _ in range(self.count):
+            fid, size = self._RECORD.unpack(self.file.read(self._RECORD.size))
+            geom = QgsGeometry()
+            if size:
+                geom.fromWkb(self.file.read(size))
+            batch[fid] = geom
+            if len(batch) >= batch_size:
+                yield batch
+                batch = {}
+        if batch:
+            yield batch
+
+    def close(self):
+        self.file.close()
+
+
+def convert_in_place(source, provider, geometry_transformer, request=None,
+                     batch_size=DEFAULT_BATCH_SIZE, total=0, feedback=None):
+    """原位转换，把转换后的几何分批写回输入图层的数据提供者
+
+    每批要素先按ID全部读出，再调用一次 changeGeometryValues 写回，
+    数据提供者在一个事务中提交每一批，读取和写入不会交叉进行。
+    原始几何在写入前记录到临时文件中；任何一批写入失败或任务被取消时，
+    已提交的批次按记录恢复，图层保持转换前的状态。
+    几何没有变化的要素（例如完全在中国范围外）不会写回。
+    写入绕过图层的编辑缓冲，完成后无法通过撤销恢复。
+
+    :param source: 输入图层的要素源
+    :param provider: 输入图层的数据提供者，需要支持 ChangeGeometries
+    :type provider: QgsVectorDataProvider
+    :param geometry_transformer: 几何转换引擎
+    :type geometry_transformer: GeometryTransformer
+    :param request: 要素请求，默认转换全部要素
+    :type request: QgsFeatureRequest
+    :param batch_size: 每批要素数量
+    :type batch_size: int
+    :param total: 要素总数，用于计算进度，为0时不报告进度
+    :type total: int
+    :param feedback: 用于报告进度和取消的反馈对象，也可以是 QgsTask
+    :type feedback: QgsFeedback
+
+    :returns: 已转换的要素数量，回滚后为0；以及是否全部写入成功
+    :rtype: (int, bool)
+    :raises RuntimeError: 写入失败且回滚也失败时
+    """
+    # 原位转换只需要几何
+    geometry_request = QgsFeatureRequest(request) if request is not None else QgsFeatureRequest()
+    geometry_request.setNoAttributes()
+    converted = 0
+    progress = _Progress(feedback, total)
+    journal = _GeometryJournal()
+    try:
+        for feature_ids in iter_feature_id_chunks(source, request, batch_size):
+            if feedback is not None and feedback.isCanceled():
+                break
+            chunk_request = QgsFeatureRequest(geometry_request)
+            chunk_request.setFilterFids(feature_ids)
+            changed_ids = []
+            geoms = []
+            for feature in list(source.getFeatures(chunk_request)):
+                geom = feature.geometry()
+                if geom.isEmpty() or geometry_transformer.skip(geom):
+                    continue
+                journal.record(feature.id(), geom)
+                changed_ids.append(feature.id())
+                geoms.append(geom)
+            changes = dict(zip(changed_ids, geometry_transformer.transform_batch(geoms)))
+            if changes and not provider.changeGeometryValues(changes):
+                _rollback(provider, journal, batch_size)
+                return 0, False
+            # 跳过的要素计入进度，但不计入已转换的数量
+            converted += len(changes)
+            progress.add(len(feature_ids))
+        if feedback is not None and feedback.isCanceled():
+            _rollback(provider, journal, batch_size)
+            return 0, True
+        return converted, True
+    finally:
+        journal.close()
+
+
+def _rollback(provider, journal, batch_size):
+    # 失败的批次可能已部分写入，它的原始几何同样在记录中，一并恢复
+    for batch in journal.iter_batches(batch_size):
+        if not provider.changeGeometryValues(batch):
+            raise RuntimeError('failed to restore the original geometries: ' + '; '.join(provider.errors()))
+
+
+def _attribute_bytes(value):
+    # 类型标记加规范化的值：NULL、数字0和空字符串各不相同；与 repr() 不同，结果不随PyQt版本变化
+    value = _sqlite_value(value)
+    if value is None:
+        return b'N'
+    if isinstance(value, bytes):
+        return b'b' + value
+    if isinstance(value, str):
+        return b's' + value.encode('utf-8')
+    if isinstance(value, float):
+        # repr(float) 是能精确还原的最短表示
+        return b'f' + repr(float(value)).encode('ascii')
+    return b'i' + str(int(value)).encode('ascii')
+
+
+def feature_fingerprint(feature):
+    """要素几何WKB和属性值的指纹，几何或任何属性变化时指纹都会变化"""
+    return fingerprint(bytes(feature.geometry().asWkb()),
+                       *[_attribute_bytes(value) for value in feature.attributes()])
+
+
+def convert_incremental(source, provider, geometry_transformer, index,
+                        batch_size=DEFAULT_BATCH_SIZE, total=0, feedback=None, attribute_indices=None):
+    """增量转换，只转换和重写上次转换后新增、修改或删除的要素
+
+    index 记录了上次转换时每个输入要素的指纹和对应的输出要素ID。
+    指纹不变的要素直接跳过；新增的要素转换后添加到输出，修改的要素
+    转换后覆盖对应的输出要素，输入中已不存在的要素从输出中删除。
+    每批写入输出后立即提交索引；任务被取消时不删除任何要素，
+    下次运行会从中断处继续。
+
+    输出属性按字段名对应，GeoPackage 等格式额外的 fid 字段由数据源自动生成。
+
+    :param source: 输入图层的要素源，必须读取全部要素，否则未读取的要素会被当作已删除
+    :param provider: 上次转换输出的数据提供者，要素ID必须稳定，例如 GeoPackage
+    :type provider: QgsVectorDataProvider
+    :param geometry_transformer: 几何转换引擎
+    :type geometry_transformer: GeometryTransformer
+    :param index: 指纹索引
+    :type index: util.fingerprint.FingerprintIndex
+    :param batch_size: 每批要素数量
+    :type batch_size: int
+    :param total: 要素总数，用于计算进度，为0时不报告进度
+    :type total: int
+    :param feedback: 用于报告进度和取消的反馈对象，也可以是 QgsTask
+    :type feedback: QgsFeedback
+    :param attribute_indices: 输出字段在输入字段中的索引，见 select_fields，默认保留全部属性
+    :type attribute_indices: list
+
+    :returns: 新增、修改、删除和未变化的要素数量
+    :rtype: (int, int, int, int)
+    :raises RuntimeError: 写入输出失败时
+    """
+    request = subset_request(None, attribute_indices) if attribute_indices is not None else QgsFeatureRequest()
+    output_fields = provider.fields()
+    added = changed = deleted = unchanged = 0
+    progress = _Progress(feedback, total)
+    mapping = None
+
+    def write(batch):
+        nonlocal added, changed, unchanged, mapping
+        if attribute_indices is not None:
+            for feature in batch:
+                _take_attributes(feature, attribute_indices)
+        if mapping is None:
+            # 输入属性序号 -> 输出字段序号
+            mapping = [output_fields.lookupField(field.name()) for field in batch[0].fields()]
+            if attribute_indices is not None:
+                mapping = [mapping[i] for i in attribute_indices]
+        fingerprints = {feature.id(): feature_fingerprint(feature) for feature in batch}
+        known = index.lookup(fingerprints)
+        index.mark_seen(fingerprints)
+
+        new_features = []
+        new_ids = []
+        geometry_changes = {}
+        attribute_changes = {}
+        rows = []
+        pending = []
+        for feature in batch:
+            entry = known.get(feature.id())
+            if entry is not None and entry[0] == fingerprints[feature.id()]:
+                unchanged += 1
+            else:
+                pending.append((feature, entry))
+        geoms = geometry_transformer.transform_batch([feature.geometry() for feature, _ in pending])
+        for (feature, entry), geom in zip(pending, geoms):
+            fid = feature.id()
+            values = feature.attributes()
+            if entry is None:
+                out_feature = QgsFeature(output_fields)
+                out_feature.setGeometry(geom)
+                for value, out_index in zip(values, mapping):
+                    if out_index != -1:
+                        out_feature.setAttribute(out_index, value)
+                new_features.append(out_feature)
+                new_ids.append(fid)
+            else:
+                out_fid = entry[1]
+                geometry_changes[out_fid] = geom
+                attribute_changes[out_fid] = {out_index: value for value, out_index in zip(values, mapping) if out_index != -1}
+                rows.append((fid, fingerprints[fid], out_fid))
+
+        if new_features:
+            ok, written = provider.addFeatures(new_features)
+            if not ok:
+                raise RuntimeError('; '.join(provider.errors()) or 'failed to add features')
+            rows.extend((fid, fingerprints[fid], out_feature.id()) for fid, out_feature in zip(new_ids, written))
+            added += len(new_features)
+        if geometry_changes:
+            if not provider.changeFeatures(attribute_changes, geometry_changes):
+                raise RuntimeError('; '.join(provider.errors()) or 'failed to change features')
+            changed += len(geometry_changes)
+        index.update(rows)
+        index.commit()
+
+    batch = []
+    for feature in source.getFeatures(request):
+        if feedback is not None and feedback.isCanceled():
+            return added, changed, deleted, unchanged
+        batch.append(feature)
+        if len(batch) >= batch_size:
+            write(batch)
+            progress.add(len(batch))
+            batch = []
+    if batch:
+        write(batch)
+    if feedback is not None and feedback.isCanceled():
+        return added, changed, deleted, unchanged
+
+    # 输入中已不存在的要素
+    stale = index.stale()
+    if stale:
+        if not provider.deleteFeatures([out_fid for _, out_fid in stale]):
+            raise RuntimeError('; '.join(provider.errors()) or 'failed to delete features')
+        index.remove([fid for fid, _ in stale])
+        index.commit()
+        deleted = len(stale)
+    return added, changed, deleted, unchanged
+
+
+def create_memory_layer(name, wkb_type, crs, fields):
+    """创建与输入图层结构相同的内存图层
+
+    使用原始图层的完整WKB类型，保留Z/M值和曲线类型。
+    """
+    geometry_name = QgsWkbTypes.displayString(wkb_type)
+    layer = QgsVectorLayer(f"{geometry_name}?crs={crs.authid()}", name, "memory")
+    layer.dataProvider().addAttributes(fields)
+    layer.updateFields()
+    return layer
+
+
+def create_file_writer(output_path, driver_name, fields, wkb_type, crs, transform_context=None, layer_options=None):
+    """创建输出文件的写入器
+
+    写入器只创建一次，转换后的要素直接流式写入；释放写入器的最后一个引用时
+    会刷新缓冲区并关闭文件，不需要重新打开文件或等待文件系统。
+
+    :param output_path: 输出文件路径
+    :type output_path: str
+    :param driver_name: OGR驱动名称，例如 "ESRI Shapefile"、"GPKG"
+    :type driver_name: str
+    :param fields: 输出字段
+    :type fields: QgsFields
+    :param wkb_type: 输出几何类型
+    :type wkb_type: QgsWkbTypes.Type
+    :param crs: 输出坐标参考系
+    :type crs: QgsCoordinateReferenceSystem
+    :param transform_context: 坐标转换上下文
+    :type transform_context: QgsCoordinateTransformContext
+    :param layer_options: OGR图层创建选项，例如 ["SPATIAL_INDEX=NO"]
+    :type layer_options: list
+
+    :returns: 写入器和错误信息，创建失败时写入器为 None
+    :rtype: (QgsVectorFileWriter, str)
+    """
+    if transform_context is None:
+        transform_context = QgsCoordinateTransformContext()
+
+    if hasattr(QgsVectorFileWriter, 'create'):
+        # QGIS >= 3.10
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = driver_name
+        options.fileEncoding = 'UTF-8'
+        options.layerOptions = layer_options or []
+        writer = QgsVectorFileWriter.create(output_path, fields, wkb_type, crs, transform_context, options)
+    else:
+        writer = QgsVectorFileWriter(output_path, 'UTF-8', fields, wkb_type, crs, driver_name,
+                                     [], layer_options or [])
+
+    if writer.hasError() != QgsVectorFileWriter.NoError:
+        return None, writer.errorMessage()
+    return writer, ''
+
+
+def _sqlite_value(value):
+    # 属性值转换为 sqlite3 支持的类型，格式与OGR写入GeoPackage时相同；只有NULL转换为None
+    if isinstance(value, QVariant):
+        # NULL 以及 PyQt 未能转换为Python对象的值
+        if value.isNull() or not value.isValid():
+            return None
+        return _sqlite_value(value.value())
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, QDateTime):
+        # GeoPackage 要求日期时间使用UTC并以 Z 结尾
+        return value.toUTC().toString('yyyy-MM-ddTHH:mm:ss.zzz') + 'Z' if value.isValid() else None
+    if isinstance(value, QDate):
+        return value.toString(Qt.ISODate) if value.isValid() else None
+    if isinstance(value, QTime):
+        return value.toString('HH:mm:ss.zzz') if value.isValid() else None
+    if isinstance(value, QByteArray):
+        return bytes(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_sqlite_value)
+    if isinstance(value, (int, float, str, bytes)):
+        return value
+    # 其他类型（例如 QgsGeometry、QgsInterval）按文本保存
+    return str(value)
+
+
+class GeoPackageSink:
+    """直接写入GeoPackage文件的输出，提供与 QgsVectorFileWriter 相同的 addFeatures()
+
+    输出文件先由 create_geopackage 创建（不创建空间索引），之后通过 sqlite3
+    在大事务中批量插入，几何编码为GeoPackage二进制，不经过OGR逐个写入要素。
+    写入完成后必须调用 close()，出错时调用 abort()。
+
+    :param output_path: create_geopackage 创建的输出文件
+    :type output_path: str
+    :param fields: 输出字段，顺序与要素属性一致
+    :type fields: QgsFields
+    :param wkb_type: 输出表声明的几何类型，几何写入前转换为该类型（单部件转多部件、补充或去掉Z/M值），
+        与 QgsVectorFileWriter 的行为一致
+    :type wkb_type: QgsWkbTypes.Type
+    :param transaction_size: 每个事务插入的要素数量
+    :type transaction_size: int
+    """
+
+    def __init__(self, output_path, fields, wkb_type, transaction_size=DEFAULT_TRANSACTION_SIZE):
+        self.writer = GeoPackageWriter(output_path, fields.names(), transaction_size)
+        self.wkb_type = wkb_type
+        # 最近一次写入失败的原因
+        self.error_message = ''
+
+    def addFeatures(self, features):
+        """写入一批要素，SQLite报错时返回False，错误信息见 errorMessage()"""
+        rows = []
+        for feature in features:
+            values = [_sqlite_value(value) for value in feature.attributes()]
+            geom = feature.geometry()
+            if geom.isNull():
+                rows.append((None, None, values))
+                continue
+            geom = coerce_geometry(geom, self.wkb_type)
+            if geom.isEmpty():
+                rows.append((bytes(geom.asWkb()), None, values))
+            else:
+                box = geom.boundingBox()
+                envelope = (box.xMinimum(), box.xMaximum(), box.yMinimum(), box.yMaximum())
+                rows.append((bytes(geom.asWkb()), envelope, values))
+        try:
+            self.writer.add(rows)
+        except sqlite3.Error as e:
+            self.error_message = str(e)
+            return False
+        return True
+
+    def errorMessage(self):
+        return self.error_message
+
+    def close(self):
+        self.writer.close()
+
+    def abort(self):
+        self.writer.abort()
+
+
+def coerce_geometry(geom, wkb_type):
+    """把几何转换为输出表声明的几何类型
+
+    :raises ValueError: 多部件几何无法放入单部件类型的表时
+    :rtype: QgsGeometry
+    """
+    if geom.isEmpty() or geom.wkbType() == wkb_type:
+        return geom
+    if hasattr(geom, 'coerceToType'):
+        # QGIS >= 3.14
+        parts = geom.coerceToType(wkb_type)
+        if len(parts) != 1:
+            raise ValueError(f'cannot store a {QgsWkbTypes.displayString(geom.wkbType())} geometry '
+                             f'as {QgsWkbTypes.displayString(wkb_type)}')
+        return parts[0]
+    geom = QgsGeometry(geom)
+    if QgsWkbTypes.isMultiType(wkb_type):
+        geom.convertToMultiType()
+    elif QgsWkbTypes.isMultiType(geom.wkbType()) and not geom.convertToSingleType():
+        raise ValueError(f'cannot store a {QgsWkbTypes.displayString(geom.wkbType())} geometry '
+                         f'as {QgsWkbTypes.displayString(wkb_type)}')
+    abstract = geom.get()
+    if QgsWkbTypes.hasZ(wkb_type):
+        abstract.addZValue(0)
+    else:
+        abstract.dropZValue()
+    if QgsWkbTypes.hasM(wkb_type):
+        abstract.addMValue(0)
+    else:
+        abstract.dropMValue()
+    return geom
+
+
+def create_geopackage(output_path, fields, wkb_type, crs, transform_context=None):
+    """创建空的GeoPackage输出文件，供 GeoPackageSink 写入
+
+    :returns: 错误信息，创建成功时为空字符串
+    :rtype: str
+    """
+    writer, error_msg = create_file_writer(output_path, 'GPKG', fields, wkb_type, crs, transform_context,
+                                           layer_options=['SPATIAL_INDEX=NO'])
+    # 释放写入器，关闭空的输出文件
+    del writer
+    return error_msg
+
+
+def build_spatial_index(provider):
+    """写入全部要素后一次性创建空间索引，比写入时逐个更新索引快得多
+
+    内存图层创建内存中的索引，Shapefile 创建 .qix 文件，GeoPackage 创建 R 树。
+
+    :param provider: 输出的数据提供者
+    :type provider: QgsVectorDataProvider
+
+    :returns: 是否创建成功，数据源不支持空间索引时返回False
+    :rtype: bool
+    """
+    if not provider.capabilities() & QgsVectorDataProvider.CreateSpatialIndex:
+        return False
+    return provider.createSpatialIndex()
+
+
+def create_spatial_index(output_path):
+    """为已关闭的输出文件创建空间索引，见 build_spatial_index"""
+    layer = QgsVectorLayer(output_path, '', 'ogr')
+    if not layer.isValid():
+        return False
+    return build_spatial_index(layer.dataProvider())
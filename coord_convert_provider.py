@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ ConvertedDataProvider
+                                 A QGIS plugin
+ Converts coordinates between WGS84, GCJ02, and BD09
+                              -------------------
+        begin                : 2025
+ ***************************************************************************/
+ Read-only data provider that converts the features of another layer on the fly.
+"""
+
+import sys
+from collections import deque
+from itertools import islice
+from urllib.parse import parse_qs, urlencode
+
+from qgis.core import (QgsAbstractFeatureIterator, QgsAbstractFeatureSource, QgsCoordinateReferenceSystem,
+                       QgsCoordinateTransform, QgsCsException, QgsDataProvider, QgsFeature, QgsFeatureIterator,
+                       QgsFeatureRequest, QgsProviderRegistry, QgsVectorDataProvider)
+
+from .coord_convert_engine import GeometryTransformer, converted_extent, source_extent
+from .util import registry
+
+try:
+    # QGIS >= 3.10，Python 实现的数据提供者需要通过元数据注册
+    from qgis.core import QgsProviderMetadata
+except ImportError:
+    QgsProviderMetadata = None
+
+
+PROVIDER_KEY = 'coordconvert'
+
+# 每次从源图层读取并一起转换的要素数量
+FETCH_BATCH_SIZE = 256
+
+
+def build_uri(layer, input_crs, output_crs):
+    """创建把 layer 从 input_crs 实时转换到 output_crs 的数据源URI
+
+    :param layer: 源图层
+    :type layer: QgsVectorLayer
+    :param input_crs: 源图层的坐标系，例如 "WGS84"
+    :type input_crs: str
+    :param output_crs: 显示的坐标系，例如 "GCJ02"
+    :type output_crs: str
+
+    :returns: 数据源URI
+    :rtype: str
+    """
+    return urlencode({
+        'provider': layer.providerType(),
+        'source': layer.source(),
+        'from': input_crs,
+        'to': output_crs,
+    })
+
+
+def _create_provider(uri, providerOptions, flags=QgsDataProvider.ReadFlags()):
+    # 数据提供者注册后无法注销，插件重新加载后注册表中仍是第一次注册的这个函数；
+    # 按模块名查找当前加载的类，新建的图层总是使用重新加载后的代码
+    module = sys.modules.get(__name__)
+    provider_class = getattr(module, 'ConvertedDataProvider', ConvertedDataProvider)
+    return provider_class.createProvider(uri, providerOptions, flags)
+
+
+def register_provider():
+    """注册实时转换的数据提供者，已注册或QGIS版本不支持时不重复注册
+
+    注册的创建函数总是使用当前加载的 ConvertedDataProvider，插件重新加载后无需重新注册。
+
+    :returns: 数据提供者是否可用
+    :rtype: bool
+    """
+    if QgsProviderMetadata is None:
+        return False
+    provider_registry = QgsProviderRegistry.instance()
+    if PROVIDER_KEY not in provider_registry.providerList():
+        metadata = QgsProviderMetadata(PROVIDER_KEY, ConvertedDataProvider.description(), _create_provider)
+        provider_registry.registerProvider(metadata)
+    return True
+
+
+class ConvertedFeatureSource(QgsAbstractFeatureSource):
+    """源图层要素源的快照，可以在渲染线程中读取"""
+
+    def __init__(self, provider):
+        super().__init__()
+        self.source = provider.source_provider.featureSource()
+        self.direction = provider.direction
+        self.crs = provider.crs()
+
+    def getFeatures(self, request=QgsFeatureRequest()):
+        return QgsFeatureIterator(ConvertedFeatureIterator(self, request))
+
+
+class ConvertedFeatureIterator(QgsAbstractFeatureIterator):
+    """读取源图层的要素并转换几何
+
+    请求的范围先反投影到源坐标系（见 source_extent）再交给源图层，由源图层的空间索引筛选；
+    转换后的几何再按原始范围精确筛选。要素按批读取，每批调用一次数组核函数转换。
+    """
+
+    def __init__(self, source, request):
+        super().__init__(request)
+        self._transform = QgsCoordinateTransform()
+        if request.destinationCrs().isValid() and request.destinationCrs() != source.crs:
+            self._transform = QgsCoordinateTransform(source.crs, request.destinationCrs(), request.transformContext())
+        self._buffer = deque()
+        self._iterator = None
+        try:
+            self._filter_rect = self.filterRectToSourceCrs(self._transform)
+        except QgsCsException:
+            self.close()
+            return
+        input_crs, output_crs = source.direction
+        self._geometry_transformer = GeometryTransformer(
+            registry.conversion(input_crs, output_crs),
+            china_only=registry.china_only(input_crs, output_crs),
+            kernel=registry.kernel(input_crs, output_crs))
+        self._exact = bool(request.flags() & QgsFeatureRequest.ExactIntersect)
+        self._no_geometry = bool(request.flags() & QgsFeatureRequest.NoGeometry)
+
+        source_request = QgsFeatureRequest(request)
+        # 源图层返回原始坐标，坐标参考系转换在转换几何之后进行
+        source_request.setDestinationCrs(QgsCoordinateReferenceSystem(), request.transformContext())
+        flags = request.flags() & ~QgsFeatureRequest.ExactIntersect
+        if not self._filter_rect.isNull():
+            # 按范围筛选需要转换后的几何
+            flags &= ~QgsFeatureRequest.NoGeometry
+            source_request.setFilterRect(source_extent(self._filter_rect, source.direction))
+        source_request.setFlags(flags)
+        self._iterator = source.source.getFeatures(source_request)
+
+    def _fill(self):
+        batch = list(islice(self._iterator, FETCH_BATCH_SIZE))
+        if not batch:
+            return False
+        if self._no_geometry and self._filter_rect.isNull():
+            self._buffer = deque(batch)
+            return True
+        geoms = self._geometry_transformer.transform_batch([feature.geometry() for feature in batch])
+        rect = self._filter_rect
+        for feature, geom in zip(batch, geoms):
+            if not rect.isNull():
+                if self._exact and not geom.intersects(rect):
+                    continue
+                if not self._exact and not geom.boundingBox().intersects(rect):
+                    continue
+            feature.setGeometry(geom)
+            self._buffer.append(feature)
+        return True
+
+    def fetchFeature(self, f):
+        if self._iterator is None:
+            return False
+        while not self._buffer:
+            if not self._fill():
+                return False
+        feature = self._buffer.popleft()
+        f.setId(feature.id())
+        f.setFields(feature.fields())
+        f.setAttributes(feature.attributes())
+        if self._no_geometry:
+            f.clearGeometry()
+        else:
+            f.setGeometry(feature.geometry())
+            self.geometryToDestination(f, self._transform)
+        f.setValid(True)
+        return True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        f = QgsFeature()
+        if not self.nextFeature(f):
+            raise StopIteration
+        return f
+
+    def rewind(self):
+        if self._iterator is None:
+            return False
+        self._buffer.clear()
+        return self._iterator.rewind()
+
+    def close(self):
+        self._buffer.clear()
+        if self._iterator is not None:
+            self._iterator.close()
+            self._iterator = None
+        return True
+
+
+class ConvertedDataProvider(QgsVectorDataProvider):
+    """只读的数据提供者，显示另一个图层实时转换后的要素，不写出任何副本
+
+    数据源URI由 build_uri 创建，包含源图层的数据提供者、数据源以及转换方向。
+    渲染时只有当前范围内的要素会被读取和转换。
+    """
+
+    @classmethod
+    def providerKey(cls):
+        return PROVIDER_KEY
+
+    @classmethod
+    def description(cls):
+        return 'Chinese coordinate on-the-fly conversion'
+
+    @classmethod
+    def createProvider(cls, uri, providerOptions, flags=QgsDataProvider.ReadFlags()):
+        return ConvertedDataProvider(uri, providerOptions, flags)
+
+    def __init__(self, uri='', providerOptions=QgsDataProvider.ProviderOptions(), flags=QgsDataProvider.ReadFlags()):
+        super().__init__(uri)
+        self._uri = uri
+        params = {key: values[0] for key, values in parse_qs(uri).items()}
+        self.direction = (params.get('from'), params.get('to'))
+        self.source_provider = None
+        if params.get('provider') and params.get('source') and all(self.direction):
+            self.source_provider = QgsProviderRegistry.instance().createProvider(
+                params['provider'], params['source'], providerOptions)
+        self._valid = (self.source_provider is not None and self.source_provider.isValid()
+                       and all(system in registry.SYSTEMS for system in self.direction))
+        self._extent = None
+
+    def isValid(self):
+        return self._valid
+
+    def name(self):
+        return self.providerKey()
+
+    def dataSourceUri(self, expandAuthConfig=True):
+        return self._uri
+
+    def storageType(self):
+        return self.source_provider.storageType() if self._valid else ''
+
+    def featureSource(self):
+        return ConvertedFeatureSource(self)
+
+    def getFeatures(self, request=QgsFeatureRequest()):
+        return QgsFeatureIterator(ConvertedFeatureIterator(ConvertedFeatureSource(self), request))
+
+    def wkbType(self):
+        return self.source_provider.wkbType()
+
+    def featureCount(self):
+        return self.source_provider.featureCount()
+
+    def fields(self):
+        return self.source_provider.fields()
+
+    def crs(self):
+        return self.source_provider.crs()
+
+    def extent(self):
+        if self._extent is None:
+            extent = self.source_provider.extent()
+            self._extent = extent if extent.isNull() else converted_extent(extent, self.direction)
+        return self._extent
+
+    def updateExtents(self):
+        self.source_provider.updateExtents()
+        self._extent = None
+
+    def capabilities(self):
+        return QgsVectorDataProvider.SelectAtId
+
+    def subsetString(self):
+        return ''
+
+    def supportsSubsetString(self):
+        return False
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ CoordConvertTask
+                                 A QGIS plugin
+ Converts coordinates between WGS84, GCJ02, and BD09
+                              -------------------
+        begin                : 2025
+ ***************************************************************************/
+"""
+
+import os
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import QgsDataProvider, QgsProject, QgsProviderRegistry, QgsTask, QgsVectorFileWriter, QgsVectorLayer, QgsVectorLayerFeatureSource
+
+from .coord_convert_engine import DEFAULT_BATCH_SIZE, GeoPackageSink, build_spatial_index, convert_features, convert_features_parallel, convert_in_place, convert_incremental, count_features, create_file_writer, create_geopackage, create_memory_layer, create_spatial_index, select_fields
+from .util.fingerprint import FingerprintIndex, index_path
+from .util.grid import open_grid
+
+
+class CoordConvertTask(QgsTask):
+    """在QGIS任务管理器的后台线程中执行坐标转换
+
+    所有需要访问图层或项目的对象都在构造函数（主线程）中准备好，
+    run() 只读取要素源并写入输出。转换结果在 finished() 之后
+    通过 output_layer、converted、success、error 等属性在主线程读取。
+
+    :param description: 任务描述
+    :type description: str
+    :param input_layer: 输入图层
+    :type input_layer: QgsVectorLayer
+    :param geometry_transformer: 几何转换引擎
+    :type geometry_transformer: GeometryTransformer
+    :param output_layer_name: 临时图层名称，output_path 为空时使用
+    :type output_layer_name: str
+    :param output_path: 输出文件路径，为空时输出到临时图层
+    :type output_path: str
+    :param output_format: 输出文件的OGR驱动名称
+    :type output_format: str
+    :param transform_context: 坐标转换上下文
+    :type transform_context: QgsCoordinateTransformContext
+    :param batch_size: 每批要素数量
+    :type batch_size: int
+    :param direction: (输入坐标系, 输出坐标系)，并行转换时使用
+    :type direction: tuple
+    :param workers: 工作进程数量，大于1时使用多进程并行转换
+    :type workers: int
+    :param request: 要素请求，只转换请求返回的要素，默认转换全部要素
+    :type request: QgsFeatureRequest
+    :param attributes: 输出的字段名，空列表表示只输出几何，默认输出全部字段
+    :type attributes: list
+    :param in_place: 为True时不创建输出，直接修改输入图层的几何；修改绕过图层的编辑缓冲，
+        不能撤销。数据提供者不是线程安全的，后台线程通过单独打开的数据提供者写入，
+        任务结束后在 finished() 中重新加载输入图层。内存图层无法再次打开，不支持原位转换
+    :type in_place: bool
+    :param pool: 并行转换时复用的进程池，为 None 时每次转换临时创建
+    :type pool: concurrent.futures.ProcessPoolExecutor
+    :param incremental: 为True时复用上次转换的输出文件，只重写变化的要素，
+        输出格式需要有稳定的要素ID（GeoPackage）；增量转换总是读取全部要素，忽略 request
+    :type incremental: bool
+    :param spatial_index: 是否在写入全部要素后一次性创建空间索引，需要在地图上浏览或查询
+        的输出应创建，中间结果可以不创建；原位转换时不使用
+    :type spatial_index: bool
+    :param grid_path: 偏移网格文件，并行转换时工作进程通过它近似转换，见 util.grid.GridKernel；
+        网格文件不存在时在后台线程中创建
+    :type grid_path: str
+    """
+
+    def __init__(self, description, input_layer, geometry_transformer,
+                 output_layer_name='', output_path='', output_format='',
+                 transform_context=None, batch_size=DEFAULT_BATCH_SIZE,
+                 direction=None, workers=1, request=None, attributes=None, in_place=False,
+                 pool=None, incremental=False, spatial_index=True, grid_path=None):
+        super().__init__(description, QgsTask.CanCancel)
+        # 要素源必须在主线程中创建，之后才能在后台线程中安全读取
+        self.source = QgsVectorLayerFeatureSource(input_layer)
+        self.fields = input_layer.fields()
+        # 只读取和写入需要的字段，未使用的字段不会从数据源读取
+        self.attribute_indices = None
+        if attributes is not None:
+            self.fields, self.attribute_indices = select_fields(self.fields, attributes)
+        self.crs = input_layer.crs()
+        self.wkb_type = input_layer.wkbType()
+        self.request = request
+        self.in_place = in_place
+        # 原位转换在后台线程中按数据源重新打开一个数据提供者写入，不使用图层自己的数据提供者
+        self.provider_type = input_layer.providerType()
+        self.provider_uri = input_layer.source()
+        # 只保存图层ID，任务运行期间图层可能被移除
+        self.input_layer_id = input_layer.id()
+        # 有筛选条件时在 run() 中统计要素数量
+        self.total = input_layer.featureCount() if request is None else 0
+
+        self.geometry_transformer = geometry_transformer
+        self.output_layer_name = output_layer_name
+        self.output_path = output_path
+        self.output_format = output_format
+        self.transform_context = transform_context
+        self.batch_size = batch_size
+        self.direction = direction
+        self.workers = workers
+        self.pool = pool
+        self.incremental = incremental
+        self.spatial_index = spatial_index
+        self.grid_path = grid_path
+
+        # 转换结果
+        self.output_layer = None
+        self.converted = 0
+        # 完全在中国范围外、直接复制的要素数量
+        self.skipped = 0
+        # 增量转换的新增、修改、删除和未变化的要素数量
+        self.incremental_counts = None
+        self.success = False
+        # 出错时为 (错误类型, 详细信息)，错误类型是未翻译的消息文本
+        self.error = None
+
+    def run(self):
+        """在后台线程中执行转换"""
+        # QgsTask 本身提供 setProgress() 和 isCanceled()，可以直接作为反馈对象
+        return self.execute(self)
+
+    def finished(self, result):
+        """在主线程中执行，原位转换后（无论成功、失败或取消）刷新输入图层"""
+        if not self.in_place:
+            return
+        input_layer = QgsProject.instance().mapLayer(self.input_layer_id)
+        if input_layer is not None:
+            # 几何直接写入了数据提供者（或已回滚），图层缓存的范围和渲染结果需要更新
+            input_layer.reload()
+            input_layer.updateExtents()
+            input_layer.triggerRepaint()
+
+    def execute(self, feedback):
+        """执行转换，通过 feedback 报告进度和检查取消
+
+        批量转换时由 BatchConvertTask 在它的后台线程中依次调用。
+
+        :param feedback: 提供 setProgress() 和 isCanceled() 的对象
+        :returns: 是否成功完成
+        :rtype: bool
+        """
+        if self.grid_path is not None:
+            # 在这里打开（必要时创建）网格，工作进程和转换引擎之后直接映射同一个文件
+            try:
+                open_grid(self.grid_path)
+            except Exception as e:
+                self.error = ('Cannot create the offset grid', str(e))
+                return False
+        if self.in_place:
+            return self.run_in_place(feedback)
+        if self.incremental:
+            return self.run_incremental(feedback)
+
+        writer = None
+        gpkg_sink = None
+        try:
+            if self.output_path and self.output_format == 'GPKG':
+                # GeoPackage 由 sqlite3 直接批量写入
+                error_msg = create_geopackage(self.output_path, self.fields, self.wkb_type,
+                                              self.crs, self.transform_context)
+                if error_msg:
+                    self.error = ('Error creating output file', error_msg)
+                    return False
+                sink = gpkg_sink = GeoPackageSink(self.output_path, self.fields, self.wkb_type)
+            elif self.output_path:
+                writer, error_msg = create_file_writer(
+                    self.output_path, self.output_format, self.fields,
+                    self.wkb_type, self.crs, self.transform_context)
+                if writer is None:
+                    self.error = ('Error creating output file', error_msg)
+                    return False
+                sink = writer
+            else:
+                self.output_layer = create_memory_layer(
+                    self.output_layer_name, self.wkb_type, self.crs, self.fields)
+                sink = self.output_layer.dataProvider()
+
+            if self.request is not None:
+                self.total = count_features(self.source, self.request)
+
+            if self.workers > 1 and self.direction is not None:
+                self.converted, self.success = convert_features_parallel(
+                    self.source, sink, self.direction, self.workers, request=self.request,
+                    batch_size=self.batch_size, total=self.total, feedback=feedback, pool=self.pool,
+                    prefilter=self.geometry_transformer.skip, attribute_indices=self.attribute_indices,
+                    grid_path=self.grid_path)
+            else:
+                self.converted, self.success = convert_features(
+                    self.source, sink, self.geometry_transformer, request=self.request,
+                    batch_size=self.batch_size, total=self.total, feedback=feedback,
+                    attribute_indices=self.attribute_indices)
+            self.skipped = self.geometry_transformer.skipped
+            if writer is not None and writer.hasError() != QgsVectorFileWriter.NoError:
+                self.success = False
+            if gpkg_sink is not None:
+                gpkg_sink.close()
+                gpkg_sink = None
+            if self.output_layer is not None and self.spatial_index and not feedback.isCanceled():
+                build_spatial_index(sink)
+        except Exception as e:
+            if gpkg_sink is not None:
+                gpkg_sink.abort()
+            self.error = ('Exception adding features', str(e))
+            return False
+        finally:
+            # 释放写入器的最后一个引用，析构时刷新缓冲区并关闭文件
+            sink = None
+            writer = None
+
+        # 空间索引在文件关闭后一次性创建，写入要素时不更新索引
+        if self.output_path and self.spatial_index and not feedback.isCanceled():
+            create_spatial_index(self.output_path)
+
+        if self.output_layer is not None:
+            # 图层在后台线程中创建，需要移回主线程才能添加到项目中
+            self.output_layer.moveToThread(QCoreApplication.instance().thread())
+
+        return not feedback.isCanceled()
+
+    def run_in_place(self, feedback):
+        """原位转换输入图层，失败或取消时回滚已写入的批次"""
+        # 在当前线程中创建数据提供者，它只在这个线程中使用，函数返回时释放
+        provider = QgsProviderRegistry.instance().createProvider(
+            self.provider_type, self.provider_uri, QgsDataProvider.ProviderOptions())
+        if provider is None or not provider.isValid():
+            self.error = ('Cannot open the input layer for writing', self.provider_uri)
+            return False
+        try:
+            if self.request is not None:
+                self.total = count_features(self.source, self.request)
+            self.converted, self.success = convert_in_place(
+                self.source, provider, self.geometry_transformer, request=self.request,
+                batch_size=self.batch_size, total=self.total, feedback=feedback)
+            self.skipped = self.geometry_transformer.skipped
+        except Exception as e:
+            self.error = ('Exception writing features', str(e))
+            return False
+        if not self.success:
+            self.error = ('In-place conversion failed, all changes were rolled back',
+                          '; '.join(provider.errors()))
+            return False
+        return not feedback.isCanceled()
+
+    def index_meta(self):
+        """索引中记录的转换设置，与本次不同时不能复用上次的输出"""
+        fields = ','.join(f'{field.name()}:{field.typeName()}' for field in self.fields)
+        return {
+            'direction': '>'.join(self.direction or ()),
+            'fields': fields,
+            'wkb_type': str(int(self.wkb_type)),
+            'crs': self.crs.authid(),
+        }
+
+    def run_incremental(self, feedback):
+        """增量转换到 output_path，索引与输出不匹配时重新完整转换"""
+        path = index_path(self.output_path)
+        meta = self.index_meta()
+        index = None
+        # 新建的输出在转换完成后再创建空间索引，之后的增量写入由数据源维护索引
+        created = False
+        try:
+            if os.path.exists(self.output_path) and os.path.exists(path):
+                index = FingerprintIndex(path)
+                if any(index.get_meta(key) != value for key, value in meta.items()):
+                    index.close()
+                    index = None
+            if index is None:
+                # 没有可复用的输出，创建空的输出文件和新的索引
+                for old_path in (self.output_path, path):
+                    if os.path.exists(old_path):
+                        os.remove(old_path)
+                error_msg = create_geopackage(self.output_path, self.fields, self.wkb_type,
+                                              self.crs, self.transform_context)
+                if error_msg:
+                    self.error = ('Error creating output file', error_msg)
+                    return False
+                created = True
+                index = FingerprintIndex(path)
+                for key, value in meta.items():
+                    index.set_meta(key, value)
+                index.commit()
+
+            output = QgsVectorLayer(self.output_path, os.path.basename(self.output_path), 'ogr')
+            if not output.isValid():
+                self.error = ('Error creating output file', self.output_path)
+                return False
+            self.incremental_counts = convert_incremental(
+                self.source, output.dataProvider(), self.geometry_transformer, index,
+                batch_size=self.batch_size, total=self.total, feedback=feedback,
+                attribute_indices=self.attribute_indices)
+            if created and self.spatial_index and not feedback.isCanceled():
+                build_spatial_index(output.dataProvider())
+            added, changed, _, _ = self.incremental_counts
+            self.converted = added + changed
+            self.skipped = self.geometry_transformer.skipped
+            self.success = True
+        except Exception as e:
+            self.error = ('Exception writing features', str(e))
+            return False
+        finally:
+            if index is not None:
+                index.close()
+        return not feedback.isCanceled()
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+from .provider import CoordConvertProvider
+
+__all__ = ['CoordConvertProvider']
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ CoordConvertAlgorithm
+                                 A QGIS plugin
+ Converts coordinates between WGS84, GCJ02, and BD09
+                              -------------------
+        begin                : 2025
+ ***************************************************************************/
+"""
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.core import QgsProcessing, QgsProcessingFeatureBasedAlgorithm
+
+from ..coord_convert_engine import GeometryTransformer
+from ..util import registry
+
+
+# 顶点数达到该值的几何通过数组核函数转换，顶点较少时逐顶点转换更快
+KERNEL_MIN_VERTICES = 128
+
+
+class CoordConvertAlgorithm(QgsProcessingFeatureBasedAlgorithm):
+    """逐要素转换坐标的Processing算法，每个转换方向一个算法实例
+
+    :param input_crs: 输入坐标系，"WGS84"、"GCJ02" 或 "BD09"
+    :type input_crs: str
+    :param output_crs: 输出坐标系
+    :type output_crs: str
+    """
+
+    def __init__(self, input_crs, output_crs):
+        super().__init__()
+        self.input_crs = input_crs
+        self.output_crs = output_crs
+        self.geometry_transformer = None
+
+    def tr(self, string):
+        return QCoreApplication.translate('CoordConvert', string)
+
+    def createInstance(self):
+        return CoordConvertAlgorithm(self.input_crs, self.output_crs)
+
+    def name(self):
+        return f'{self.input_crs.lower()}to{self.output_crs.lower()}'
+
+    def displayName(self):
+        return self.tr('{} to {}').format(self.input_crs, self.output_crs)
+
+    def group(self):
+        return self.tr('Coordinate conversion')
+
+    def groupId(self):
+        return 'coordinateconversion'
+
+    def shortHelpString(self):
+        return self.tr('Converts feature coordinates from {} to {}. '
+                       'Z/M values and curved geometries are kept, attributes are copied unchanged.').format(
+                           self.input_crs, self.output_crs)
+
+    def outputName(self):
+        return self.tr('Converted ({})').format(self.output_crs)
+
+    def inputLayerTypes(self):
+        return [QgsProcessing.TypeVectorAnyGeometry]
+
+    def supportInPlaceEdit(self, layer):
+        return layer.isSpatial()
+
+    def prepareAlgorithm(self, parameters, context, feedback):
+        try:
+            kernel = registry.kernel(self.input_crs, self.output_crs)
+        except KeyError:
+            # 只注册了逐点转换的方向
+            kernel = None
+        self.geometry_transformer = GeometryTransformer(
+            registry.conversion(self.input_crs, self.output_crs),
+            china_only=registry.china_only(self.input_crs, self.output_crs),
+            kernel=kernel)
+        return True
+
+    def processFeature(self, feature, context, feedback):
+        geom = feature.geometry()
+        if not geom.isNull() and geom.constGet().nCoordinates() >= KERNEL_MIN_VERTICES:
+            geom = self.geometry_transformer.transform_batch([geom])[0]
+        else:
+            geom = self.geometry_transformer.transform(geom)
+        feature.setGeometry(geom)
+        return [feature]
+
+    def postProcessAlgorithm(self, context, feedback):
+        if self.geometry_transformer is not None and self.geometry_transformer.skipped:
+            feedback.pushInfo(self.tr('{} features outside China were copied without conversion').format(
+                self.geometry_transformer.skipped))
+        return {}
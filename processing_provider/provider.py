@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+ CoordConvertProvider
+                                 A QGIS plugin
+ Converts coordinates between WGS84, GCJ02, and BD09
+                              -------------------
+        begin                : 2025
+ ***************************************************************************/
+"""
+
+import os
+
+from qgis.PyQt.QtGui import QIcon
+from qgis.core import QgsProcessingProvider
+
+from ..util import registry
+from .algorithms import CoordConvertAlgorithm
+
+
+class CoordConvertProvider(QgsProcessingProvider):
+    """坐标转换的Processing提供者，可在模型、批处理和 qgis_process 中使用"""
+
+    def loadAlgorithms(self):
+        for input_crs, output_crs in registry.directions():
+            self.addAlgorithm(CoordConvertAlgorithm(input_crs, output_crs))
+
+    def id(self):
+        return 'coordconvert'
+
+    def name(self):
+        return 'Chinese Coordinate Converter'
+
+    def icon(self):
+        return QIcon(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'icon.svg'))
+
+    def longName(self):
+        return self.name()
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""The tests cover the QGIS-free util package; make it importable as a top-level package."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from util import registry
+from util.transform import MAX_OFFSET, convertBox, np, sourceBox
+
+pytestmark = pytest.mark.skipif(np is None, reason='samples the boxes with the array kernels')
+
+DIRECTIONS = registry.directions()
+GRID = 41
+
+
+def random_boxes(count=30, seed=0):
+    """boxes inside China, across each edge of the china box and outside it, of very different sizes"""
+    rng = random.Random(seed)
+    centres = [(116.4, 39.9), (121.5, 31.2), (72.004, 30.0), (137.8347, 45.0), (100.0, 0.8293),
+               (120.0, 55.8271), (72.004, 0.8293), (2.35, 48.85)]
+    boxes = []
+    for _ in range(count):
+        lon, lat = rng.choice(centres)
+        lon += rng.uniform(-0.5, 0.5)
+        lat += rng.uniform(-0.5, 0.5)
+        width = 10 ** rng.uniform(-4, 0.5)
+        height = 10 ** rng.uniform(-4, 0.5)
+        boxes.append((lon - width / 2, lat - height / 2, lon + width / 2, lat + height / 2))
+    # exactly on the edge of the china box
+    boxes.append((71.9, 0.7, 72.1, 0.9))
+    boxes.append((137.8, 55.8, 137.9, 55.9))
+    return boxes
+
+
+def sample(minLng, minLat, maxLng, maxLat, seed=0):
+    """a grid over the box, its edges included, and random points inside it"""
+    lons, lats = np.meshgrid(np.linspace(minLng, maxLng, GRID), np.linspace(minLat, maxLat, GRID))
+    rng = np.random.default_rng(seed)
+    lons = np.concatenate((lons.ravel(), rng.uniform(minLng, maxLng, 2000)))
+    lats = np.concatenate((lats.ravel(), rng.uniform(minLat, maxLat, 2000)))
+    return lons, lats
+
+
+def inside(lons, lats, box):
+    minLng, minLat, maxLng, maxLat = box
+    return (lons >= minLng) & (lons <= maxLng) & (lats >= minLat) & (lats <= maxLat)
+
+
+@pytest.mark.parametrize('direction', DIRECTIONS)
+def test_convert_box_contains_converted_points(direction):
+    convert = registry.conversion(*direction)
+    kernel = registry.kernel(*direction)
+    for i, box in enumerate(random_boxes()):
+        lons, lats = sample(*box, seed=i)
+        newLons, newLats = kernel(lons, lats)
+        assert inside(newLons, newLats, convertBox(*box, convert)).all(), box
+
+
+@pytest.mark.parametrize('direction', DIRECTIONS)
+def test_source_box_contains_every_source_point(direction):
+    convert = registry.conversion(*direction)
+    kernel = registry.kernel(*direction)
+    inverse = registry.kernel(direction[1], direction[0])
+    boxes = random_boxes(seed=1)
+    boxes_hit = 0
+    for i, box in enumerate(boxes):
+        minLng, minLat, maxLng, maxLat = box
+        # every point converted into the box starts within MAX_OFFSET of it;
+        # the inverse images of the box make sure small boxes get hits too
+        lons, lats = sample(minLng - 2 * MAX_OFFSET, minLat - 2 * MAX_OFFSET,
+                            maxLng + 2 * MAX_OFFSET, maxLat + 2 * MAX_OFFSET, seed=i)
+        inverseLons, inverseLats = inverse(*sample(*box, seed=i))
+        lons = np.concatenate((lons, inverseLons))
+        lats = np.concatenate((lats, inverseLats))
+        newLons, newLats = kernel(lons, lats)
+        hits = inside(newLons, newLats, box)
+        # a small box at the edge of china can fall in the gap the offset jump opens
+        boxes_hit += bool(hits.any())
+        assert inside(lons[hits], lats[hits], sourceBox(*box, convert)).all(), box
+    assert boxes_hit >= len(boxes) * 3 // 4
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from util.cache import CoordinateCache
+from util.transform import wgs2gcj
+
+
+DIRECTION = ('WGS84', 'GCJ02')
+
+
+class Counting():
+    """conversion that counts its calls"""
+
+    def __init__(self, func=wgs2gcj):
+        self.func = func
+        self.calls = 0
+
+    def __call__(self, lon, lat):
+        self.calls += 1
+        return self.func(lon, lat)
+
+
+def test_hits_and_misses():
+    cache = CoordinateCache(maxsize=10)
+    func = Counting()
+    for _ in range(3):
+        assert cache.convert(func, DIRECTION, 116.4, 39.9) == wgs2gcj(116.4, 39.9)
+    assert func.calls == 1
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'size': 1, 'hit_rate': 2 / 3}
+
+
+def test_direction_is_part_of_the_key():
+    cache = CoordinateCache(maxsize=10)
+    cache.convert(lambda lon, lat: (1.0, 1.0), DIRECTION, 116.4, 39.9)
+    assert cache.convert(lambda lon, lat: (2.0, 2.0), ('WGS84', 'BD09'), 116.4, 39.9) == (2.0, 2.0)
+    assert cache.stats()['misses'] == 2
+
+
+def test_lru_eviction():
+    cache = CoordinateCache(maxsize=2)
+    func = Counting()
+    cache.convert(func, DIRECTION, 1.0, 1.0)
+    cache.convert(func, DIRECTION, 2.0, 2.0)
+    # touching (1, 1) makes (2, 2) the least recently used
+    cache.convert(func, DIRECTION, 1.0, 1.0)
+    cache.convert(func, DIRECTION, 3.0, 3.0)
+    assert len(cache) == 2
+    assert func.calls == 3
+    cache.convert(func, DIRECTION, 1.0, 1.0)
+    assert func.calls == 3
+    cache.convert(func, DIRECTION, 2.0, 2.0)
+    assert func.calls == 4
+
+
+def test_unbounded():
+    cache = CoordinateCache(maxsize=None)
+    func = Counting()
+    for i in range(100):
+        cache.convert(func, DIRECTION, 116.0 + i, 39.0)
+    assert len(cache) == 100
+    cache.convert(func, DIRECTION, 116.0, 39.0)
+    assert func.calls == 100
+
+
+def test_wrap():
+    cache = CoordinateCache()
+    func = Counting()
+    convert = cache.wrap(func, DIRECTION)
+    assert convert(116.4, 39.9) == wgs2gcj(116.4, 39.9)
+    assert convert(116.4, 39.9) == wgs2gcj(116.4, 39.9)
+    assert func.calls == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_size_zero_stores_nothing():
+    # cache_size 0 disables caching: every request converts and nothing is kept
+    cache = CoordinateCache(maxsize=0)
+    func = Counting()
+    convert = cache.wrap(func, DIRECTION)
+    for _ in range(3):
+        assert convert(116.4, 39.9) == wgs2gcj(116.4, 39.9)
+    assert func.calls == 3
+    assert len(cache) == 0
+    assert cache.stats() == {'hits': 0, 'misses': 3, 'size': 0, 'hit_rate': 0.0}
+
+
+def test_clear():
+    cache = CoordinateCache()
+    func = Counting()
+    cache.convert(func, DIRECTION, 116.4, 39.9)
+    cache.convert(func, DIRECTION, 116.4, 39.9)
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'size': 0, 'hit_rate': 0.0}
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import io
+import sys
+
+import pytest
+
+from util import cli
+from util.transform import wgs2gcj
+
+
+def test_stdio_left_open(monkeypatch):
+    # patched in the test itself, output capturing resets sys.stdout between fixtures and the call
+    stdin = io.TextIOWrapper(io.BytesIO(b'lon,lat\n116.4,39.9\n'))
+    stdout = io.TextIOWrapper(io.BytesIO())
+    monkeypatch.setattr(sys, 'stdin', stdin)
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    assert cli.main(['-f', 'WGS84', '-t', 'GCJ02', '--format', 'csv']) == 0
+    assert not stdin.closed and not stdout.closed
+    lines = stdout.buffer.getvalue().decode('utf-8').splitlines()
+    assert lines[0] == 'lon,lat'
+    lon, lat = map(float, lines[1].split(','))
+    assert (lon, lat) == pytest.approx(wgs2gcj(116.4, 39.9), abs=1e-12)
+    # the standard streams are still usable afterwards
+    stdout.write('done')
+    stdout.flush()
+
+
+def test_files(tmp_path):
+    source = tmp_path / 'in.txt'
+    target = tmp_path / 'out.txt'
+    source.write_text('116.4,39.9\n')
+    assert cli.main(['-f', 'WGS84', '-t', 'GCJ02', '--format', 'lines', str(source), str(target)]) == 0
+    lon, lat = map(float, target.read_text().strip().split(','))
+    assert (lon, lat) == pytest.approx(wgs2gcj(116.4, 39.9), abs=1e-12)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('lon,lat\n116.4,39.9\n', 'csv'),
+    ('\n116.4,39.9\n', 'lines'),
+    ('# track\n116.4,39.9\n', 'lines'),
+    ('{"type": "Point", "coordinates": [116.4, 39.9]}\n', 'geojsonseq'),
+    ('{\n  "type": "Point",\n  "coordinates": [116.4, 39.9]\n}\n', 'geojson'),
+    ('', 'lines'),
+])
+def test_sniff_format(text, expected):
+    input_format, records = cli.sniff_format(io.StringIO(text))
+    assert input_format == expected
+    assert ''.join(records if input_format != 'geojson' else records.read()) == text
+
+
+def test_stdin_csv_without_format(monkeypatch):
+    stdin = io.TextIOWrapper(io.BytesIO(b'name,lon,lat\na,116.4,39.9\n'))
+    stdout = io.TextIOWrapper(io.BytesIO())
+    monkeypatch.setattr(sys, 'stdin', stdin)
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    assert cli.main(['-f', 'WGS84', '-t', 'GCJ02']) == 0
+    lines = stdout.buffer.getvalue().decode('utf-8').splitlines()
+    assert lines[0] == 'name,lon,lat'
+    name, lon, lat = lines[1].split(',')
+    assert (float(lon), float(lat)) == pytest.approx(wgs2gcj(116.4, 39.9), abs=1e-12)
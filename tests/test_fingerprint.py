@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from util.fingerprint import FingerprintIndex, fingerprint, index_path
+
+
+def test_fingerprint_separates_parts():
+    assert fingerprint(b'ab', b'c') != fingerprint(b'a', b'bc')
+    assert fingerprint(b'ab', b'c') == fingerprint(b'ab', b'c')
+    assert len(fingerprint(b'')) == 16
+
+
+def test_index_reused_across_runs(tmp_path):
+    path = index_path(str(tmp_path / 'out.gpkg'))
+    assert path.endswith('.ccindex')
+    index = FingerprintIndex(path)
+    index.set_meta('direction', 'WGS84>GCJ02')
+    index.update([(fid, fingerprint(b'%d' % fid), fid + 100) for fid in range(1, 2001)])
+    index.commit()
+    index.close()
+
+    index = FingerprintIndex(path)
+    assert len(index) == 2000
+    assert index.get_meta('direction') == 'WGS84>GCJ02'
+    assert index.get_meta('fields') is None
+    # more ids than one statement takes
+    found = index.lookup(range(0, 2002))
+    assert len(found) == 2000
+    assert found[5] == (fingerprint(b'5'), 105)
+
+    # ids not seen in this run are stale
+    index.mark_seen(range(1, 1999))
+    assert sorted(index.stale()) == [(1999, 2099), (2000, 2100)]
+    index.remove([1999, 2000])
+    index.commit()
+    assert index.stale() == []
+    index.close()
+
+    index = FingerprintIndex(path)
+    assert len(index) == 1998
+    # the seen ids belong to one run only
+    assert len(index.stale()) == 1998
+    index.close()
+    FingerprintIndex.delete(path)
+    FingerprintIndex.delete(path)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import struct
+
+import pytest
+
+from util.gpkg import GeoPackageWriter, geometry_blob
+
+
+@pytest.fixture
+def gpkg(tmp_path):
+    # the tables create_geopackage leaves behind, reduced to what the writer reads
+    path = str(tmp_path / 'out.gpkg')
+    db = sqlite3.connect(path)
+    db.executescript('''
+        CREATE TABLE gpkg_contents (table_name TEXT PRIMARY KEY, min_x DOUBLE, min_y DOUBLE,
+                                    max_x DOUBLE, max_y DOUBLE, last_change DATETIME);
+        CREATE TABLE gpkg_geometry_columns (table_name TEXT, column_name TEXT, srs_id INTEGER);
+        CREATE TABLE points (fid INTEGER PRIMARY KEY AUTOINCREMENT, geom BLOB, name TEXT);
+        INSERT INTO gpkg_contents (table_name) VALUES ('points');
+        INSERT INTO gpkg_geometry_columns VALUES ('points', 'geom', 4326);
+    ''')
+    db.commit()
+    db.close()
+    return path
+
+
+def point(x, y):
+    return struct.pack('<BIdd', 1, 1, x, y), (x, x, y, y)
+
+
+def test_write_and_close(gpkg):
+    writer = GeoPackageWriter(gpkg, ['name'], transaction_size=2)
+    for i in range(5):
+        wkb, envelope = point(116.0 + i, 39.0)
+        writer.add([(wkb, envelope, ['p%d' % i])])
+    writer.add([(None, None, ['null'])])
+    writer.close()
+    assert not os.path.exists(gpkg + '-wal') and not os.path.exists(gpkg + '-shm')
+    db = sqlite3.connect(gpkg)
+    assert db.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    assert db.execute('SELECT count(*) FROM points').fetchone()[0] == 6
+    assert db.execute('SELECT min_x, min_y, max_x, max_y FROM gpkg_contents').fetchone() == (116.0, 39.0, 120.0, 39.0)
+    wkb, envelope = point(116.0, 39.0)
+    assert db.execute('SELECT geom FROM points WHERE name = ?', ('p0',)).fetchone()[0] == \
+        geometry_blob(wkb, 4326, envelope)
+    db.close()
+
+
+def test_abort_rolls_back_uncommitted_rows(gpkg):
+    writer = GeoPackageWriter(gpkg, ['name'], transaction_size=2)
+    for i in range(3):
+        wkb, envelope = point(116.0 + i, 39.0)
+        writer.add([(wkb, envelope, ['p%d' % i])])
+    writer.abort()
+    db = sqlite3.connect(gpkg)
+    assert db.execute('SELECT count(*) FROM points').fetchone()[0] == 2
+    db.close()
+
+
+def test_missing_column(gpkg):
+    with pytest.raises(ValueError):
+        GeoPackageWriter(gpkg, ['other'])
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from util.transform import gcj2wgs_array, np, wgs2gcj_array
+
+pytestmark = pytest.mark.skipif(np is None, reason='OffsetGrid requires numpy')
+
+
+@pytest.fixture(scope='module')
+def grid():
+    from util.grid import OffsetGrid
+    return OffsetGrid.build(resolution=0.1)
+
+
+def sample(count=20000, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(73.0, 135.0, count), rng.uniform(18.0, 53.0, count)
+
+
+@pytest.fixture(scope='module')
+def grid_path(grid, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('grid') / 'offsets.grid')
+    grid.save(path)
+    return path
+
+
+def test_error_within_sampled_max(grid):
+    assert 0 < grid.sampled_max_error < 1e-4
+    lons, lats = sample()
+    exactLons, exactLats = wgs2gcj_array(lons, lats)
+    gridLons, gridLats = grid.wgs2gcj(lons, lats)
+    assert np.abs(gridLons - exactLons).max() <= grid.sampled_max_error
+    assert np.abs(gridLats - exactLats).max() <= grid.sampled_max_error
+
+
+def test_inverse(grid):
+    lons, lats = sample(seed=2)
+    gcjLons, gcjLats = wgs2gcj_array(lons, lats)
+    wgsLons, wgsLats = grid.gcj2wgs(gcjLons, gcjLats)
+    exactLons, exactLats = gcj2wgs_array(gcjLons, gcjLats)
+    assert np.abs(wgsLons - exactLons).max() <= 2 * grid.sampled_max_error
+    assert np.abs(wgsLats - exactLats).max() <= 2 * grid.sampled_max_error
+
+
+def test_outside_china_untouched(grid):
+    lons, lats = np.array([2.35, -74.0]), np.array([48.85, 40.7])
+    gcjLons, gcjLats = grid.wgs2gcj(lons, lats)
+    assert (gcjLons == lons).all() and (gcjLats == lats).all()
+
+
+def test_save_and_open(grid, tmp_path):
+    from util.grid import OffsetGrid
+    path = str(tmp_path / 'offsets.grid')
+    grid.save(path)
+    loaded = OffsetGrid.open(path)
+    assert loaded.sampled_max_error == grid.sampled_max_error
+    assert (loaded.dLon == grid.dLon).all() and (loaded.dLat == grid.dLat).all()
+
+
+def test_load_rejects_other_files(tmp_path):
+    from util.grid import OffsetGrid
+    path = tmp_path / 'other.grid'
+    path.write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError):
+        OffsetGrid.load(str(path))
+
+
+def test_grid_kernel(grid, grid_path):
+    import pickle
+    from util.grid import GridKernel
+    kernel = pickle.loads(pickle.dumps(GridKernel(grid_path, ('BD09', 'WGS84'))))
+    lons, lats = sample(count=100, seed=3)
+    newLons, newLats = kernel(lons, lats)
+    expectedLons, expectedLats = grid.bd2wgs(lons, lats)
+    assert (newLons == expectedLons).all() and (newLats == expectedLats).all()
+
+
+def test_grid_kernel_rejects_other_directions(grid_path):
+    from util.grid import GridKernel
+    with pytest.raises(ValueError):
+        GridKernel(grid_path, ('GCJ02', 'BD09'))
+
+
+def test_convert_chunk_through_grid(grid, grid_path):
+    from array import array
+    from util.parallel import convert_chunk
+    lons, lats = sample(count=100, seed=4)
+    newLons, newLats = convert_chunk(('WGS84', 'GCJ02'), array('d', lons), array('d', lats), grid_path)
+    expectedLons, expectedLats = grid.wgs2gcj(lons, lats)
+    assert list(newLons) == list(expectedLons) and list(newLats) == list(expectedLats)
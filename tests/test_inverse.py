@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import math
+import random
+
+import pytest
+
+from util.transform import (GCJ2WGS_THRESHOLD, bd2gcj, bd2wgs, gcj2bd, gcj2wgs, gcj2wgs_array, gcj2wgs_solve, np,
+                            wgs2bd, wgs2gcj)
+
+needs_numpy = pytest.mark.skipif(np is None, reason='gcj2wgs_solve requires numpy')
+
+BEIJING = (116.4, 39.9)
+
+
+def china_points(count=2000, seed=0):
+    rng = random.Random(seed)
+    return [(rng.uniform(73.0, 135.0), rng.uniform(18.0, 53.0)) for _ in range(count)]
+
+
+def test_round_trip_below_threshold():
+    for lon, lat in china_points():
+        wgsLon, wgsLat = gcj2wgs(*wgs2gcj(lon, lat))
+        assert abs(wgsLon - lon) < GCJ2WGS_THRESHOLD and abs(wgsLat - lat) < GCJ2WGS_THRESHOLD
+
+
+def test_bd_round_trip():
+    # bd2gcj only approximately inverts gcj2bd (about 2e-6 deg), the iteration adds at most the threshold
+    for lon, lat in china_points():
+        gcjLon, gcjLat = wgs2gcj(lon, lat)
+        bdLon, bdLat = gcj2bd(gcjLon, gcjLat)
+        assert bd2wgs(bdLon, bdLat) == gcj2wgs(*bd2gcj(bdLon, bdLat))
+        backLon, backLat = bd2gcj(bdLon, bdLat)
+        wgsLon, wgsLat = bd2wgs(bdLon, bdLat)
+        assert abs(wgsLon - lon) < abs(backLon - gcjLon) * 1.01 + GCJ2WGS_THRESHOLD
+        assert abs(wgsLat - lat) < abs(backLat - gcjLat) * 1.01 + GCJ2WGS_THRESHOLD
+
+
+@needs_numpy
+def test_array_round_trip_below_threshold():
+    lons, lats = np.array(china_points()).T
+    gcj = [wgs2gcj(lon, lat) for lon, lat in zip(lons, lats)]
+    wgsLons, wgsLats = gcj2wgs_array([lon for lon, _ in gcj], [lat for _, lat in gcj])
+    assert np.abs(wgsLons - lons).max() < GCJ2WGS_THRESHOLD
+    assert np.abs(wgsLats - lats).max() < GCJ2WGS_THRESHOLD
+
+
+def test_max_iter_zero_returns_the_start():
+    # without iterations gcj2wgs returns its input and bd2wgs the gcj point it starts from
+    gcjLon, gcjLat = wgs2gcj(*BEIJING)
+    assert gcj2wgs(gcjLon, gcjLat, max_iter=0) == (gcjLon, gcjLat)
+    bdLon, bdLat = wgs2bd(*BEIJING)
+    assert bd2wgs(bdLon, bdLat, max_iter=0) == bd2gcj(bdLon, bdLat)
+
+
+@needs_numpy
+def test_solve_max_iter_zero():
+    gcjLon, gcjLat = wgs2gcj(*BEIJING)
+    lons, lats, iterations = gcj2wgs_solve([gcjLon], [gcjLat], max_iter=0)
+    assert iterations == 0
+    assert (lons[0], lats[0]) == (gcjLon, gcjLat)
+
+
+@needs_numpy
+def test_solve_iterations_on_a_known_point():
+    # the GCJ02 offset is smooth around Beijing: the first step still moves the point by
+    # more than the threshold, the second by less, which ends the iteration
+    lons, lats, iterations = gcj2wgs_solve(*zip(wgs2gcj(*BEIJING)))
+    assert iterations == 2
+    assert (lons[0], lats[0]) == pytest.approx(BEIJING, abs=GCJ2WGS_THRESHOLD)
+    # after one iteration the point is still about 5e-7 deg off, as with the scalar function capped the same way
+    lons, lats, _ = gcj2wgs_solve(*zip(wgs2gcj(*BEIJING)), max_iter=1)
+    assert abs(lons[0] - BEIJING[0]) > GCJ2WGS_THRESHOLD / 10
+    assert (lons[0], lats[0]) == pytest.approx(gcj2wgs(*wgs2gcj(*BEIJING), max_iter=1), abs=1e-12)
+
+
+@needs_numpy
+def test_solve_nan():
+    # a NaN point converges at once, leaves the iteration count and the other points alone
+    gcjLon, gcjLat = wgs2gcj(*BEIJING)
+    lons, lats, iterations = gcj2wgs_solve([math.nan, gcjLon], [gcjLat, gcjLat])
+    assert iterations == 2
+    assert math.isnan(lons[0])
+    assert (lons[1], lats[1]) == pytest.approx(gcj2wgs(gcjLon, gcjLat), abs=1e-9)
+
+
+def test_scalar_nan():
+    lon, lat = gcj2wgs(math.nan, 39.9)
+    assert math.isnan(lon)
+    assert all(math.isnan(value) for value in bd2wgs(math.nan, 39.9))
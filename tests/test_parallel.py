@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from array import array
+
+import pytest
+
+from util import registry
+from util.parallel import convert_chunk, convert_chunks
+
+
+DIRECTION = ('WGS84', 'GCJ02')
+
+
+def test_convert_chunk_matches_kernel():
+    lons, lats = array('d', [116.4, 121.5]), array('d', [39.9, 31.2])
+    expected = registry.kernel(*DIRECTION)(lons, lats)
+    newLons, newLats = convert_chunk(DIRECTION, lons, lats)
+    assert isinstance(newLons, array) and isinstance(newLats, array)
+    assert newLons.typecode == newLats.typecode == 'd'
+    assert list(newLons) == list(expected[0])
+    assert list(newLats) == list(expected[1])
+
+
+def test_chunks_keep_order_and_payloads():
+    chunks = []
+    for i in range(7):
+        size = 0 if i == 3 else 10 + i
+        lons = array('d', (100.0 + i + 0.01 * j for j in range(size)))
+        lats = array('d', (30.0 + 0.01 * j for j in range(size)))
+        chunks.append((lons, lats, i))
+    results = list(convert_chunks(DIRECTION, iter(chunks), workers=2))
+    assert [payload for _, _, payload in results] == list(range(7))
+    for (lons, lats, _), (newLons, newLats, _) in zip(chunks, results):
+        assert len(newLons) == len(lons)
+        expected = convert_chunk(DIRECTION, lons, lats)
+        assert list(newLons) == pytest.approx(list(expected[0]), abs=0)
+        assert list(newLats) == pytest.approx(list(expected[1]), abs=0)
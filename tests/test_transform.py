@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from util import transform
+from util.transform import np
+
+pytestmark = pytest.mark.skipif(np is None, reason='compares the numpy kernels with the scalar functions')
+
+DIRECTIONS = ('wgs2gcj', 'gcj2wgs', 'gcj2bd', 'bd2gcj', 'wgs2bd', 'bd2wgs')
+# the forward directions are usually bit-identical, the BD ones differ by a few ulps
+TOLERANCE = 1e-9
+REGIONS = {
+    'china': ((73.0, 135.0), (18.0, 53.0)),
+    'outside': ((-180.0, 70.0), (-80.0, 80.0)),
+    # straddles the edge of the china box
+    'edge': ((71.5, 72.5), (0.3, 1.3)),
+}
+
+
+def random_points(region, count=2000, seed=0):
+    (lonMin, lonMax), (latMin, latMax) = REGIONS[region]
+    rng = random.Random(seed)
+    return ([rng.uniform(lonMin, lonMax) for _ in range(count)],
+            [rng.uniform(latMin, latMax) for _ in range(count)])
+
+
+@pytest.mark.parametrize('region', sorted(REGIONS))
+@pytest.mark.parametrize('direction', DIRECTIONS)
+def test_array_matches_scalar(direction, region):
+    lons, lats = random_points(region)
+    scalar = getattr(transform, direction)
+    newLons, newLats = getattr(transform, direction + '_array')(np.array(lons), np.array(lats))
+    expected = [scalar(lon, lat) for lon, lat in zip(lons, lats)]
+    assert np.abs(newLons - [lon for lon, _ in expected]).max() <= TOLERANCE
+    assert np.abs(newLats - [lat for _, lat in expected]).max() <= TOLERANCE
+
+
+@pytest.mark.parametrize('direction', ('wgs2gcj', 'gcj2wgs'))
+def test_outside_china_unchanged(direction):
+    lons, lats = random_points('outside')
+    lons, lats = np.array(lons), np.array(lats)
+    outside = transform.outOfChina_array(lons, lats)
+    newLons, newLats = getattr(transform, direction + '_array')(lons, lats)
+    assert (newLons[outside] == lons[outside]).all()
+    assert (newLats[outside] == lats[outside]).all()
+
+
+@pytest.mark.parametrize('direction', DIRECTIONS)
+def test_nan_like_scalar(direction):
+    lons = [float('nan'), 116.4, 116.4]
+    lats = [39.9, float('nan'), 39.9]
+    scalar = getattr(transform, direction)
+    newLons, newLats = getattr(transform, direction + '_array')(np.array(lons), np.array(lats))
+    expected = np.array([scalar(lon, lat) for lon, lat in zip(lons, lats)])
+    # NaN stays NaN in the same places, and does not disturb the other points
+    assert (np.isnan(newLons) == np.isnan(expected[:, 0])).all()
+    assert (np.isnan(newLats) == np.isnan(expected[:, 1])).all()
+    assert np.isnan(newLons[0]) and np.isnan(newLats[1])
+    assert (newLons[2], newLats[2]) == pytest.approx(tuple(expected[2]), abs=TOLERANCE)
+
+
+@pytest.mark.parametrize('direction', DIRECTIONS)
+def test_zero_dimensional_input(direction):
+    newLon, newLat = getattr(transform, direction + '_array')(116.4, 39.9)
+    assert np.shape(newLon) == () and np.shape(newLat) == ()
+    assert (float(newLon), float(newLat)) == pytest.approx(getattr(transform, direction)(116.4, 39.9), abs=TOLERANCE)
+
+
+@pytest.mark.parametrize('direction', DIRECTIONS)
+def test_accepts_sequences(direction):
+    lons, lats = random_points('china', count=10)
+    expected = getattr(transform, direction + '_array')(np.array(lons), np.array(lats))
+    newLons, newLats = getattr(transform, direction + '_array')(lons, lats)
+    assert (newLons == expected[0]).all() and (newLats == expected[1]).all()
+
+
+def test_shape_mismatch():
+    with pytest.raises(ValueError):
+        transform.wgs2gcj_array([116.4, 121.5], [39.9])
+
+
+@pytest.mark.parametrize('direction', DIRECTIONS)
+def test_without_numpy(direction, monkeypatch):
+    lons, lats = random_points('china', count=10)
+    expected = [getattr(transform, direction)(lon, lat) for lon, lat in zip(lons, lats)]
+    monkeypatch.setattr(transform, 'np', None)
+    newLons, newLats = getattr(transform, direction + '_array')(lons, lats)
+    assert list(zip(newLons, newLats)) == expected
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import struct
+
+import pytest
+
+from util import registry, wkb
+from util.transform import np, wgs2gcj
+
+
+def point(x, y, z=None, order='<', code=None):
+    if code is None:
+        code = 1 if z is None else 1001
+    values = (x, y) if z is None else (x, y, z)
+    return (struct.pack(order + 'BI', 1 if order == '<' else 0, code)
+            + struct.pack(order + '%dd' % len(values), *values))
+
+
+def linestring(coords, order='<', code=2, srid=None):
+    dimension = len(coords[0])
+    header = struct.pack(order + 'BI', 1 if order == '<' else 0, code)
+    if srid is not None:
+        header += struct.pack(order + 'I', srid)
+    body = struct.pack(order + 'I', len(coords))
+    for coord in coords:
+        body += struct.pack(order + '%dd' % dimension, *coord)
+    return header + body
+
+
+def read_doubles(buf, order='<'):
+    return struct.unpack_from(order + '%dd' % ((len(buf) - 9) // 8), buf, 9)
+
+
+def convert(wkbs):
+    return wkb.convert_wkbs(wkbs, registry.kernel('WGS84', 'GCJ02'))
+
+
+def test_point_z_keeps_z():
+    converted, = convert([point(116.4, 39.9, 42.5)])
+    x, y, z = struct.unpack_from('<3d', converted, 5)
+    assert (x, y) == pytest.approx(wgs2gcj(116.4, 39.9), abs=1e-12)
+    assert z == 42.5
+    assert converted[:5] == point(116.4, 39.9, 42.5)[:5]
+
+
+def test_big_endian_linestring():
+    coords = [(116.4, 39.9), (121.5, 31.2)]
+    converted, = convert([linestring(coords, order='>')])
+    count, = struct.unpack_from('>I', converted, 5)
+    values = struct.unpack_from('>4d', converted, 9)
+    assert count == 2
+    for (x, y), (newX, newY) in zip(coords, zip(values[0::2], values[1::2])):
+        assert (newX, newY) == pytest.approx(wgs2gcj(x, y), abs=1e-12)
+
+
+def test_ewkb_srid_and_z_flag():
+    code = 2 | 0x80000000 | 0x20000000
+    source = linestring([(116.4, 39.9, 1.0), (116.5, 40.0, 2.0)], code=code, srid=4326)
+    converted, = convert([source])
+    assert converted[:13] == source[:13]
+    values = struct.unpack_from('<6d', converted, 13)
+    assert values[2] == 1.0 and values[5] == 2.0
+    assert values[3:5] == pytest.approx(wgs2gcj(116.5, 40.0), abs=1e-12)
+
+
+def test_collection_and_outside_china():
+    polygon = (struct.pack('<BII', 1, 3, 1) + struct.pack('<I', 4)
+               + struct.pack('<8d', 116.0, 39.0, 117.0, 39.0, 117.0, 40.0, 116.0, 39.0))
+    collection = struct.pack('<BII', 1, 7, 2) + polygon + point(2.35, 48.85)
+    converted, = convert([collection])
+    assert len(converted) == len(collection)
+    # the point is outside China and left as it is
+    assert converted[-16:] == collection[-16:]
+    assert converted[:-16] != collection[:-16]
+
+
+def test_mixed_batch():
+    code = 1 | 0x80000000
+    wkbs = [point(116.4, 39.9), point(121.5, 31.2, order='>'), point(113.3, 23.1, 5.0, code=code),
+            linestring([(116.4, 39.9), (121.5, 31.2)], order='>'), point(114.1, 22.5)]
+    converted = convert(wkbs)
+    assert [len(buf) for buf in converted] == [len(buf) for buf in wkbs]
+    assert struct.unpack_from('<2d', converted[0], 5) == pytest.approx(wgs2gcj(116.4, 39.9), abs=1e-12)
+    assert struct.unpack_from('>2d', converted[1], 5) == pytest.approx(wgs2gcj(121.5, 31.2), abs=1e-12)
+    x, y, z = struct.unpack_from('<3d', converted[2], 5)
+    assert (x, y) == pytest.approx(wgs2gcj(113.3, 23.1), abs=1e-12) and z == 5.0
+    assert struct.unpack_from('>2d', converted[3], 25) == pytest.approx(wgs2gcj(121.5, 31.2), abs=1e-12)
+    assert struct.unpack_from('<2d', converted[4], 5) == pytest.approx(wgs2gcj(114.1, 22.5), abs=1e-12)
+
+
+def test_empty_geometries():
+    empty = linestring([(0.0, 0.0)])[:5] + struct.pack('<I', 0)
+    assert convert([empty]) == [bytearray(empty)]
+    assert convert([]) == []
+
+
+def test_unsupported_type():
+    with pytest.raises(ValueError):
+        wkb.coordinate_runs(struct.pack('<BII', 1, 99, 0))
+
+
+@pytest.mark.skipif(np is None, reason='compares the numpy path with the pure Python one')
+def test_without_numpy_matches(monkeypatch):
+    wkbs = [point(116.4, 39.9, 3.0), linestring([(116.4, 39.9), (121.5, 31.2)], order='>')]
+    expected = convert(wkbs)
+    monkeypatch.setattr(wkb, 'np', None)
+    assert convert(wkbs) == expected
@@ -2,5 +2,6 @@
 
 # Import Transform class for easy import from the parent package
 from .transform import Transform
+from .grid import OffsetGrid
 
-__all__ = ['Transform']
\ No newline at end of file
+__all__ = ['Transform', 'OffsetGrid']
\ No newline at end of file
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Memoizing cache for converted coordinates.
+
+Shared polygon boundaries and repeated point locations convert the same
+coordinate many times. A CoordinateCache keyed on the exact
+(lon, lat, direction) computes each one once, and every feature that
+shares the vertex gets the very same result, so neighbouring polygons stay
+sliver-free. Create one cache per conversion run.
+"""
+from collections import OrderedDict
+
+
+DEFAULT_CACHE_SIZE = 1000000
+
+
+class CoordinateCache():
+    """bounded LRU cache of converted coordinates with hit/miss counters
+
+    Keyword Arguments:
+        maxsize {int} -- maximum number of cached coordinates, None for unbounded (default: {DEFAULT_CACHE_SIZE})
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict() if maxsize is not None else {}
+
+    def __len__(self):
+        return len(self._data)
+
+    def convert(self, func, direction, lon, lat):
+        """return func(lon, lat), computing it only on the first request
+
+        Arguments:
+            func {callable} -- conversion taking (lon, lat) and returning (lon, lat)
+            direction {hashable} -- identifies func in the key, e.g. ('WGS84', 'GCJ02')
+            lon {float} -- lon
+            lat {float} -- lat
+
+        Returns:
+            tuple -- converted coords
+        """
+        key = (lon, lat, direction)
+        data = self._data
+        result = data.get(key)
+        if result is not None:
+            self.hits += 1
+            if self.maxsize is not None:
+                data.move_to_end(key)
+            return result
+        self.misses += 1
+        result = data[key] = func(lon, lat)
+        if self.maxsize is not None and len(data) > self.maxsize:
+            data.popitem(last=False)
+        return result
+
+    def wrap(self, func, direction):
+        """cached version of func with the same (lon, lat) signature"""
+        convert = self.convert
+        return lambda lon, lat: convert(func, direction, lon, lat)
+
+    def stats(self):
+        """hit/miss counters
+
+        Returns:
+            dict -- hits, misses, size and hit_rate
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
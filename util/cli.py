@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""Command line batch converter built on util.transform, no QGIS required.
+
+    python -m util -f WGS84 -t GCJ02 gps.csv gps_gcj.csv
+    cat track.txt | python -m util -f BD09 -t WGS84 --format lines > track_wgs.txt
+
+The input format is guessed from the file extension, or for stdin from
+the first line, see sniff_format.
+
+Input is read and converted in chunks, so memory use is bounded by the
+chunk size for every format except plain GeoJSON, which has to be parsed
+as a whole. Use newline-delimited GeoJSON (geojsonseq) for large files.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from itertools import chain, islice
+
+from . import registry
+from .grid import DEFAULT_RESOLUTION, OffsetGrid
+
+
+FORMATS = ('csv', 'lines', 'geojson', 'geojsonseq')
+
+# column names tried when --lon-field / --lat-field are not given
+LON_FIELDS = ('lon', 'lng', 'longitude', 'x')
+LAT_FIELDS = ('lat', 'latitude', 'y')
+
+DEFAULT_CHUNK_SIZE = 10000
+BUFFER_SIZE = 1 << 20
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _format(value):
+    # shortest representation that round-trips exactly
+    return repr(float(value))
+
+
+def _find_column(header, name, candidates):
+    lowered = [column.strip().lower() for column in header]
+    for candidate in ([name] if name else candidates):
+        if candidate.lower() in lowered:
+            return lowered.index(candidate.lower())
+    raise ValueError('cannot find column %s in header %s' % (name or '/'.join(candidates), header))
+
+
+def convert_csv(infile, outfile, kernel, lon_field=None, lat_field=None,
+                delimiter=',', chunk_size=DEFAULT_CHUNK_SIZE):
+    """convert the lon/lat columns of a csv file, other columns are copied
+
+    Returns:
+        int -- number of converted rows
+    """
+    reader = csv.reader(infile, delimiter=delimiter)
+    writer = csv.writer(outfile, delimiter=delimiter, lineterminator='\n')
+    header = next(reader, None)
+    if header is None:
+        return 0
+    lon_index = _find_column(header, lon_field, LON_FIELDS)
+    lat_index = _find_column(header, lat_field, LAT_FIELDS)
+    writer.writerow(header)
+
+    count = 0
+    for rows in _chunks(reader, chunk_size):
+        lons = [float(row[lon_index]) for row in rows]
+        lats = [float(row[lat_index]) for row in rows]
+        newLons, newLats = kernel(lons, lats)
+        for row, lon, lat in zip(rows, newLons, newLats):
+            row[lon_index] = _format(lon)
+            row[lat_index] = _format(lat)
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def convert_lines(infile, outfile, kernel, delimiter=',', chunk_size=DEFAULT_CHUNK_SIZE):
+    """convert newline-delimited "lon<delimiter>lat[<delimiter>...]" records
+
+    Blank lines and lines starting with # are copied unchanged.
+
+    Returns:
+        int -- number of converted lines
+    """
+    count = 0
+    for lines in _chunks(infile, chunk_size):
+        records = []
+        lons = []
+        lats = []
+        for line in lines:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('#'):
+                records.append(None)
+                continue
+            fields = stripped.split(delimiter) if delimiter.strip() else stripped.split()
+            lons.append(float(fields[0]))
+            lats.append(float(fields[1]))
+            records.append(fields)
+        newLons, newLats = kernel(lons, lats)
+        coords = zip(newLons, newLats)
+        out = []
+        for line, fields in zip(lines, records):
+            if fields is None:
+                out.append(line if line.endswith('\n') else line + '\n')
+                continue
+            lon, lat = next(coords)
+            fields[0] = _format(lon)
+            fields[1] = _format(lat)
+            out.append(delimiter.join(fields) + '\n')
+        outfile.write(''.join(out))
+        count += len(lons)
+    return count
+
+
+def _collect_positions(coordinates, positions):
+    # GeoJSON positions are the innermost lists of numbers
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        positions.append(coordinates)
+    else:
+        for item in coordinates:
+            _collect_positions(item, positions)
+
+
+def _collect_geometry(geometry, positions):
+    if not geometry:
+        return
+    if geometry.get('type') == 'GeometryCollection':
+        for child in geometry.get('geometries', []):
+            _collect_geometry(child, positions)
+    else:
+        _collect_positions(geometry.get('coordinates', []), positions)
+
+
+def _collect_object(obj, positions):
+    kind = obj.get('type')
+    if kind == 'FeatureCollection':
+        for feature in obj.get('features', []):
+            _collect_object(feature, positions)
+    elif kind == 'Feature':
+        _collect_geometry(obj.get('geometry'), positions)
+    else:
+        _collect_geometry(obj, positions)
+
+
+def _convert_positions(positions, kernel):
+    if not positions:
+        return
+    newLons, newLats = kernel([p[0] for p in positions], [p[1] for p in positions])
+    for position, lon, lat in zip(positions, newLons, newLats):
+        position[0] = float(lon)
+        position[1] = float(lat)
+
+
+def convert_geojson(infile, outfile, kernel):
+    """convert a GeoJSON document (FeatureCollection, Feature or geometry)
+
+    The document is parsed as a whole; Z values and properties are kept.
+
+    Returns:
+        int -- number of converted positions
+    """
+    obj = json.load(infile)
+    positions = []
+    _collect_object(obj, positions)
+    _convert_positions(positions, kernel)
+    json.dump(obj, outfile, ensure_ascii=False)
+    outfile.write('\n')
+    return len(positions)
+
+
+def convert_geojsonseq(infile, outfile, kernel, chunk_size=DEFAULT_CHUNK_SIZE):
+    """convert newline-delimited GeoJSON, one feature or geometry per line
+
+    Returns:
+        int -- number of converted positions
+    """
+    count = 0
+    for lines in _chunks(infile, chunk_size):
+        objects = []
+        positions = []
+        for line in lines:
+            # RFC 8142 record separators are tolerated
+            line = line.strip().lstrip('\x1e')
+            if not line:
+                continue
+            obj = json.loads(line)
+            _collect_object(obj, positions)
+            objects.append(obj)
+        _convert_positions(positions, kernel)
+        outfile.write(''.join(json.dumps(obj, ensure_ascii=False) + '\n' for obj in objects))
+        count += len(positions)
+    return count
+
+
+def guess_format(path):
+    """input format from the file extension
+
+    Returns:
+        str -- one of FORMATS, None for stdin, whose format is sniffed instead
+    """
+    if path in (None, '-'):
+        return None
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.geojson', '.json'):
+        return 'geojson'
+    if ext in ('.geojsonl', '.geojsons', '.geojsonseq', '.ndjson', '.jsonl'):
+        return 'geojsonseq'
+    return 'lines'
+
+
+def sniff_format(infile, delimiter=','):
+    """guess the input format from the first line that is not blank
+
+    A JSON object that parses on its own line is geojsonseq, any other line
+    starting with { or [ is GeoJSON. Otherwise the first field decides: a
+    number is a lines record, anything else a csv header. A comment line
+    (#) is only valid in lines.
+
+    Arguments:
+        infile {file} -- input, read up to and including the sniffed line
+
+    Returns:
+        tuple -- (format, input) where input yields every line again, from the first
+    """
+    head = []
+    for line in infile:
+        head.append(line)
+        stripped = line.strip().lstrip('\x1e')
+        if stripped:
+            break
+    else:
+        return 'lines', head
+    if stripped.startswith(('{', '[')):
+        try:
+            input_format = 'geojsonseq' if isinstance(json.loads(stripped), dict) else 'geojson'
+        except ValueError:
+            input_format = 'geojson'
+    elif stripped.startswith('#'):
+        input_format = 'lines'
+    else:
+        first = stripped.split(delimiter)[0] if delimiter.strip() else stripped.split()[0]
+        try:
+            float(first)
+            input_format = 'lines'
+        except ValueError:
+            input_format = 'csv'
+    if input_format == 'geojson':
+        # parsed as a whole by json.load, which needs a file
+        return input_format, io.StringIO(''.join(head) + infile.read())
+    return input_format, chain(head, infile)
+
+
+def _open(path, mode):
+    if path in (None, '-'):
+        stream = sys.stdin if 'r' in mode else sys.stdout
+        return io.TextIOWrapper(stream.buffer, encoding='utf-8', newline='', write_through=False), False
+    return open(path, mode, encoding='utf-8', newline='', buffering=BUFFER_SIZE), True
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m util',
+        description='Convert coordinates between WGS84, GCJ02 and BD09.')
+    parser.add_argument('input', nargs='?', default='-', help='input file, - for stdin (default)')
+    parser.add_argument('output', nargs='?', default='-', help='output file, - for stdout (default)')
+    parser.add_argument('-f', '--from', dest='source', required=True, type=str.upper, choices=registry.SYSTEMS,
+                        help='coordinate system of the input')
+    parser.add_argument('-t', '--to', dest='target', required=True, type=str.upper, choices=registry.SYSTEMS,
+                        help='coordinate system of the output')
+    parser.add_argument('--format', choices=FORMATS,
+                        help='input format, guessed from the input file extension or, for stdin, '
+                             'from the first line by default')
+    parser.add_argument('--lon-field', help='csv longitude column (default: lon/lng/longitude/x)')
+    parser.add_argument('--lat-field', help='csv latitude column (default: lat/latitude/y)')
+    parser.add_argument('-d', '--delimiter', default=',', help='field delimiter for csv and lines (default: ,)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='records converted per batch (default: %d)' % DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--grid', metavar='FILE',
+                        help='use the approximate offset grid in FILE for WGS84<->GCJ02/BD09, '
+                             'building it first if it does not exist (requires numpy)')
+    parser.add_argument('--grid-resolution', type=float, default=DEFAULT_RESOLUTION,
+                        help='node spacing in degrees when building the grid (default: %s)' % DEFAULT_RESOLUTION)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.source == args.target:
+        parser.error('input and output coordinate systems are the same')
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be positive')
+
+    kernel = registry.kernel(args.source, args.target)
+    if args.grid:
+        grid = OffsetGrid.open(args.grid, args.grid_resolution)
+        kernel = grid.kernels().get((args.source, args.target), kernel)
+        sys.stderr.write('using offset grid %s, largest error sampled at the cell centres and edges %.3g degrees\n'
+                         % (args.grid, grid.sampled_max_error))
+    input_format = args.format or guess_format(args.input)
+    delimiter = '\t' if args.delimiter == '\\t' else args.delimiter
+
+    infile, close_in = _open(args.input, 'r')
+    outfile, close_out = _open(args.output, 'w')
+    try:
+        records = infile
+        if input_format is None:
+            input_format, records = sniff_format(infile, delimiter)
+            sys.stderr.write('reading stdin as %s, use --format to override\n' % input_format)
+        if input_format == 'csv':
+            convert_csv(records, outfile, kernel, args.lon_field, args.lat_field, delimiter, args.chunk_size)
+        elif input_format == 'lines':
+            convert_lines(records, outfile, kernel, delimiter, args.chunk_size)
+        elif input_format == 'geojson':
+            convert_geojson(records, outfile, kernel)
+        else:
+            convert_geojsonseq(records, outfile, kernel, args.chunk_size)
+    except (ValueError, IndexError) as e:
+        sys.stderr.write('error: %s\n' % e)
+        return 1
+    finally:
+        outfile.flush()
+        # a wrapper around stdin/stdout would close the standard stream when garbage collected
+        for stream, close in ((infile, close_in), (outfile, close_out)):
+            if close:
+                stream.close()
+            else:
+                stream.detach()
+    return 0
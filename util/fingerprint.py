@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""Sidecar fingerprint index for incremental re-conversion.
+
+The index is a small SQLite file next to the output. It maps every input
+feature id to a fingerprint of the feature (geometry WKB and attributes)
+and to the id of the feature written for it in the output, plus a few meta
+values (conversion direction, output fields) that must match for the
+index to be reused. A later run converts and rewrites only the features
+whose fingerprint is new or different, and deletes the outputs of input
+features that disappeared.
+
+Features seen in the current run are recorded in a temporary table, so
+finding the deleted ones needs no memory proportional to the layer size.
+"""
+import hashlib
+import os
+import sqlite3
+
+
+SUFFIX = '.ccindex'
+
+# max host parameters per statement on old SQLite builds
+_MAX_VARIABLES = 900
+
+
+def index_path(output_path):
+    """path of the sidecar index for an output file"""
+    return output_path + SUFFIX
+
+
+def fingerprint(*parts):
+    """16 byte digest of the given bytes objects"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(len(part).to_bytes(8, 'little'))
+        digest.update(part)
+    return digest.digest()
+
+
+def _chunks(values, size=_MAX_VARIABLES):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class FingerprintIndex():
+    """input feature id -> (fingerprint, output feature id), stored in SQLite
+
+    Arguments:
+        path {str} -- index file, created if it does not exist
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS features '
+                        '(fid INTEGER PRIMARY KEY, fingerprint BLOB, out_fid INTEGER)')
+        self.db.execute('CREATE TEMP TABLE seen (fid INTEGER PRIMARY KEY)')
+        self.db.commit()
+
+    def __len__(self):
+        return self.db.execute('SELECT count(*) FROM features').fetchone()[0]
+
+    def get_meta(self, key):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def lookup(self, fids):
+        """stored entries of the given input ids
+
+        Returns:
+            dict -- fid -> (fingerprint, out_fid), ids not in the index are left out
+        """
+        result = {}
+        for chunk in _chunks(list(fids)):
+            rows = self.db.execute(
+                'SELECT fid, fingerprint, out_fid FROM features WHERE fid IN (%s)' % ','.join('?' * len(chunk)),
+                chunk)
+            for fid, digest, out_fid in rows:
+                result[fid] = (digest, out_fid)
+        return result
+
+    def mark_seen(self, fids):
+        """record input ids present in the current run"""
+        self.db.executemany('INSERT OR IGNORE INTO seen (fid) VALUES (?)', ((fid,) for fid in fids))
+
+    def update(self, rows):
+        """store (fid, fingerprint, out_fid) rows"""
+        self.db.executemany('INSERT OR REPLACE INTO features (fid, fingerprint, out_fid) VALUES (?, ?, ?)', rows)
+
+    def stale(self):
+        """entries whose input id was not seen in the current run
+
+        Returns:
+            list -- (fid, out_fid) tuples
+        """
+        return self.db.execute(
+            'SELECT fid, out_fid FROM features WHERE fid NOT IN (SELECT fid FROM seen)').fetchall()
+
+    def remove(self, fids):
+        self.db.executemany('DELETE FROM features WHERE fid = ?', ((fid,) for fid in fids))
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    @staticmethod
+    def delete(path):
+        """remove an index file if it exists"""
+        if os.path.exists(path):
+            os.remove(path)
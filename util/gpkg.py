@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Bulk writer for GeoPackage feature tables.
+
+The table and its metadata are created beforehand (by OGR, with the
+spatial index switched off); GeoPackageWriter then appends rows with plain
+sqlite3: one prepared INSERT run through executemany per batch, committed
+every transaction_size rows, with geometries encoded as GeoPackage binary
+blobs. The extent in gpkg_contents is updated on close. Build the spatial
+index afterwards, in one pass, if the output needs one.
+
+Rows are written through a write-ahead log with synchronous = NORMAL, so
+commits do not wait for the disk but a crash or power loss can only lose
+the last transactions, never corrupt the file. The file is switched back
+to the rollback journal on close, as GeoPackage readers expect.
+"""
+import sqlite3
+import struct
+
+
+DEFAULT_TRANSACTION_SIZE = 100000
+
+# magic, version, flags (little endian, xy envelope / little endian, empty), srs_id
+_HEADER = struct.Struct('<2sBBi')
+_ENVELOPE = struct.Struct('<4d')
+_FLAGS_ENVELOPE = 0x03
+_FLAGS_EMPTY = 0x11
+
+
+def geometry_blob(wkb, srs_id, envelope=None):
+    """GeoPackage binary geometry
+
+    Arguments:
+        wkb {bytes} -- ISO WKB geometry
+        srs_id {int} -- srs_id of the geometry column
+
+    Keyword Arguments:
+        envelope {tuple} -- (minx, maxx, miny, maxy), None for an empty geometry (default: {None})
+
+    Returns:
+        bytes -- header, envelope and WKB
+    """
+    if envelope is None:
+        return _HEADER.pack(b'GP', 0, _FLAGS_EMPTY, srs_id) + bytes(wkb)
+    return _HEADER.pack(b'GP', 0, _FLAGS_ENVELOPE, srs_id) + _ENVELOPE.pack(*envelope) + bytes(wkb)
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+class GeoPackageWriter():
+    """append features to the feature table of a GeoPackage
+
+    Arguments:
+        path {str} -- existing GeoPackage with one feature table
+        columns {list} -- attribute columns, in the order of the values passed to add()
+
+    Keyword Arguments:
+        transaction_size {int} -- rows per transaction (default: {DEFAULT_TRANSACTION_SIZE})
+
+    Raises:
+        ValueError -- the file has no feature table, or a column is missing
+    """
+
+    def __init__(self, path, columns, transaction_size=DEFAULT_TRANSACTION_SIZE):
+        self.transaction_size = transaction_size
+        # transactions are managed explicitly
+        self.db = sqlite3.connect(path, isolation_level=None)
+        row = self.db.execute('SELECT table_name, column_name, srs_id FROM gpkg_geometry_columns').fetchone()
+        if row is None:
+            self.db.close()
+            raise ValueError('%s has no feature table' % path)
+        self.table, self.geometry_column, self.srs_id = row
+        existing = {info[1] for info in self.db.execute('PRAGMA table_info(%s)' % _quote(self.table))}
+        missing = [column for column in columns if column not in existing]
+        if missing:
+            self.db.close()
+            raise ValueError('missing columns in %s: %s' % (self.table, ', '.join(missing)))
+        names = [self.geometry_column] + list(columns)
+        self.sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+            _quote(self.table), ', '.join(_quote(name) for name in names), ', '.join('?' * len(names)))
+        self.count = 0
+        self.extent = None
+        self._pending = 0
+        # with WAL, NORMAL only syncs at checkpoints and stays crash safe
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        self.db.execute('BEGIN')
+
+    def add(self, rows):
+        """append rows
+
+        Arguments:
+            rows {list} -- (wkb, envelope, values) tuples; wkb is None for a null
+                geometry, envelope is (minx, maxx, miny, maxy) or None for an empty one
+        """
+        srs_id = self.srs_id
+        extent = self.extent
+        params = []
+        for wkb, envelope, values in rows:
+            if wkb is None:
+                blob = None
+            else:
+                blob = geometry_blob(wkb, srs_id, envelope)
+                if envelope is not None:
+                    if extent is None:
+                        extent = list(envelope)
+                    else:
+                        extent[0] = min(extent[0], envelope[0])
+                        extent[1] = max(extent[1], envelope[1])
+                        extent[2] = min(extent[2], envelope[2])
+                        extent[3] = max(extent[3], envelope[3])
+            params.append((blob,) + tuple(values))
+        self.extent = extent
+        self.db.executemany(self.sql, params)
+        self.count += len(params)
+        self._pending += len(params)
+        if self._pending >= self.transaction_size:
+            self.db.execute('COMMIT')
+            self.db.execute('BEGIN')
+            self._pending = 0
+
+    def close(self):
+        """commit the last transaction, update the extent and close the file"""
+        if self.db is None:
+            return
+        if self.extent is not None:
+            minx, maxx, miny, maxy = self.extent
+            self.db.execute(
+                "UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, max_y = ?, "
+                "last_change = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE table_name = ?",
+                (minx, miny, maxx, maxy, self.table))
+        self.db.execute('COMMIT')
+        self._close()
+
+    def abort(self):
+        """roll back the uncommitted rows and close the file"""
+        if self.db is None:
+            return
+        self.db.execute('ROLLBACK')
+        self._close()
+
+    def _close(self):
+        # checkpoints the log into the file and removes the -wal and -shm files
+        self.db.execute('PRAGMA journal_mode = DELETE')
+        self.db.close()
+        self.db = None
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""Precomputed GCJ02 offset grid, a fast approximate engine.
+
+The dLon/dLat offsets of wgs2gcj are evaluated once on a regular grid over
+the outOfChina box and answered afterwards by bilinear interpolation, so a
+query costs a handful of multiplications instead of a dozen sines; the
+inverse needs only a few interpolations instead of repeated exact
+evaluations.
+
+The grid is saved as a flat binary file and opened with numpy.memmap, so
+every process that opens the same file shares one copy through the page
+cache and nobody pays for building it twice. OffsetGrid.open() builds the
+file on first use.
+
+The interpolation error is measured when the grid is built, at every cell
+centre and edge midpoint (where bilinear interpolation is usually worst),
+and published as sampled_max_error, in degrees. It is the largest error
+found at those samples, not a proven bound. Roughly: 0.05 deg -> 3 m,
+0.02 deg -> 0.5 m, 0.01 deg -> 0.1 m.
+
+GridKernel wraps a grid file as a picklable array kernel that opens (or
+builds) the file on first use, so it can be handed to worker processes
+and used wherever a util.registry kernel is accepted.
+"""
+import os
+import struct
+import tempfile
+
+from .transform import (GCJ2WGS_MAX_ITER, GCJ2WGS_THRESHOLD, _asarrays, _wgs2gcj_delta_array,
+                        bd2gcj_array, gcj2bd_array, np, outOfChina_array)
+
+
+# the outOfChina box
+LON_MIN, LON_MAX = 72.004, 137.8347
+LAT_MIN, LAT_MAX = 0.8293, 55.8271
+
+DEFAULT_RESOLUTION = 0.02
+
+# magic, nx, ny, lon0, lat0, resolution, sampled_max_error
+_HEADER = struct.Struct('<8sIIdddd')
+_MAGIC = b'GCJGRID1'
+_ROWS_PER_BLOCK = 64
+
+# directions the grid speeds up, see OffsetGrid.kernels
+GRID_DIRECTIONS = (('WGS84', 'GCJ02'), ('GCJ02', 'WGS84'), ('WGS84', 'BD09'), ('BD09', 'WGS84'))
+
+# grids opened in this process, by path
+_OPENED = {}
+
+
+class OffsetGrid():
+    """bilinear GCJ02 offset grid
+
+    Arguments:
+        dLon {ndarray} -- lon offsets, shape (ny, nx)
+        dLat {ndarray} -- lat offsets, shape (ny, nx)
+        lon0 {float} -- lon of the first column
+        lat0 {float} -- lat of the first row
+        resolution {float} -- node spacing in degrees
+        sampled_max_error {float} -- largest interpolation error measured at the cell centres and
+            edge midpoints, in degrees
+    """
+
+    def __init__(self, dLon, dLat, lon0, lat0, resolution, sampled_max_error):
+        if np is None:
+            raise ImportError('OffsetGrid requires numpy')
+        self.dLon = dLon
+        self.dLat = dLat
+        self.lon0 = lon0
+        self.lat0 = lat0
+        self.resolution = resolution
+        self.sampled_max_error = sampled_max_error
+        self.ny, self.nx = dLon.shape
+
+    @classmethod
+    def build(cls, resolution=DEFAULT_RESOLUTION):
+        """evaluate the offsets on a new grid over the china box
+
+        Keyword Arguments:
+            resolution {float} -- node spacing in degrees (default: {DEFAULT_RESOLUTION})
+
+        Returns:
+            OffsetGrid -- the grid
+        """
+        if np is None:
+            raise ImportError('OffsetGrid requires numpy')
+        nx = int(np.ceil((LON_MAX - LON_MIN) / resolution)) + 1
+        ny = int(np.ceil((LAT_MAX - LAT_MIN) / resolution)) + 1
+        lons = LON_MIN + np.arange(nx) * resolution
+        dLon = np.empty((ny, nx))
+        dLat = np.empty((ny, nx))
+        for start in range(0, ny, _ROWS_PER_BLOCK):
+            lats = LAT_MIN + np.arange(start, min(start + _ROWS_PER_BLOCK, ny)) * resolution
+            gridLons, gridLats = np.meshgrid(lons, lats)
+            dLon[start:start + len(lats)], dLat[start:start + len(lats)] = _wgs2gcj_delta_array(gridLons, gridLats)
+        grid = cls(dLon, dLat, LON_MIN, LAT_MIN, resolution, 0.0)
+        grid.sampled_max_error = grid.measure_error()
+        return grid
+
+    def measure_error(self):
+        """largest interpolation error at every cell centre and edge midpoint, in degrees
+
+        The error is sampled, not bounded: points between the samples can be slightly worse.
+        """
+        lons = self.lon0 + np.arange(self.nx) * self.resolution
+        half = self.resolution / 2.0
+        error = 0.0
+        for start in range(0, self.ny - 1, _ROWS_PER_BLOCK):
+            lats = self.lat0 + np.arange(start, min(start + _ROWS_PER_BLOCK, self.ny - 1)) * self.resolution
+            for offsetLon, offsetLat in ((half, half), (half, 0.0), (0.0, half)):
+                sampleLons, sampleLats = np.meshgrid(lons[:-1] + offsetLon, lats + offsetLat)
+                exactLon, exactLat = _wgs2gcj_delta_array(sampleLons, sampleLats)
+                gridLon, gridLat = self.offsets(sampleLons, sampleLats)
+                error = max(error, float(np.abs(gridLon - exactLon).max()), float(np.abs(gridLat - exactLat).max()))
+        return error
+
+    def save(self, path):
+        """write the grid to path atomically, readers never see a partial file"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, self.nx, self.ny, self.lon0, self.lat0,
+                                     self.resolution, self.sampled_max_error))
+                f.write(np.ascontiguousarray(self.dLon, dtype='<f8').tobytes())
+                f.write(np.ascontiguousarray(self.dLat, dtype='<f8').tobytes())
+            # mkstemp creates the file private to the owner, the grid is meant to be shared
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """memory-map a grid file written by save()"""
+        if np is None:
+            raise ImportError('OffsetGrid requires numpy')
+        with open(path, 'rb') as f:
+            magic, nx, ny, lon0, lat0, resolution, sampled_max_error = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError('%s is not an offset grid file' % path)
+        data = np.memmap(path, dtype='<f8', mode='r', offset=_HEADER.size, shape=(2, ny, nx))
+        return cls(data[0], data[1], lon0, lat0, resolution, sampled_max_error)
+
+    @classmethod
+    def open(cls, path, resolution=DEFAULT_RESOLUTION):
+        """load the grid at path, building and saving it first if it does not exist"""
+        if not os.path.exists(path):
+            cls.build(resolution).save(path)
+        return cls.load(path)
+
+    def offsets(self, wgsLons, wgsLats):
+        """interpolated dLon/dLat at wgs coords, ignores the china box"""
+        fx = (wgsLons - self.lon0) / self.resolution
+        fy = (wgsLats - self.lat0) / self.resolution
+        ix = np.clip(np.floor(fx).astype(np.intp), 0, self.nx - 2)
+        iy = np.clip(np.floor(fy).astype(np.intp), 0, self.ny - 2)
+        tx = fx - ix
+        ty = fy - iy
+        # gather the four corners from the flattened grids with one index array
+        i00 = iy * self.nx + ix
+        i01 = i00 + self.nx
+        dLons = self.dLon.reshape(-1)
+        dLats = self.dLat.reshape(-1)
+        lon00, lon10, lon01, lon11 = dLons.take(i00), dLons.take(i00 + 1), dLons.take(i01), dLons.take(i01 + 1)
+        lat00, lat10, lat01, lat11 = dLats.take(i00), dLats.take(i00 + 1), dLats.take(i01), dLats.take(i01 + 1)
+        dLon = lon00 + tx * (lon10 - lon00) + ty * (lon01 - lon00 + tx * (lon11 - lon01 - lon10 + lon00))
+        dLat = lat00 + tx * (lat10 - lat00) + ty * (lat01 - lat00 + tx * (lat11 - lat01 - lat10 + lat00))
+        return dLon, dLat
+
+    def wgs2gcj(self, wgsLons, wgsLats):
+        """wgs coords to gcj, approximate, see sampled_max_error
+
+        Returns:
+            tuple -- gcj lons and lats
+        """
+        wgsLons, wgsLats = _asarrays(wgsLons, wgsLats)
+        gcjLons = wgsLons.copy()
+        gcjLats = wgsLats.copy()
+        inside = ~outOfChina_array(wgsLons, wgsLats)
+        dLon, dLat = self.offsets(wgsLons[inside], wgsLats[inside])
+        gcjLons[inside] += dLon
+        gcjLats[inside] += dLat
+        return gcjLons, gcjLats
+
+    def gcj2wgs(self, gcjLons, gcjLats, threshold=None, max_iter=None):
+        """gcj coords to wgs, same fixed-point iteration as gcj2wgs on the grid
+
+        Returns:
+            tuple -- wgs lons and lats
+        """
+        if threshold is None:
+            threshold = GCJ2WGS_THRESHOLD
+        if max_iter is None:
+            max_iter = GCJ2WGS_MAX_ITER
+        gcjLons, gcjLats = _asarrays(gcjLons, gcjLats)
+        wLons = gcjLons.copy()
+        wLats = gcjLats.copy()
+        active = np.ones(wLons.shape, dtype=bool)
+        for _ in range(max_iter):
+            if not active.any():
+                break
+            w0Lons, w0Lats = wLons[active], wLats[active]
+            g1Lons, g1Lats = self.wgs2gcj(w0Lons, w0Lats)
+            w1Lons = w0Lons - (g1Lons - gcjLons[active])
+            w1Lats = w0Lats - (g1Lats - gcjLats[active])
+            moving = (np.abs(w1Lons - w0Lons) >= threshold) | (np.abs(w1Lats - w0Lats) >= threshold)
+            wLons[active] = w1Lons
+            wLats[active] = w1Lats
+            active[active] = moving
+        return wLons, wLats
+
+    def wgs2bd(self, wgsLons, wgsLats):
+        return gcj2bd_array(*self.wgs2gcj(wgsLons, wgsLats))
+
+    def bd2wgs(self, bdLons, bdLats):
+        return self.gcj2wgs(*bd2gcj_array(bdLons, bdLats))
+
+    def kernels(self):
+        """array kernels keyed by (input system, output system), for the directions the grid speeds up"""
+        return {
+            ('WGS84', 'GCJ02'): self.wgs2gcj,
+            ('GCJ02', 'WGS84'): self.gcj2wgs,
+            ('WGS84', 'BD09'): self.wgs2bd,
+            ('BD09', 'WGS84'): self.bd2wgs,
+        }
+
+
+def open_grid(path, resolution=DEFAULT_RESOLUTION):
+    """OffsetGrid.open, once per process and path
+
+    Returns:
+        OffsetGrid -- the grid, shared by every caller in the process
+    """
+    grid = _OPENED.get(path)
+    if grid is None:
+        grid = _OPENED[path] = OffsetGrid.open(path, resolution)
+    return grid
+
+
+class GridKernel():
+    """array kernel converting through the offset grid file at path
+
+    Only the path and direction are stored, so the kernel pickles cheaply
+    and works in worker processes; the file is opened on the first call,
+    and built first if it does not exist (which takes a while at the
+    default resolution, open_grid() it beforehand where that matters).
+
+    Arguments:
+        path {str} -- grid file, see OffsetGrid.open
+        direction {tuple} -- (input system, output system), one of GRID_DIRECTIONS
+
+    Raises:
+        ValueError -- the grid does not cover the direction
+    """
+
+    def __init__(self, path, direction):
+        if tuple(direction) not in GRID_DIRECTIONS:
+            raise ValueError('the offset grid does not convert %s to %s' % tuple(direction))
+        self.path = path
+        self.direction = tuple(direction)
+
+    def __call__(self, lons, lats):
+        return open_grid(self.path).kernels()[self.direction](lons, lats)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Process pool helpers for converting coordinate chunks in parallel.
+
+Only plain coordinate arrays cross the process boundary, so workers never
+import QGIS; they just run the array kernels of util.registry.
+"""
+import multiprocessing
+import os
+import sys
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from .grid import GridKernel
+from .registry import kernel
+from .transform import np
+
+
+def convert_chunk(direction, lons, lats, grid_path=None):
+    """convert one chunk of coordinates, runs in a worker process
+
+    Workers resolve direction in a fresh interpreter, so only conversions
+    registered when util.registry is imported are available here.
+
+    Arguments:
+        direction {tuple} -- (input system, output system), e.g. ('WGS84', 'GCJ02')
+        lons {array} -- lons
+        lats {array} -- lats
+
+    Keyword Arguments:
+        grid_path {str} -- convert through this offset grid file instead, see util.grid.GridKernel;
+            each worker memory-maps the file once (default: {None})
+
+    Returns:
+        tuple -- two array('d') with the converted lons and lats
+    """
+    convert = kernel(*direction) if grid_path is None else GridKernel(grid_path, direction)
+    newLons, newLats = convert(lons, lats)
+    return _doubles(newLons), _doubles(newLats)
+
+
+def _doubles(values):
+    # array('d') pickles as one buffer; an ndarray is copied into it as
+    # bytes, iterating it would create a Python float per value
+    if np is None or not isinstance(values, np.ndarray):
+        return array('d', values)
+    result = array('d')
+    result.frombytes(memoryview(np.ascontiguousarray(values, dtype=np.float64)).cast('B'))
+    return result
+
+
+def _python_executable():
+    # Inside QGIS sys.executable is the QGIS binary, which cannot run the
+    # worker bootstrap; use the interpreter shipped next to it instead.
+    name = os.path.basename(sys.executable).lower()
+    if name.startswith('python'):
+        return sys.executable
+    for candidate in ('pythonw.exe', 'python.exe', os.path.join('bin', 'python3'), os.path.join('bin', 'python')):
+        path = os.path.join(sys.exec_prefix, candidate)
+        if os.path.exists(path):
+            return path
+    return sys.executable
+
+
+def create_pool(workers):
+    """create a process pool for convert_chunk
+
+    Arguments:
+        workers {int} -- number of worker processes
+
+    Returns:
+        ProcessPoolExecutor -- the pool
+    """
+    context = multiprocessing.get_context('spawn')
+    context.set_executable(_python_executable())
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def convert_chunks(direction, chunks, workers, pool=None, grid_path=None):
+    """convert chunks of coordinates in a process pool, in order
+
+    Chunks are submitted lazily with at most two chunks per worker in
+    flight, so memory stays bounded however many chunks there are. Results
+    are yielded in the order the chunks were given, and every point is
+    converted independently, so the output is the same for any number of
+    workers. Empty chunks are handed back without a trip to the pool.
+
+    Arguments:
+        direction {tuple} -- (input system, output system)
+        chunks {iterable} -- (lons, lats, payload) tuples; payload is handed back untouched
+        workers {int} -- number of worker processes
+
+    Keyword Arguments:
+        pool {ProcessPoolExecutor} -- pool to reuse, a new one is created and shut down when None (default: {None})
+        grid_path {str} -- offset grid file to convert through, see convert_chunk; build it
+            beforehand, or every worker builds its own (default: {None})
+
+    Yields:
+        tuple -- (lons, lats, payload) with converted coordinates
+    """
+    own_pool = pool is None
+    if own_pool:
+        pool = create_pool(workers)
+    pending = deque()
+    try:
+        for lons, lats, payload in chunks:
+            if len(lons):
+                future = pool.submit(convert_chunk, direction, lons, lats, grid_path)
+            else:
+                future = Future()
+                future.set_result((array('d'), array('d')))
+            pending.append((future, payload))
+            if len(pending) >= workers * 2:
+                future, done_payload = pending.popleft()
+                newLons, newLats = future.result()
+                yield newLons, newLats, done_payload
+        while pending:
+            future, done_payload = pending.popleft()
+            newLons, newLats = future.result()
+            yield newLons, newLats, done_payload
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        if own_pool:
+            pool.shutdown(wait=True)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Registry of conversions between coordinate systems.
+
+Every direction is resolved once, before converting, into a plain
+(lon, lat) callable or an array kernel, so the per-vertex work is just the
+math. Directions without a registered conversion are chained through
+intermediate systems; register a fused kernel to replace a chain.
+
+    convert = conversion('WGS84', 'GCJ02')
+    lon, lat = convert(116.4, 39.9)
+"""
+from collections import deque
+
+from . import transform
+
+
+SYSTEMS = ('WGS84', 'GCJ02', 'BD09')
+
+# (input system, output system) -> scalar conversion / array kernel
+_SCALAR = {}
+_ARRAY = {}
+# directions that leave every point out of china unchanged
+_CHINA_ONLY = set()
+
+
+def register(source, target, scalar=None, array=None, china_only=False):
+    """register the scalar and/or array conversion from source to target
+
+    A registration replaces any earlier one for the same direction,
+    including a chain.
+
+    Arguments:
+        source {str} -- input system, e.g. 'WGS84'
+        target {str} -- output system
+
+    Keyword Arguments:
+        scalar {callable} -- (lon, lat) -> (lon, lat) (default: {None})
+        array {callable} -- (lons, lats) -> (lons, lats) (default: {None})
+        china_only {bool} -- points out of china are returned unchanged (default: {False})
+    """
+    if china_only:
+        _CHINA_ONLY.add((source, target))
+    else:
+        _CHINA_ONLY.discard((source, target))
+    if scalar is not None:
+        _SCALAR[(source, target)] = scalar
+    if array is not None:
+        _ARRAY[(source, target)] = array
+
+
+def _identity(lons, lats):
+    return lons, lats
+
+
+def _chain(first, second):
+    return lambda lon, lat: second(*first(lon, lat))
+
+
+def _resolve(table, source, target):
+    if source == target:
+        return _identity
+    func = table.get((source, target))
+    if func is not None:
+        return func
+    # shortest chain of registered conversions
+    previous = {source: None}
+    queue = deque([source])
+    while queue:
+        system = queue.popleft()
+        for (start, end) in table:
+            if start != system or end in previous:
+                continue
+            previous[end] = system
+            if end == target:
+                steps = []
+                while end != source:
+                    steps.append(table[(previous[end], end)])
+                    end = previous[end]
+                func = steps.pop()
+                while steps:
+                    func = _chain(func, steps.pop())
+                return func
+            queue.append(end)
+    raise KeyError('no conversion from %s to %s' % (source, target))
+
+
+def conversion(source, target):
+    """scalar conversion from source to target
+
+    Raises:
+        KeyError -- no registered conversion or chain connects the two systems
+
+    Returns:
+        callable -- (lon, lat) -> (lon, lat)
+    """
+    return _resolve(_SCALAR, source, target)
+
+
+def kernel(source, target):
+    """array kernel from source to target, see conversion()
+
+    Returns:
+        callable -- (lons, lats) -> (lons, lats)
+    """
+    return _resolve(_ARRAY, source, target)
+
+
+def china_only(source, target):
+    """whether the conversion returns points out of china unchanged
+
+    Only then can geometries lying entirely out of china skip it; the BD09
+    offset applies everywhere. Chained directions are reported as False.
+    """
+    return source == target or (source, target) in _CHINA_ONLY
+
+
+def directions():
+    """registered (input system, output system) pairs, in registration order"""
+    return list(_SCALAR)
+
+
+register('WGS84', 'GCJ02', transform.wgs2gcj, transform.wgs2gcj_array, china_only=True)
+register('WGS84', 'BD09', transform.wgs2bd, transform.wgs2bd_array)
+register('GCJ02', 'WGS84', transform.gcj2wgs, transform.gcj2wgs_array, china_only=True)
+register('GCJ02', 'BD09', transform.gcj2bd, transform.gcj2bd_array)
+register('BD09', 'WGS84', transform.bd2wgs, transform.bd2wgs_array)
+register('BD09', 'GCJ02', transform.bd2gcj, transform.bd2gcj_array)
@@ -2,6 +2,11 @@
 from math import sin, cos, sqrt, fabs, atan2
 from math import pi as PI
 
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the *_array functions fall back to scalar loops
+    np = None
+
 
 # define ellipsoid
 a = 6378245.0
@@ -9,6 +14,12 @@ f = 1 / 298.3
 b = a * (1 - f)
 ee = 1 - (b * b) / (a * a)
 
+# gcj2wgs iteration settings. Almost every point converges in fewer than ten
+# iterations; the cap only matters for points on the border of the china box,
+# which can bounce in and out of it forever.
+GCJ2WGS_THRESHOLD = 1e-6
+GCJ2WGS_MAX_ITER = 100
+
 
 def outOfChina(lng, lat):
     """check weather lng and lat out of china
@@ -23,6 +34,37 @@ def outOfChina(lng, lat):
     return not (72.004 <= lng <= 137.8347 and 0.8293 <= lat <= 55.8271)
 
 
+def boxOutOfChina(minLng, minLat, maxLng, maxLat):
+    """check weather a bounding box lies entirely out of china
+    
+    Every point of such a box is outOfChina, so wgs2gcj and gcj2wgs return
+    it unchanged and the whole box can skip the conversion.
+    
+    Arguments:
+        minLng {float} -- west
+        minLat {float} -- south
+        maxLng {float} -- east
+        maxLat {float} -- north
+    
+    Returns:
+        Bollen -- True or False
+    """
+    return maxLng < 72.004 or minLng > 137.8347 or maxLat < 0.8293 or minLat > 55.8271
+
+
+def outOfChina_array(lngs, lats):
+    """vectorized outOfChina
+    
+    Arguments:
+        lngs {ndarray} -- longitudes
+        lats {ndarray} -- latitudes
+    
+    Returns:
+        ndarray -- boolean mask, True where the point is out of china
+    """
+    return ~((72.004 <= lngs) & (lngs <= 137.8347) & (0.8293 <= lats) & (lats <= 55.8271))
+
+
 def transformLat(x, y):
     ret = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * sqrt(fabs(x))
     ret = ret + (20.0 * sin(6.0 * x * PI) + 20.0 * sin(2.0 * x * PI)) * 2.0 / 3.0
@@ -39,6 +81,22 @@ def transformLon(x, y):
     return ret
 
 
+def transformLat_array(x, y):
+    ret = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * np.sqrt(np.fabs(x))
+    ret = ret + (20.0 * np.sin(6.0 * x * PI) + 20.0 * np.sin(2.0 * x * PI)) * 2.0 / 3.0
+    ret = ret + (20.0 * np.sin(y * PI) + 40.0 * np.sin(y / 3.0 * PI)) * 2.0 / 3.0
+    ret = ret + (160.0 * np.sin(y / 12.0 * PI) + 320.0 * np.sin(y * PI / 30.0)) * 2.0 / 3.0
+    return ret
+
+
+def transformLon_array(x, y):
+    ret = 300.0 + x + 2.0 * y + 0.1 * x * x +  0.1 * x * y + 0.1 * np.sqrt(np.fabs(x))
+    ret = ret + (20.0 * np.sin(6.0 * x * PI) + 20.0 * np.sin(2.0 * x * PI)) * 2.0 / 3.0
+    ret = ret + (20.0 * np.sin(x * PI) + 40.0 * np.sin(x / 3.0 * PI)) * 2.0 / 3.0
+    ret = ret + (150.0 * np.sin(x / 12.0 * PI) + 300.0 * np.sin(x * PI / 30.0)) * 2.0 / 3.0
+    return ret
+
+
 def wgs2gcj(wgsLon, wgsLat):
     """wgs coord to gcj
     
@@ -65,22 +123,35 @@ def wgs2gcj(wgsLon, wgsLat):
     return (gcjLon, gcjLat)
 
 
-def gcj2wgs(gcjLon, gcjLat):
-    g0 = (gcjLon, gcjLat)
-    w0 = g0
-    g1 = wgs2gcj(w0[0], w0[1])
-    # w1 = w0 - (g1 - g0)
-    w1 = tuple(map(lambda x: x[0]-(x[1]-x[2]), zip(w0,g1,g0)))
-    # delta = w1 - w0
-    delta = tuple(map(lambda x: x[0] - x[1], zip(w1, w0)))
-    while (abs(delta[0]) >= 1e-6 or abs(delta[1]) >= 1e-6):
-        w0 = w1
-        g1 = wgs2gcj(w0[0], w0[1])
+def gcj2wgs(gcjLon, gcjLat, threshold=None, max_iter=None):
+    """gcj coord to wgs, solved by fixed-point iteration
+    
+    Arguments:
+        gcjLon {float} -- lon
+        gcjLat {float} -- lat
+    
+    Keyword Arguments:
+        threshold {float} -- stop when both deltas are below it (default: {GCJ2WGS_THRESHOLD})
+        max_iter {int} -- iteration cap (default: {GCJ2WGS_MAX_ITER})
+    
+    Returns:
+        tuple -- wgs coords
+    """
+    if threshold is None:
+        threshold = GCJ2WGS_THRESHOLD
+    if max_iter is None:
+        max_iter = GCJ2WGS_MAX_ITER
+    w0Lon, w0Lat = w1Lon, w1Lat = gcjLon, gcjLat
+    for _ in range(max_iter):
+        g1Lon, g1Lat = wgs2gcj(w0Lon, w0Lat)
         # w1 = w0 - (g1 - g0)
-        w1 = tuple(map(lambda x: x[0]-(x[1]-x[2]), zip(w0,g1,g0)))
+        w1Lon = w0Lon - (g1Lon - gcjLon)
+        w1Lat = w0Lat - (g1Lat - gcjLat)
         # delta = w1 - w0
-        delta = tuple(map(lambda x: x[0] - x[1], zip(w1, w0)))
-    return w1
+        if abs(w1Lon - w0Lon) < threshold and abs(w1Lat - w0Lat) < threshold:
+            break
+        w0Lon, w0Lat = w1Lon, w1Lat
+    return (w1Lon, w1Lat)
 
 
 def gcj2bd(gcjLon, gcjLat):
@@ -102,13 +173,423 @@ def bd2gcj(bdLon, bdLat):
 
 
 def wgs2bd(wgsLon, wgsLat):
-    gcj = wgs2gcj(wgsLon, wgsLat)
-    return gcj2bd(gcj[0], gcj[1])
+    """wgs coord to bd in one pass, without the intermediate gcj tuple
+    
+    Arguments:
+        wgsLon {float} -- lon
+        wgsLat {float} -- lat
+    
+    Returns:
+        tuple -- bd coords
+    """
+    gcjLon, gcjLat = wgsLon, wgsLat
+    if not outOfChina(wgsLon, wgsLat):
+        dLat = transformLat(wgsLon - 105.0, wgsLat - 35.0)
+        dLon = transformLon(wgsLon - 105.0, wgsLat - 35.0)
+        radLat = wgsLat / 180.0 * PI
+        magic = sin(radLat)
+        magic = 1 - ee * magic * magic
+        sqrtMagic = sqrt(magic)
+        gcjLat = wgsLat + (dLat * 180.0) / ((a * (1 - ee)) / (magic * sqrtMagic) * PI)
+        gcjLon = wgsLon + (dLon * 180.0) / (a / sqrtMagic * cos(radLat) * PI)
+    z = sqrt(gcjLon * gcjLon + gcjLat * gcjLat) + 0.00002 * sin(gcjLat * PI * 3000.0 / 180.0)
+    theta = atan2(gcjLat, gcjLon) + 0.000003 * cos(gcjLon * PI * 3000.0 / 180.0)
+    return (z * cos(theta) + 0.0065, z * sin(theta) + 0.006)
+
+
+def bd2wgs(bdLon, bdLat, threshold=None, max_iter=None):
+    """bd coord to wgs in one pass
+    
+    The gcj target is computed from the bd input in place and the gcj2wgs
+    iteration is seeded with it directly, so the result is the same as
+    gcj2wgs(*bd2gcj(bdLon, bdLat)).
+    
+    Arguments:
+        bdLon {float} -- lon
+        bdLat {float} -- lat
+    
+    Keyword Arguments:
+        threshold {float} -- see gcj2wgs
+        max_iter {int} -- see gcj2wgs
+    
+    Returns:
+        tuple -- wgs coords
+    """
+    if threshold is None:
+        threshold = GCJ2WGS_THRESHOLD
+    if max_iter is None:
+        max_iter = GCJ2WGS_MAX_ITER
+    x = bdLon - 0.0065
+    y = bdLat - 0.006
+    z = sqrt(x * x + y * y) - 0.00002 * sin(y * PI * 3000.0 / 180.0)
+    theta = atan2(y, x) - 0.000003 * cos(x * PI * 3000.0 / 180.0)
+    gcjLon = z * cos(theta)
+    gcjLat = z * sin(theta)
+    w0Lon, w0Lat = w1Lon, w1Lat = gcjLon, gcjLat
+    for _ in range(max_iter):
+        g1Lon, g1Lat = wgs2gcj(w0Lon, w0Lat)
+        w1Lon = w0Lon - (g1Lon - gcjLon)
+        w1Lat = w0Lat - (g1Lat - gcjLat)
+        if abs(w1Lon - w0Lon) < threshold and abs(w1Lat - w0Lat) < threshold:
+            break
+        w0Lon, w0Lat = w1Lon, w1Lat
+    return (w1Lon, w1Lat)
+
+
+# Array versions of the conversions.
+#
+# The *_array functions take numpy arrays (or anything numpy.asarray accepts,
+# e.g. lists, array.array('d') or memoryviews over doubles) and return a
+# tuple of two float64 arrays. They evaluate the same expressions in the same
+# order as the scalar functions above, so results agree with the scalar path
+# to within 1e-9 degrees (well below 1 mm); the forward directions are
+# usually bit-identical. The inverse directions freeze each point once it
+# converges, so they agree with gcj2wgs/bd2wgs to the same tolerance.
+#
+# Without numpy the functions fall back to the scalar functions and return
+# two lists.
+
+def _asarrays(lons, lats):
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    if lons.shape != lats.shape:
+        raise ValueError('lons and lats must have the same shape')
+    return lons, lats
+
+
+def _scalar_fallback(func, lons, lats):
+    results = [func(lon, lat) for lon, lat in zip(lons, lats)]
+    return [r[0] for r in results], [r[1] for r in results]
+
+
+def _wgs2gcj_delta_array(wgsLons, wgsLats):
+    dLat = transformLat_array(wgsLons - 105.0, wgsLats - 35.0)
+    dLon = transformLon_array(wgsLons - 105.0, wgsLats - 35.0)
+    radLat = wgsLats / 180.0 * PI
+    magic = np.sin(radLat)
+    magic = 1 - ee * magic * magic
+    sqrtMagic = np.sqrt(magic)
+    dLat = (dLat * 180.0) / ((a * (1 - ee)) / (magic * sqrtMagic) * PI)
+    dLon = (dLon * 180.0) / (a / sqrtMagic * np.cos(radLat) * PI)
+    return dLon, dLat
+
+
+def wgs2gcj_array(wgsLons, wgsLats):
+    """wgs coords to gcj, vectorized
+    
+    Arguments:
+        wgsLons {ndarray} -- lons
+        wgsLats {ndarray} -- lats
+    
+    Returns:
+        tuple -- gcj lons and lats
+    """
+    if np is None:
+        return _scalar_fallback(wgs2gcj, wgsLons, wgsLats)
+    wgsLons, wgsLats = _asarrays(wgsLons, wgsLats)
+    gcjLons = wgsLons.copy()
+    gcjLats = wgsLats.copy()
+    inside = ~outOfChina_array(wgsLons, wgsLats)
+    if inside.all():
+        dLon, dLat = _wgs2gcj_delta_array(wgsLons, wgsLats)
+        gcjLons += dLon
+        gcjLats += dLat
+    elif inside.any():
+        lons, lats = wgsLons[inside], wgsLats[inside]
+        dLon, dLat = _wgs2gcj_delta_array(lons, lats)
+        gcjLons[inside] = lons + dLon
+        gcjLats[inside] = lats + dLat
+    return gcjLons, gcjLats
+
+
+def gcj2wgs_solve(gcjLons, gcjLats, threshold=None, max_iter=None):
+    """gcj coords to wgs, solved for the whole batch at once
+    
+    Every point runs the same fixed-point iteration as gcj2wgs. A point is
+    frozen as soon as it converges, so it gets the same result as gcj2wgs,
+    and the loop stops when the whole batch has converged or max_iter is hit.
+    
+    Arguments:
+        gcjLons {ndarray} -- lons
+        gcjLats {ndarray} -- lats
+    
+    Keyword Arguments:
+        threshold {float} -- stop when both deltas are below it (default: {GCJ2WGS_THRESHOLD})
+        max_iter {int} -- iteration cap (default: {GCJ2WGS_MAX_ITER})
+    
+    Raises:
+        ImportError -- numpy is not installed, use gcj2wgs_array instead
+    
+    Returns:
+        tuple -- wgs lons, wgs lats and the number of iterations run
+    """
+    if np is None:
+        raise ImportError('gcj2wgs_solve requires numpy')
+    g0Lons, g0Lats = _asarrays(gcjLons, gcjLats)
+    return _gcj2wgs_iterate(g0Lons, g0Lats, threshold, max_iter)
+
 
+def _gcj2wgs_iterate(g0Lons, g0Lats, threshold=None, max_iter=None):
+    # gcj2wgs_solve on float64 arrays; the iteration starts from copies of
+    # g0, which are updated in place and returned
+    if threshold is None:
+        threshold = GCJ2WGS_THRESHOLD
+    if max_iter is None:
+        max_iter = GCJ2WGS_MAX_ITER
+    wLons = g0Lons.copy()
+    wLats = g0Lats.copy()
+    # iterating past convergence can flip points near the border of china in
+    # and out of the offset area, so converged points are masked out
+    active = np.ones(wLons.shape, dtype=bool)
+    iterations = 0
+    while iterations < max_iter and active.any():
+        iterations += 1
+        if active.all():
+            w0Lons, w0Lats, activeG0Lons, activeG0Lats = wLons, wLats, g0Lons, g0Lats
+        else:
+            w0Lons, w0Lats = wLons[active], wLats[active]
+            activeG0Lons, activeG0Lats = g0Lons[active], g0Lats[active]
+        g1Lons, g1Lats = wgs2gcj_array(w0Lons, w0Lats)
+        # w1 = w0 - (g1 - g0)
+        w1Lons = w0Lons - (g1Lons - activeG0Lons)
+        w1Lats = w0Lats - (g1Lats - activeG0Lats)
+        # delta = w1 - w0
+        moving = (np.abs(w1Lons - w0Lons) >= threshold) | (np.abs(w1Lats - w0Lats) >= threshold)
+        wLons[active] = w1Lons
+        wLats[active] = w1Lats
+        active[active] = moving
+    return wLons, wLats, iterations
 
-def bd2wgs(bdLon, bdLat):
-    gcj = bd2gcj(bdLon, bdLat)
-    return gcj2wgs(gcj[0], gcj[1])
+
+def gcj2wgs_array(gcjLons, gcjLats, threshold=None, max_iter=None):
+    """gcj coords to wgs, vectorized
+    
+    Arguments:
+        gcjLons {ndarray} -- lons
+        gcjLats {ndarray} -- lats
+    
+    Keyword Arguments:
+        threshold {float} -- see gcj2wgs_solve
+        max_iter {int} -- see gcj2wgs_solve
+    
+    Returns:
+        tuple -- wgs lons and lats
+    """
+    if np is None:
+        return _scalar_fallback(lambda lon, lat: gcj2wgs(lon, lat, threshold, max_iter), gcjLons, gcjLats)
+    wgsLons, wgsLats, _ = gcj2wgs_solve(gcjLons, gcjLats, threshold, max_iter)
+    return wgsLons, wgsLats
+
+
+def gcj2bd_array(gcjLons, gcjLats):
+    """gcj coords to bd, vectorized
+    
+    Arguments:
+        gcjLons {ndarray} -- lons
+        gcjLats {ndarray} -- lats
+    
+    Returns:
+        tuple -- bd lons and lats
+    """
+    if np is None:
+        return _scalar_fallback(gcj2bd, gcjLons, gcjLats)
+    gcjLons, gcjLats = _asarrays(gcjLons, gcjLats)
+    z = np.sqrt(gcjLons * gcjLons + gcjLats * gcjLats) + 0.00002 * np.sin(gcjLats * PI * 3000.0 / 180.0)
+    theta = np.arctan2(gcjLats, gcjLons) + 0.000003 * np.cos(gcjLons * PI * 3000.0 / 180.0)
+    bdLons = z * np.cos(theta) + 0.0065
+    bdLats = z * np.sin(theta) + 0.006
+    return bdLons, bdLats
+
+
+def bd2gcj_array(bdLons, bdLats):
+    """bd coords to gcj, vectorized
+    
+    Arguments:
+        bdLons {ndarray} -- lons
+        bdLats {ndarray} -- lats
+    
+    Returns:
+        tuple -- gcj lons and lats
+    """
+    if np is None:
+        return _scalar_fallback(bd2gcj, bdLons, bdLats)
+    bdLons, bdLats = _asarrays(bdLons, bdLats)
+    x = bdLons - 0.0065
+    y = bdLats - 0.006
+    z = np.sqrt(x * x + y * y) - 0.00002 * np.sin(y * PI * 3000.0 / 180.0)
+    theta = np.arctan2(y, x) - 0.000003 * np.cos(x * PI * 3000.0 / 180.0)
+    gcjLons = z * np.cos(theta)
+    gcjLats = z * np.sin(theta)
+    return gcjLons, gcjLats
+
+
+def _gcj2bd_inplace(lons, lats):
+    # gcj2bd_array writing the result back into lons and lats
+    z = np.sqrt(lons * lons + lats * lats)
+    z += 0.00002 * np.sin(lats * PI * 3000.0 / 180.0)
+    theta = np.arctan2(lats, lons)
+    theta += 0.000003 * np.cos(lons * PI * 3000.0 / 180.0)
+    np.multiply(z, np.cos(theta), out=lons)
+    np.multiply(z, np.sin(theta), out=lats)
+    lons += 0.0065
+    lats += 0.006
+    return lons, lats
+
+
+def _bd2gcj_new(bdLons, bdLats):
+    # bd2gcj_array computing the result in the shifted copies of the input;
+    # explicit outputs keep 0-d input an array rather than a numpy scalar
+    x = np.subtract(bdLons, 0.0065, out=np.empty_like(bdLons))
+    y = np.subtract(bdLats, 0.006, out=np.empty_like(bdLats))
+    z = np.sqrt(x * x + y * y)
+    z -= 0.00002 * np.sin(y * PI * 3000.0 / 180.0)
+    theta = np.arctan2(y, x)
+    theta -= 0.000003 * np.cos(x * PI * 3000.0 / 180.0)
+    np.multiply(z, np.cos(theta), out=x)
+    np.multiply(z, np.sin(theta), out=y)
+    return x, y
+
+
+def wgs2bd_array(wgsLons, wgsLats):
+    """wgs coords to bd, vectorized in one pass
+    
+    The gcj coords are computed in the output arrays and converted to bd
+    in place, no intermediate arrays are returned.
+    
+    Arguments:
+        wgsLons {ndarray} -- lons
+        wgsLats {ndarray} -- lats
+    
+    Returns:
+        tuple -- bd lons and lats
+    """
+    if np is None:
+        return _scalar_fallback(wgs2bd, wgsLons, wgsLats)
+    return _gcj2bd_inplace(*wgs2gcj_array(wgsLons, wgsLats))
+
+
+def bd2wgs_array(bdLons, bdLats, threshold=None, max_iter=None):
+    """bd coords to wgs, vectorized in one pass
+    
+    The gcj targets are computed in place in the first arrays derived from
+    the input and handed to the gcj2wgs iteration directly, so the result is
+    the same as gcj2wgs_array(*bd2gcj_array(bdLons, bdLats)), see bd2wgs.
+    
+    Arguments:
+        bdLons {ndarray} -- lons
+        bdLats {ndarray} -- lats
+    
+    Keyword Arguments:
+        threshold {float} -- see gcj2wgs_solve
+        max_iter {int} -- see gcj2wgs_solve
+    
+    Returns:
+        tuple -- wgs lons and lats
+    """
+    if np is None:
+        return _scalar_fallback(lambda lon, lat: bd2wgs(lon, lat, threshold, max_iter), bdLons, bdLats)
+    bdLons, bdLats = _asarrays(bdLons, bdLats)
+    wgsLons, wgsLats, _ = _gcj2wgs_iterate(*_bd2gcj_new(bdLons, bdLats), threshold=threshold, max_iter=max_iter)
+    return wgsLons, wgsLats
+
+
+# Bounding boxes.
+#
+# A conversion moves every point by a small offset. Bounding a box therefore
+# only needs the range of the offset over the points involved: it is
+# sampled on a grid, then widened by how much the offset can change between
+# grid nodes. The offset changes by less than BOX_OFFSET_SLOPE degrees per
+# degree anywhere except across the edge of the china box, where the
+# china-only conversions jump; boxes near that edge fall back to the global
+# bound MAX_OFFSET. Both bounds were measured over all six directions with
+# margin to spare (0.018 deg and 0.029 deg/deg).
+
+MAX_OFFSET = 0.02
+BOX_OFFSET_SLOPE = 0.05
+BOX_SAMPLES = 17
+# convergence threshold of the iterative inverses
+_BOX_EPSILON = 1e-6
+
+
+def _nearChinaEdge(minLng, minLat, maxLng, maxLat):
+    inside = (minLng >= 72.004 + MAX_OFFSET and maxLng <= 137.8347 - MAX_OFFSET
+              and minLat >= 0.8293 + MAX_OFFSET and maxLat <= 55.8271 - MAX_OFFSET)
+    return not inside and not boxOutOfChina(minLng - MAX_OFFSET, minLat - MAX_OFFSET,
+                                            maxLng + MAX_OFFSET, maxLat + MAX_OFFSET)
+
+
+def boxOffset(minLng, minLat, maxLng, maxLat, convert, samples=BOX_SAMPLES):
+    """conservative range of the offset convert(p) - p over a bounding box
+    
+    Arguments:
+        minLng {float} -- west
+        minLat {float} -- south
+        maxLng {float} -- east
+        maxLat {float} -- north
+        convert {callable} -- scalar conversion, e.g. wgs2gcj
+    
+    Keyword Arguments:
+        samples {int} -- grid nodes per side (default: {BOX_SAMPLES})
+    
+    Returns:
+        tuple -- (dLngMin, dLngMax, dLatMin, dLatMax), never wider than MAX_OFFSET
+    """
+    if _nearChinaEdge(minLng, minLat, maxLng, maxLat):
+        return -MAX_OFFSET, MAX_OFFSET, -MAX_OFFSET, MAX_OFFSET
+    stepLng = (maxLng - minLng) / (samples - 1)
+    stepLat = (maxLat - minLat) / (samples - 1)
+    dLngs = []
+    dLats = []
+    for i in range(samples):
+        lng = minLng + stepLng * i
+        for j in range(samples):
+            lat = minLat + stepLat * j
+            newLng, newLat = convert(lng, lat)
+            dLngs.append(newLng - lng)
+            dLats.append(newLat - lat)
+    # every point lies within half a step of a node in each direction
+    margin = BOX_OFFSET_SLOPE * (stepLng + stepLat) / 2 + _BOX_EPSILON
+    return (max(min(dLngs) - margin, -MAX_OFFSET), min(max(dLngs) + margin, MAX_OFFSET),
+            max(min(dLats) - margin, -MAX_OFFSET), min(max(dLats) + margin, MAX_OFFSET))
+
+
+def convertBox(minLng, minLat, maxLng, maxLat, convert):
+    """bounding box containing the converted points of a box
+    
+    Arguments:
+        minLng {float} -- west
+        minLat {float} -- south
+        maxLng {float} -- east
+        maxLat {float} -- north
+        convert {callable} -- scalar conversion, e.g. wgs2gcj
+    
+    Returns:
+        tuple -- (minLng, minLat, maxLng, maxLat), a superset of the converted box
+    """
+    dLngMin, dLngMax, dLatMin, dLatMax = boxOffset(minLng, minLat, maxLng, maxLat, convert)
+    return minLng + dLngMin, minLat + dLatMin, maxLng + dLngMax, maxLat + dLatMax
+
+
+def sourceBox(minLng, minLat, maxLng, maxLat, convert):
+    """bounding box containing every point that convert moves into a box
+    
+    Use it to filter source features by a box given in the target system:
+    a point converted into the box starts at most MAX_OFFSET away from it,
+    so the offset is bounded over the box widened by MAX_OFFSET.
+    
+    Arguments:
+        minLng {float} -- west, in the target system
+        minLat {float} -- south
+        maxLng {float} -- east
+        maxLat {float} -- north
+        convert {callable} -- scalar conversion from the source system, e.g. wgs2gcj
+    
+    Returns:
+        tuple -- (minLng, minLat, maxLng, maxLat) in the source system, a superset
+    """
+    dLngMin, dLngMax, dLatMin, dLatMax = boxOffset(minLng - MAX_OFFSET, minLat - MAX_OFFSET,
+                                                   maxLng + MAX_OFFSET, maxLat + MAX_OFFSET, convert)
+    return minLng - dLngMax, minLat - dLatMax, maxLng - dLngMin, maxLat - dLatMin
 
 
 class Transform():
@@ -122,8 +603,8 @@ class Transform():
     def wgs2gcj(self, wgsLon, wgsLat):
         return wgs2gcj(wgsLon, wgsLat)
 
-    def gcj2wgs(self, gcjLon, gcjLat):
-        return gcj2wgs(gcjLon, gcjLat)
+    def gcj2wgs(self, gcjLon, gcjLat, threshold=None, max_iter=None):
+        return gcj2wgs(gcjLon, gcjLat, threshold, max_iter)
 
     def gcj2bd(self, gcjLon, gcjLat):
         return gcj2bd(gcjLon, gcjLat)
@@ -134,5 +615,32 @@ class Transform():
     def wgs2bd(self, wgsLon, wgsLat):
         return wgs2bd(wgsLon, wgsLat)
 
-    def bd2wgs(self, bdLon, bdLat):
-        return bd2wgs(bdLon, bdLat)
\ No newline at end of file
+    def bd2wgs(self, bdLon, bdLat, threshold=None, max_iter=None):
+        return bd2wgs(bdLon, bdLat, threshold, max_iter)
+
+    def wgs2gcj_array(self, wgsLons, wgsLats):
+        return wgs2gcj_array(wgsLons, wgsLats)
+
+    def gcj2wgs_array(self, gcjLons, gcjLats, threshold=None, max_iter=None):
+        return gcj2wgs_array(gcjLons, gcjLats, threshold, max_iter)
+
+    def gcj2wgs_solve(self, gcjLons, gcjLats, threshold=None, max_iter=None):
+        return gcj2wgs_solve(gcjLons, gcjLats, threshold, max_iter)
+
+    def gcj2bd_array(self, gcjLons, gcjLats):
+        return gcj2bd_array(gcjLons, gcjLats)
+
+    def bd2gcj_array(self, bdLons, bdLats):
+        return bd2gcj_array(bdLons, bdLats)
+
+    def wgs2bd_array(self, wgsLons, wgsLats):
+        return wgs2bd_array(wgsLons, wgsLats)
+
+    def bd2wgs_array(self, bdLons, bdLats, threshold=None, max_iter=None):
+        return bd2wgs_array(bdLons, bdLats, threshold, max_iter)
+
+    def convertBox(self, minLng, minLat, maxLng, maxLat, convert):
+        return convertBox(minLng, minLat, maxLng, maxLat, convert)
+
+    def sourceBox(self, minLng, minLat, maxLng, maxLat, convert):
+        return sourceBox(minLng, minLat, maxLng, maxLat, convert)
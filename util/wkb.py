@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""Convert the coordinates of WKB geometries in place.
+
+A WKB geometry stores its vertices as runs of packed doubles. The runs are
+located once by walking the headers and counts, then the x and y of every
+vertex of a whole batch are read and written with one numpy gather and
+scatter, so converting never creates a Python object per vertex. Every geometry type is supported, including curves,
+collections and Z/M values, which are left untouched; both ISO (1001,
+2001, 3001, ...) and EWKB/2.5D (high bit flags) type codes are accepted,
+in either byte order.
+
+Coordinates of many geometries are gathered into two flat arrays so one
+array kernel call converts a whole batch:
+
+    batch = WkbBatch(wkbs)
+    batch.update(*kernel('WGS84', 'GCJ02')(*batch.coordinates()))
+    patched = batch.buffers
+"""
+import struct
+from array import array
+
+from .transform import np
+
+
+# geometry types whose body is a list of points, of rings, or of geometries
+_POINT_LISTS = (2, 8)                           # LineString, CircularString
+_RING_LISTS = (3, 17)                           # Polygon, Triangle
+_COLLECTIONS = (4, 5, 6, 7, 9, 10, 11, 12, 15, 16)
+
+_EWKB_Z = 0x80000000
+_EWKB_M = 0x40000000
+_EWKB_SRID = 0x20000000
+
+# header (byte order and type code) of a point without SRID -> (doubles per vertex, little endian)
+_POINT_HEADERS = {}
+for _little in (True, False):
+    for _code, _dimension in ((1, 2), (1001, 3), (2001, 3), (3001, 4), (1 | _EWKB_Z, 3), (1 | _EWKB_M, 3),
+                              (1 | _EWKB_Z | _EWKB_M, 4)):
+        _POINT_HEADERS[struct.pack('<BI' if _little else '>BI', int(_little), _code)] = (_dimension, _little)
+
+
+def _read_geometry(buf, offset, runs):
+    little = buf[offset] == 1
+    order = '<' if little else '>'
+    code = struct.unpack_from(order + 'I', buf, offset + 1)[0]
+    offset += 5
+    hasZ = bool(code & _EWKB_Z)
+    hasM = bool(code & _EWKB_M)
+    if code & _EWKB_SRID:
+        offset += 4
+    code &= 0x0FFFFFFF
+    base, flags = code % 1000, code // 1000
+    hasZ = hasZ or flags in (1, 3)
+    hasM = hasM or flags in (2, 3)
+    dimension = 2 + hasZ + hasM
+    if base == 1:
+        runs.append((offset, 1, dimension, little))
+        return offset + 8 * dimension
+    count = struct.unpack_from(order + 'I', buf, offset)[0]
+    offset += 4
+    if base in _POINT_LISTS:
+        if count:
+            runs.append((offset, count, dimension, little))
+        return offset + 8 * dimension * count
+    if base in _RING_LISTS:
+        for _ in range(count):
+            points = struct.unpack_from(order + 'I', buf, offset)[0]
+            offset += 4
+            if points:
+                runs.append((offset, points, dimension, little))
+            offset += 8 * dimension * points
+        return offset
+    if base in _COLLECTIONS:
+        for _ in range(count):
+            offset = _read_geometry(buf, offset, runs)
+        return offset
+    raise ValueError('unsupported WKB geometry type %d' % code)
+
+
+def coordinate_runs(wkb):
+    """locate the vertex runs of a WKB geometry
+
+    Arguments:
+        wkb {bytes} -- WKB geometry, any bytes-like object
+
+    Raises:
+        ValueError -- unknown geometry type
+        struct.error -- truncated WKB
+
+    Returns:
+        list -- (byte offset, number of vertices, doubles per vertex, little endian) tuples
+    """
+    runs = []
+    _read_geometry(wkb, 0, runs)
+    return runs
+
+
+class WkbBatch():
+    """the vertices of many WKB geometries, gathered into two flat arrays
+
+    The geometries are joined into one writable buffer and their vertex
+    runs located in a single pass. With numpy the x and y bytes of every
+    vertex are then read with one gather over the whole buffer and written
+    back with one scatter, whatever the number of geometries or runs, so a
+    batch of points costs no more per vertex than a batch of long lines.
+
+    coordinates() returns the x and y of every vertex in order, update()
+    writes the converted values back and buffers holds the patched
+    geometries.
+
+    Arguments:
+        wkbs {iterable} -- WKB geometries, any bytes-like objects
+    """
+
+    def __init__(self, wkbs):
+        wkbs = [wkb if type(wkb) is bytes else bytes(wkb) for wkb in wkbs]
+        self.data = bytearray(b''.join(wkbs))
+        # end offset of every geometry in data
+        self.bounds = []
+        # byte offset, vertex count, doubles per vertex and byte order of every run,
+        # kept in flat arrays that numpy reads without conversion
+        self.offsets = array('q')
+        self.counts = array('q')
+        self.dimensions = array('q')
+        self.little = array('q')
+        points = _POINT_HEADERS
+        add_offset = self.offsets.append
+        add_count = self.counts.append
+        add_dimension = self.dimensions.append
+        add_little = self.little.append
+        runs = []
+        offset = 0
+        for wkb in wkbs:
+            # offsets of the runs are positions in the joined buffer;
+            # points, the most common geometries, are recognised by their header alone
+            point = points.get(wkb[:5])
+            if point is not None:
+                add_offset(offset + 5)
+                add_count(1)
+                add_dimension(point[0])
+                add_little(point[1])
+            else:
+                _read_geometry(self.data, offset, runs)
+                for run_offset, count, dimension, little in runs:
+                    add_offset(run_offset)
+                    add_count(count)
+                    add_dimension(dimension)
+                    add_little(little)
+                runs.clear()
+            offset += len(wkb)
+            self.bounds.append(offset)
+        self._index = None
+
+    @property
+    def runs(self):
+        """(byte offset in data, number of vertices, doubles per vertex, little endian) of every run"""
+        return list(zip(self.offsets, self.counts, self.dimensions, map(bool, self.little)))
+
+    def __len__(self):
+        """number of vertices"""
+        return sum(self.counts)
+
+    @property
+    def buffers(self):
+        """the geometries as bytearrays, with the values written by update()"""
+        data = self.data
+        return [data[start:end] for start, end in zip([0] + self.bounds, self.bounds)]
+
+    def _byte_index(self):
+        # (2, vertices, 8) positions of the x and y bytes of every vertex in
+        # the joined buffer, in little endian order; built once per batch
+        if self._index is None:
+            offsets, counts, dimensions, little = (np.frombuffer(values, dtype=np.int64) for values in (
+                self.offsets, self.counts, self.dimensions, self.little))
+            if (counts == 1).all():
+                # points: one vertex per run
+                starts = offsets
+                vertex_little = little
+            else:
+                total = int(counts.sum())
+                first = np.cumsum(counts) - counts
+                position = np.arange(total) - np.repeat(first, counts)
+                starts = np.repeat(offsets, counts) + position * np.repeat(8 * dimensions, counts)
+                vertex_little = np.repeat(little, counts)
+            lanes = np.arange(8)
+            if not vertex_little.all():
+                # big endian doubles are gathered byte reversed
+                lanes = np.where(vertex_little[:, None].astype(bool), lanes, lanes[::-1])
+            self._index = np.stack((starts[:, None] + lanes, starts[:, None] + 8 + lanes))
+        return self._index
+
+    def coordinates(self):
+        """x and y of every vertex
+
+        Returns:
+            tuple -- two float64 arrays, or two array('d') without numpy
+        """
+        if np is None:
+            lons = array('d')
+            lats = array('d')
+            for offset, count, dimension, little in self.runs:
+                values = struct.unpack_from('%s%dd' % ('<' if little else '>', count * dimension), self.data, offset)
+                lons.extend(values[0::dimension])
+                lats.extend(values[1::dimension])
+            return lons, lats
+        if not self.offsets:
+            return np.empty(0), np.empty(0)
+        index = self._byte_index()
+        values = np.frombuffer(self.data, dtype=np.uint8)[index].view('<f8').reshape(2, -1)
+        return values[0], values[1]
+
+    def update(self, lons, lats):
+        """write converted x and y back, in the order of coordinates()
+
+        Arguments:
+            lons {sequence} -- new x of every vertex
+            lats {sequence} -- new y of every vertex
+        """
+        if np is None:
+            position = 0
+            for offset, count, dimension, little in self.runs:
+                fmt = '%s%dd' % ('<' if little else '>', count * dimension)
+                values = list(struct.unpack_from(fmt, self.data, offset))
+                values[0::dimension] = lons[position:position + count]
+                values[1::dimension] = lats[position:position + count]
+                struct.pack_into(fmt, self.data, offset, *values)
+                position += count
+            return
+        if not self.offsets:
+            return
+        index = self._byte_index()
+        values = np.empty((2, index.shape[1]), dtype='<f8')
+        values[0] = lons
+        values[1] = lats
+        np.frombuffer(self.data, dtype=np.uint8)[index] = values.view(np.uint8).reshape(index.shape)
+
+
+def convert_wkbs(wkbs, kernel):
+    """convert many WKB geometries with one kernel call
+
+    Arguments:
+        wkbs {iterable} -- WKB geometries
+        kernel {callable} -- array kernel (lons, lats) -> (lons, lats), see registry.kernel
+
+    Returns:
+        list -- converted WKB geometries as bytearrays
+    """
+    batch = WkbBatch(wkbs)
+    lons, lats = batch.coordinates()
+    if len(lons):
+        batch.update(*kernel(lons, lats))
+    return batch.buffers